@@ -0,0 +1,114 @@
+"""
+Benchmark of the encoding and decoding of a Vertex AI-style request and response:
+JSON (pydantic request parsing, orjson response rendering, as in `/ner-vertex-ai`)
+against msgpack (as in `/ner-vertex-ai-msgpack`).
+
+The model is not involved; the request holds `--instances` instances, and the response
+`--entities` entities per instance. The times cover both sides of the wire: the client
+encoding the request and decoding the response, and the API decoding the request and
+encoding the response.
+
+From the `fast_api_model_serving` directory, run:
+
+```shell
+python -m benchmarks.bench_msgpack --instances 64 --entities 40
+```
+"""
+
+import argparse
+import json
+import timeit
+
+import msgpack
+import orjson
+
+from src.msgpack_codec import decode_instances, packb
+from src.schemas import InputContentVertexAI
+from src.serialisers import Entity, Predictions, build_prediction, dumps
+
+
+def make_request(n_instances: int) -> dict:
+    return {
+        "instances": [
+            {
+                "url": f"https://www.gov.uk/government/people/rishi-sunak-{i}",
+                "text": "Rishi Sunak became Prime Minister on 25 October 2022. " * 4,
+                "line_number": i,
+                "part_of_page": "text",
+            }
+            for i in range(n_instances)
+        ]
+    }
+
+
+def make_predictions(instances, n_entities: int) -> Predictions:
+    entities = [Entity("25 October 2022", "DATE", 37, 52)] * n_entities
+    return Predictions(
+        [build_prediction(instance, list(entities)) for instance in instances]
+    )
+
+
+def json_round_trip(request: dict, n_entities: int) -> int:
+    # client: encode the request
+    body = json.dumps(request).encode("utf-8")
+    # API: parse and validate the request, render the response
+    instances = InputContentVertexAI.parse_raw(body).instances
+    response = dumps(make_predictions(instances, n_entities))
+    # client: decode the response
+    json.loads(response)
+    return len(body) + len(response)
+
+
+def msgpack_round_trip(request: dict, n_entities: int) -> int:
+    body = msgpack.packb(request)
+    instances = decode_instances(body)
+    response = packb(make_predictions(instances, n_entities))
+    msgpack.unpackb(response)
+    return len(body) + len(response)
+
+
+def main(n_instances: int, n_entities: int, repeat: int) -> None:
+    request = make_request(n_instances)
+    # both transports carry the same predictions
+    json_response = orjson.loads(
+        dumps(
+            make_predictions(
+                InputContentVertexAI.parse_obj(request).instances, n_entities
+            )
+        )
+    )
+    msgpack_response = msgpack.unpackb(
+        packb(make_predictions(decode_instances(msgpack.packb(request)), n_entities))
+    )
+    assert json_response == msgpack_response
+
+    transports = {"json": json_round_trip, "msgpack": msgpack_round_trip}
+    timings = {}
+    for name, round_trip in transports.items():
+        timings[name] = (
+            min(
+                timeit.repeat(
+                    lambda: round_trip(request, n_entities), number=10, repeat=repeat
+                )
+            )
+            / 10
+        )
+        n_bytes = round_trip(request, n_entities)
+        print(
+            f"{name:>8}: {timings[name] * 1000:8.3f} ms per request, "
+            f"{n_bytes / 1024:8.1f} KiB on the wire"
+        )
+    saved = timings["json"] - timings["msgpack"]
+    print(
+        f"Saved {saved * 1000:.3f} ms per request "
+        f"({timings['json'] / timings['msgpack']:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--instances", type=int, default=64)
+    parser.add_argument("--entities", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.instances, args.entities, args.repeat)
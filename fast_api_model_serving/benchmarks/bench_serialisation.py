@@ -0,0 +1,81 @@
+"""
+Benchmark of the response serialisation: pydantic response-model validation
+(what FastAPI does with `response_model`) against dataclasses rendered by orjson.
+
+The model is not involved; the benchmark serialises synthetic predictions for a
+Vertex AI request of `--instances` instances with `--entities` entities each.
+
+From the `fast_api_model_serving` directory, run:
+
+```shell
+python -m benchmarks.bench_serialisation --instances 64 --entities 40
+```
+"""
+
+import argparse
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from src.schemas import InputContent, ResponseEntitiesVertexAI
+from src.serialisers import Entity, Predictions, build_prediction, dumps
+
+
+def make_predictions(n_instances: int, n_entities: int) -> Predictions:
+    instance = InputContent(
+        url="https://www.gov.uk/government/people/rishi-sunak",
+        text="Rishi Sunak became Prime Minister on 25 October 2022",
+        line_number=2,
+        part_of_page="text",
+    )
+    entities = [Entity("25 October 2022", "DATE", 37, 52)] * n_entities
+    return Predictions(
+        [build_prediction(instance, list(entities)) for _ in range(n_instances)]
+    )
+
+
+def pydantic_serialise(content: dict) -> bytes:
+    # replicates fastapi.routing.serialize_response followed by JSONResponse.render
+    model = ResponseEntitiesVertexAI.parse_obj(content)
+    return json.dumps(
+        jsonable_encoder(model),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def main(n_instances: int, n_entities: int, repeat: int) -> None:
+    predictions = make_predictions(n_instances, n_entities)
+    # what the endpoints used to return: plain dictionaries
+    content = jsonable_encoder(predictions)
+    assert pydantic_serialise(content) == dumps(predictions)
+
+    timings = {
+        "pydantic": min(
+            timeit.repeat(lambda: pydantic_serialise(content), number=10, repeat=repeat)
+        )
+        / 10,
+        "orjson_dataclasses": min(
+            timeit.repeat(lambda: dumps(predictions), number=10, repeat=repeat)
+        )
+        / 10,
+    }
+    for name, seconds in timings.items():
+        print(f"{name:>20}: {seconds * 1000:8.3f} ms per request")
+    saved = timings["pydantic"] - timings["orjson_dataclasses"]
+    print(
+        f"Saved {saved * 1000:.3f} ms per request "
+        f"({timings['pydantic'] / timings['orjson_dataclasses']:.0f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--instances", type=int, default=64)
+    parser.add_argument("--entities", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.instances, args.entities, args.repeat)
@@ -0,0 +1,108 @@
+"""
+Benchmark of the first-request latency penalty of a new replica, with and without the
+start-up warm-up (see `src/warmup.py`).
+
+For each number of warm-up rounds in `--warmup-rounds` (0 disables the warm-up), the
+script starts gunicorn with one worker, measures the time until the health check
+succeeds, then sends `--requests` `/ner-vertex-ai` requests one after the other. The
+penalty is the latency of the first request minus the median latency of the others.
+
+From the `fast_api_model_serving` directory, with the models downloaded in `models/`
+(or with `--stand-in-models`), run:
+
+```shell
+python -m benchmarks.bench_warmup --warmup-rounds 0 1 --requests 20
+```
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Optional
+
+from benchmarks.bench_workers import post_json, wait_until_healthy
+from benchmarks.load_test import DEFAULT_LINES, LineSampler, parse_mix, read_lines
+from benchmarks.stand_in_models import build_stand_in_models
+
+
+def bench(warmup_rounds: int, args, model_paths: Optional[tuple]) -> dict:
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY="1",
+        PORT=str(args.port),
+        WARMUP_ROUNDS=str(warmup_rounds),
+    )
+    if model_paths is not None:
+        env.update(PHASE1_MODEL_PATH=model_paths[0], PHASE2_MODEL_PATH=model_paths[1])
+    start = time.monotonic()
+    server = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    # the same requests for every number of warm-up rounds
+    sampler = LineSampler(read_lines(DEFAULT_LINES), parse_mix(args.mix), seed=0)
+    payloads = [
+        sampler.payload("ner-vertex-ai", args.batch_size) for _ in range(args.requests)
+    ]
+    try:
+        wait_until_healthy(base_url, args.startup_timeout)
+        time_to_ready = time.monotonic() - start
+        latencies = []
+        for payload in payloads:
+            request_start = time.monotonic()
+            post_json(f"{base_url}/ner-vertex-ai", payload)
+            latencies.append(time.monotonic() - request_start)
+    finally:
+        server.terminate()
+        server.wait()
+
+    steady = statistics.median(latencies[1:])
+    return {
+        "warmup_rounds": warmup_rounds,
+        "time_to_ready_seconds": time_to_ready,
+        "first_request_ms": 1000 * latencies[0],
+        "steady_request_ms": 1000 * steady,
+        "first_request_penalty_ms": 1000 * (latencies[0] - steady),
+        "latencies_ms": [1000 * latency for latency in latencies],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--warmup-rounds", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--mix", default="title=0.15,description=0.15,text=0.7")
+    parser.add_argument(
+        "--stand-in-models",
+        action="store_true",
+        help="serve tiny untrained models instead of the ones in `models/`",
+    )
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--output", help="optional JSON file to save the results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_paths = build_stand_in_models(model_dir) if args.stand_in_models else None
+        results = [bench(rounds, args, model_paths) for rounds in args.warmup_rounds]
+    print(
+        f"{'warm-up rounds':>15} {'ready (s)':>10} {'first (ms)':>11} "
+        f"{'steady (ms)':>12} {'penalty (ms)':>13}"
+    )
+    for r in results:
+        print(
+            f"{r['warmup_rounds']:>15} {r['time_to_ready_seconds']:>10.1f} "
+            f"{r['first_request_ms']:>11.1f} {r['steady_request_ms']:>12.1f} "
+            f"{r['first_request_penalty_ms']:>13.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,178 @@
+"""
+Benchmark of the memory footprint and throughput of the API served by gunicorn
+with 1, 2 and 4 uvicorn workers (see `gunicorn_conf.py`).
+
+For each number of workers, the script starts gunicorn, waits for the health check,
+records the total RSS and PSS (proportional set size, which counts the pages shared
+copy-on-write between the master and the workers only once) of all the gunicorn processes,
+then sends `/ner-vertex-ai` requests from `--concurrency` threads for `--duration` seconds.
+
+Linux only (memory is read from /proc). From the `fast_api_model_serving` directory,
+with the models downloaded in `models/`, run:
+
+```shell
+python -m benchmarks.bench_workers --workers 1 2 4 --duration 60
+```
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+SAMPLE_TEXTS = [
+    "Rishi Sunak became Prime Minister on 25 October 2022",
+    "Apply for a passport",
+    "You can contact HM Revenue and Customs by phone on 0300 200 3300.",
+    "The Department for Education will publish the guidance in London in March 2023.",
+]
+
+
+def process_tree(pid: int) -> List[int]:
+    """Returns the pid and the pids of all the descendants of a process."""
+    pids = [pid]
+    for child in _children(pid):
+        pids.extend(process_tree(child))
+    return pids
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        try:
+            with open(f"{task_dir}/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            pass
+    return children
+
+
+def memory_mb(pids: List[int]) -> Dict[str, float]:
+    """Returns the total RSS and PSS (in MB) of a list of processes."""
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    totals[f"{key.lower()}_mb"] += int(value.split()[0]) / 1024
+    return totals
+
+
+def post_json(url: str, payload: dict, timeout: float = 300) -> bytes:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def wait_until_healthy(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health-check", timeout=5):
+                return
+        except OSError:
+            time.sleep(1)
+    raise TimeoutError(f"{base_url} not healthy after {timeout} seconds")
+
+
+def run_load(base_url: str, concurrency: int, duration: float, batch_size: int):
+    payload = {
+        "instances": [
+            {"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} for i in range(batch_size)
+        ]
+    }
+    deadline = time.monotonic() + duration
+
+    def client() -> int:
+        n_requests = 0
+        while time.monotonic() < deadline:
+            post_json(f"{base_url}/ner-vertex-ai", payload)
+            n_requests += 1
+        return n_requests
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        n_requests = sum(executor.map(lambda _: client(), range(concurrency)))
+    elapsed = time.monotonic() - start
+    return {
+        "requests_per_sec": n_requests / elapsed,
+        "texts_per_sec": n_requests * batch_size / elapsed,
+    }
+
+
+def bench(n_workers: int, args) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), PORT=str(args.port))
+    server = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_healthy(base_url, args.startup_timeout)
+        # one request per worker, so that every worker has run the models once
+        for _ in range(n_workers):
+            post_json(f"{base_url}/ner-vertex-ai", {"instances": [{"text": "Warm up"}]})
+        result = {"workers": n_workers, **memory_mb(process_tree(server.pid))}
+        result.update(
+            run_load(
+                base_url,
+                args.concurrency or 2 * n_workers,
+                args.duration,
+                args.batch_size,
+            )
+        )
+        # memory after serving traffic, when any copy-on-write has happened
+        result.update(
+            {
+                f"{k}_after_load": v
+                for k, v in memory_mb(process_tree(server.pid)).items()
+            }
+        )
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=0,
+        help="number of client threads (default: twice the number of workers)",
+    )
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--output", help="optional JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = [bench(n_workers, args) for n_workers in args.workers]
+    print(
+        f"{'workers':>8} {'RSS (MB)':>10} {'PSS (MB)':>10} "
+        f"{'PSS after (MB)':>15} {'req/s':>8} {'texts/s':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['workers']:>8} {r['rss_mb']:>10.0f} {r['pss_mb']:>10.0f} "
+            f"{r['pss_mb_after_load']:>15.0f} {r['requests_per_sec']:>8.2f} "
+            f"{r['texts_per_sec']:>8.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
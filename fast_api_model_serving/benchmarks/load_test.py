@@ -0,0 +1,379 @@
+"""
+Load test of the API: replays a mix of GOV.UK title, description and body lines
+against `/ner` and `/ner-vertex-ai` at a given rate and concurrency, and reports the
+throughput, the p50/p95/p99 latencies and the CPU and memory used by the server.
+
+The script starts the app with gunicorn (see `gunicorn_conf.py`), optionally with the
+tiny stand-in models of `benchmarks/stand_in_models.py` instead of the real ones, or
+targets an already running server with `--url` (the CPU and memory are then not
+measured). Each endpoint is loaded for `--duration` seconds:
+
+- with `--rps`, requests are sent at a fixed rate (open loop), at most `--concurrency`
+  of them in flight. The latency is measured from the time the request was due, so
+  that the time spent waiting for a free connection, when the server cannot keep up,
+  is counted;
+- with `--rps 0`, `--concurrency` clients send requests back to back (closed loop),
+  to measure the maximum throughput.
+
+The lines (`benchmarks/govuk_lines.jsonl` by default) are drawn at random, with the
+proportions of titles, descriptions and body lines given by `--mix`. A `/ner-vertex-ai`
+request holds `--batch-size` lines.
+
+The results, with the parameters of the run and the git commit, are written to the
+JSON file `--output`, so that runs can be compared over time. Linux only (CPU and
+memory are read from /proc). From the `fast_api_model_serving` directory, run:
+
+```shell
+python -m benchmarks.load_test --stand-in-models --rps 20 --concurrency 8 --duration 60
+```
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .bench_workers import process_tree, wait_until_healthy
+from .stand_in_models import build_stand_in_models
+
+ENDPOINTS = ["ner", "ner-vertex-ai"]
+DEFAULT_LINES = os.path.join(os.path.dirname(__file__), "govuk_lines.jsonl")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Returns the `q`-th percentile of `values`, by linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parses a mix like `title=0.15,description=0.15,text=0.7`."""
+    weights = {}
+    for item in mix.split(","):
+        part, weight = item.split("=")
+        weights[part.strip()] = float(weight)
+    return weights
+
+
+def read_lines(path: str) -> Dict[str, List[str]]:
+    """Returns the texts of a JSONL file of lines, by `part_of_page`."""
+    lines = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                lines.setdefault(record["part_of_page"], []).append(record["text"])
+    return lines
+
+
+class LineSampler:
+    """Draws lines at random, with the proportions of the parts of the page of a mix."""
+
+    def __init__(self, lines: Dict[str, List[str]], mix: Dict[str, float], seed: int):
+        self.parts = [part for part in mix if lines.get(part)]
+        if not self.parts:
+            raise ValueError(f"no lines for any of the parts of the mix {mix}")
+        self.weights = [mix[part] for part in self.parts]
+        self.lines = lines
+        self.random = random.Random(seed)
+        self.n_lines = 0
+
+    def sample(self) -> dict:
+        part = self.random.choices(self.parts, self.weights)[0]
+        self.n_lines += 1
+        return {
+            "url": f"https://www.gov.uk/load-test/{self.n_lines}",
+            "text": self.random.choice(self.lines[part]),
+            "line_number": self.n_lines,
+            "part_of_page": part,
+        }
+
+    def payload(self, endpoint: str, batch_size: int) -> dict:
+        if endpoint == "ner":
+            return self.sample()
+        return {"instances": [self.sample() for _ in range(batch_size)]}
+
+
+def cpu_seconds(pids: List[int]) -> float:
+    """Returns the total user and system CPU time (in seconds) of a list of processes."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # the fields after the command name, which may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+        except FileNotFoundError:
+            continue
+        # utime and stime, the 14th and 15th fields
+        total += int(fields[11]) + int(fields[12])
+    return total / CLOCK_TICKS
+
+
+def rss_mb(pids: List[int]) -> float:
+    """Returns the total resident set size (in MB) of a list of processes."""
+    total = 0.0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) / 1024
+        except FileNotFoundError:
+            pass
+    return total
+
+
+class ResourceMonitor:
+    """Samples, in a background thread, the RSS of a server and all its workers."""
+
+    def __init__(self, pid: int, interval: float):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.samples.append(rss_mb(process_tree(self.pid)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "ResourceMonitor":
+        self.cpu_start = cpu_seconds(process_tree(self.pid))
+        self.start = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.monotonic() - self.start
+        self.cpu = cpu_seconds(process_tree(self.pid)) - self.cpu_start
+
+    def summary(self) -> dict:
+        return {
+            "cpu_seconds": self.cpu,
+            # average number of cores busy during the run
+            "cpu_utilisation": self.cpu / self.elapsed,
+            "rss_mb_mean": sum(self.samples) / len(self.samples),
+            "rss_mb_peak": max(self.samples),
+        }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    sampler: LineSampler,
+    batch_size: int,
+    rps: float,
+    concurrency: int,
+    duration: float,
+) -> dict:
+    latencies = []
+    statuses: Dict[str, int] = {}
+    n_texts = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(due: float) -> None:
+        nonlocal n_texts
+        payload = sampler.payload(endpoint, batch_size)
+        async with semaphore:
+            try:
+                response = await client.post(f"/{endpoint}", json=payload)
+                status = str(response.status_code)
+            except httpx.TransportError as e:
+                status = type(e).__name__
+        latencies.append(time.monotonic() - due)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == "200":
+            n_texts += len(payload["instances"]) if "instances" in payload else 1
+
+    start = time.monotonic()
+    deadline = start + duration
+    if rps > 0:
+        tasks = []
+        for i in range(int(duration * rps)):
+            due = start + i / rps
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            tasks.append(asyncio.create_task(send(due)))
+        await asyncio.gather(*tasks)
+    else:
+
+        async def closed_loop_client() -> None:
+            while time.monotonic() < deadline:
+                await send(time.monotonic())
+
+        await asyncio.gather(*(closed_loop_client() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+
+    latencies_ms = [1000 * latency for latency in latencies]
+    return {
+        "endpoint": f"/{endpoint}",
+        "requests": len(latencies),
+        "status_codes": statuses,
+        "elapsed_seconds": elapsed,
+        "requests_per_sec": len(latencies) / elapsed,
+        "texts_per_sec": n_texts / elapsed,
+        "latency_ms": {
+            "mean": sum(latencies_ms) / len(latencies_ms) if latencies_ms else None,
+            "p50": percentile(latencies_ms, 50),
+            "p95": percentile(latencies_ms, 95),
+            "p99": percentile(latencies_ms, 99),
+            "max": max(latencies_ms, default=None),
+        },
+    }
+
+
+async def bench_endpoint(
+    base_url: str, endpoint: str, server_pid: Optional[int], args
+) -> dict:
+    sampler = LineSampler(read_lines(args.lines), parse_mix(args.mix), args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        # one unmeasured request per worker, so that every worker has run the models once
+        for _ in range(args.workers):
+            await client.post(f"/{endpoint}", json=sampler.payload(endpoint, 1))
+        load = run_load(
+            client,
+            endpoint,
+            sampler,
+            args.batch_size,
+            args.rps,
+            args.concurrency,
+            args.duration,
+        )
+        if server_pid is None:
+            return await load
+        with ResourceMonitor(server_pid, args.sample_interval) as monitor:
+            result = await load
+    result.update(monitor.summary())
+    return result
+
+
+def start_server(args, model_dir: Optional[str]) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), PORT=str(args.port))
+    if model_dir is not None:
+        phase1_path, phase2_path = build_stand_in_models(model_dir)
+        env.update(PHASE1_MODEL_PATH=phase1_path, PHASE2_MODEL_PATH=phase2_path)
+    return subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args) -> dict:
+    run = {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "cpu_count": os.cpu_count(),
+        "parameters": vars(args),
+    }
+    if args.url:
+        return {
+            "run": run,
+            "results": [
+                asyncio.run(bench_endpoint(args.url, endpoint, None, args))
+                for endpoint in args.endpoints
+            ],
+        }
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        server = start_server(args, model_dir if args.stand_in_models else None)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_healthy(base_url, args.startup_timeout)
+            results = [
+                asyncio.run(bench_endpoint(base_url, endpoint, server.pid, args))
+                for endpoint in args.endpoints
+            ]
+        finally:
+            server.terminate()
+            server.wait()
+    return {"run": run, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=10,
+        help="requests per second sent to each endpoint (0: as fast as possible)",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="instances per /ner-vertex-ai request",
+    )
+    parser.add_argument("--lines", default=DEFAULT_LINES)
+    parser.add_argument("--mix", default="title=0.15,description=0.15,text=0.7")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--url", help="URL of a running server to load, instead of starting one"
+    )
+    parser.add_argument(
+        "--stand-in-models",
+        action="store_true",
+        help="serve tiny untrained models instead of the ones in `models/`",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument(
+        "--output",
+        default=f"load_test_{datetime.datetime.now():%Y%m%d_%H%M%S}.json",
+        help="JSON file to save the results to",
+    )
+    args = parser.parse_args()
+
+    report = main(args)
+    print(
+        f"{'endpoint':<15} {'req/s':>8} {'texts/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errors':>7} {'CPU':>6} {'RSS MB':>8}"
+    )
+    for r in report["results"]:
+        errors = r["requests"] - r["status_codes"].get("200", 0)
+        print(
+            f"{r['endpoint']:<15} {r['requests_per_sec']:>8.2f} {r['texts_per_sec']:>8.1f} "
+            f"{r['latency_ms']['p50']:>8.1f} {r['latency_ms']['p95']:>8.1f} "
+            f"{r['latency_ms']['p99']:>8.1f} {errors:>7} "
+            f"{r.get('cpu_utilisation', float('nan')):>6.2f} "
+            f"{r.get('rss_mb_peak', float('nan')):>8.0f}"
+        )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
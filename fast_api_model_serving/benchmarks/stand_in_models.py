@@ -0,0 +1,80 @@
+"""
+Tiny, untrained stand-in spacy pipelines with the same structure as the phase-1 and
+phase-2 models: a `transformer` component (here a small `tok2vec`) listened to by a
+`ner` component. The API loads and combines them exactly like the real models, so the
+app can be started and load-tested without downloading the transformer models.
+
+The latencies measured with the stand-in models are those of the API (validation,
+chunking, serialisation, workers) rather than of the models.
+
+From the `fast_api_model_serving` directory, run:
+
+```shell
+python -m benchmarks.stand_in_models --output-dir /tmp/stand_in_models
+```
+"""
+
+import argparse
+import os
+from typing import Tuple
+
+import spacy
+
+PHASE_LABELS = {
+    "1": ["DATE", "GPE", "ORG", "PERSON"],
+    "2": ["FORM", "ROLE", "SERVICE", "TITLE"],
+}
+
+
+def build_stand_in_model(labels) -> spacy.language.Language:
+    nlp = spacy.blank("en")
+    nlp.add_pipe("tok2vec", name="transformer")
+    ner = nlp.add_pipe(
+        "ner",
+        config={
+            "model": {
+                "@architectures": "spacy.TransitionBasedParser.v2",
+                "state_type": "ner",
+                "extra_state_tokens": False,
+                "hidden_width": 64,
+                "maxout_pieces": 2,
+                "use_upper": True,
+                "nO": None,
+                "tok2vec": {
+                    "@architectures": "spacy.Tok2VecListener.v1",
+                    "width": 96,
+                    "upstream": "transformer",
+                },
+            }
+        },
+    )
+    for label in labels:
+        ner.add_label(label)
+    nlp.initialize()
+    return nlp
+
+
+def build_stand_in_models(output_dir: str) -> Tuple[str, str]:
+    """
+    Saves the stand-in phase-1 and phase-2 pipelines in `output_dir`.
+
+    Returns the paths of the phase-1 and phase-2 pipelines, to be passed to the app in the
+    `PHASE1_MODEL_PATH` and `PHASE2_MODEL_PATH` environment variables.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for phase, labels in PHASE_LABELS.items():
+        path = os.path.join(output_dir, f"phase{phase}_ner_stand_in_model")
+        build_stand_in_model(labels).to_disk(path)
+        paths.append(path)
+    return tuple(paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output-dir", required=True)
+    args = parser.parse_args()
+
+    phase1_path, phase2_path = build_stand_in_models(args.output_dir)
+    print(f"PHASE1_MODEL_PATH={phase1_path}")
+    print(f"PHASE2_MODEL_PATH={phase2_path}")
@@ -0,0 +1,199 @@
+"""
+Asynchronous bulk client for the GovNER API, to extract the named entities of a local file
+of instances with our own API replicas (for instance, for a backfill) rather than with
+Vertex AI Batch Predictions.
+
+The client reads the instances (`url`, `text`, `line_number`, `part_of_page`) from a
+JSONL or Parquet file, packs them into `/ner-vertex-ai` requests sized by an estimated token
+budget, and keeps up to `--concurrency` requests in flight over a pool of keep-alive HTTP
+connections. Failed requests (connection errors, 429 and 5xx responses) are retried with
+exponential backoff. The predictions are written to a JSONL file in the order of the input.
+
+From the `fast_api_model_serving` directory, with the API running locally
+(`uvicorn --host 0.0.0.0 main:app --port 8080`), run:
+
+```shell
+python -m client.bulk_client instances.jsonl predictions.jsonl \
+    --url http://localhost:8080 --concurrency 8 --max-tokens 4096
+```
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import httpx
+
+INSTANCE_FIELDS = ("url", "text", "line_number", "part_of_page")
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def read_instances(filepath: str) -> Iterator[dict]:
+    """
+    Yields the instances of a JSONL or Parquet (`.parquet`) file, one dictionary
+    per row, with the fields of the API's `InputContent` (other fields are dropped).
+    """
+    if Path(filepath).suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(filepath)
+        columns = [c for c in INSTANCE_FIELDS if c in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(columns=columns):
+            yield from batch.to_pylist()
+    else:
+        with open(filepath, "r") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield {k: row[k] for k in INSTANCE_FIELDS if k in row}
+
+
+def estimate_tokens(text: str) -> int:
+    """A cheap estimate of the number of model tokens of a text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_requests(
+    instances: Iterable[dict], max_tokens: int, max_instances: int
+) -> Iterator[List[dict]]:
+    """
+    Packs consecutive instances into requests of at most `max_instances` instances and,
+    unless a single instance is over budget on its own, at most `max_tokens` estimated tokens.
+
+    >>> [len(r) for r in pack_requests([{"text": "a" * 40}] * 5, max_tokens=25, max_instances=10)]
+    [2, 2, 1]
+    """
+    request, request_tokens = [], 0
+    for instance in instances:
+        tokens = estimate_tokens(instance["text"])
+        if request and (
+            request_tokens + tokens > max_tokens or len(request) >= max_instances
+        ):
+            yield request
+            request, request_tokens = [], 0
+        request.append(instance)
+        request_tokens += tokens
+    if request:
+        yield request
+
+
+async def post_with_retries(
+    client: httpx.AsyncClient,
+    url: str,
+    instances: List[dict],
+    max_retries: int,
+    backoff: float,
+) -> List[dict]:
+    """
+    Sends one `/ner-vertex-ai` request and returns its predictions, retrying connection
+    errors, timeouts and 429/5xx responses with exponential backoff and jitter.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.post(url, json={"instances": instances})
+            if response.status_code not in RETRY_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()["predictions"]
+            error = httpx.HTTPStatusError(
+                f"{response.status_code} from {url}",
+                request=response.request,
+                response=response,
+            )
+        except httpx.TransportError as e:
+            error = e
+        if attempt == max_retries:
+            raise error
+        await asyncio.sleep(backoff * 2**attempt * (1 + random.random()))
+
+
+async def predict_to_file(
+    instances: Iterable[dict],
+    outfile: str,
+    base_url: str,
+    concurrency: int = 8,
+    max_tokens: int = 4096,
+    max_instances: int = 64,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+    timeout: float = 600,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> int:
+    """
+    Extracts the named entities of the instances with the API at `base_url` and writes
+    the predictions to `outfile` (JSONL), in the order of the instances.
+
+    At most `concurrency` requests are in flight at a time; results are written as soon as
+    all the previous requests are written, so memory is bounded by `concurrency` requests.
+
+    Returns:
+        The number of predictions written.
+    """
+    url = f"{base_url.rstrip('/')}/ner-vertex-ai"
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    n_predictions = 0
+    async with httpx.AsyncClient(
+        limits=limits, timeout=timeout, transport=transport
+    ) as client:
+        with open(outfile, "w") as f:
+            in_flight = deque()
+
+            async def write_oldest():
+                nonlocal n_predictions
+                for prediction in await in_flight.popleft():
+                    f.write(json.dumps(prediction, ensure_ascii=False) + "\n")
+                    n_predictions += 1
+
+            try:
+                for request in pack_requests(instances, max_tokens, max_instances):
+                    if len(in_flight) >= concurrency:
+                        await write_oldest()
+                    in_flight.append(
+                        asyncio.create_task(
+                            post_with_retries(
+                                client, url, request, max_retries, backoff
+                            )
+                        )
+                    )
+                while in_flight:
+                    await write_oldest()
+            finally:
+                for task in in_flight:
+                    task.cancel()
+    return n_predictions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("infile", help="JSONL or Parquet file of instances")
+    parser.add_argument("outfile", help="JSONL file to write the predictions to")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument(
+        "--max-tokens", type=int, default=4096, help="estimated tokens per request"
+    )
+    parser.add_argument(
+        "--max-instances", type=int, default=64, help="instances per request"
+    )
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    n_predictions = asyncio.run(
+        predict_to_file(
+            read_instances(args.infile),
+            args.outfile,
+            args.url,
+            concurrency=args.concurrency,
+            max_tokens=args.max_tokens,
+            max_instances=args.max_instances,
+            max_retries=args.retries,
+            timeout=args.timeout,
+        )
+    )
+    print(f"Wrote {n_predictions} predictions to {args.outfile}")
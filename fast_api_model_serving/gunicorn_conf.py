@@ -0,0 +1,62 @@
+# gunicorn configuration for serving the GovNER API with several uvicorn workers.
+#
+# The app (and so the spacy models) is loaded once in the gunicorn master process,
+# and the workers are forked from it, sharing the model weights copy-on-write
+# instead of each loading its own copy.
+#
+# From this sub-directory, run:
+# gunicorn -c gunicorn_conf.py main:app
+#
+# Ref: https://docs.gunicorn.org/en/stable/settings.html
+
+import gc
+import multiprocessing
+import os
+
+from src.model_helpers import set_torch_threads, threads_per_worker
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# load the models in the master, before forking the workers
+preload_app = True
+# loading the transformer models and processing large batches can be slow
+timeout = int(os.getenv("TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = "-"
+errorlog = "-"
+
+# torch threads per worker, defaults to an equal share of the CPUs
+torch_threads = int(os.getenv("TORCH_NUM_THREADS", "0")) or threads_per_worker(
+    workers, multiprocessing.cpu_count()
+)
+
+
+# this file is read by the master before it loads the app: no garbage collection
+# while the models are loaded, so that it does not leave holes in the pages the
+# workers will share (https://docs.python.org/3/library/gc.html#gc.freeze)
+gc.disable()
+
+
+def when_ready(server):
+    # once, after the app is preloaded and before the first fork: move everything
+    # loaded so far (the models) to a permanent generation ignored by the garbage
+    # collector; otherwise its scans touch the shared pages and the workers end up
+    # with private copies. The workers, and respawned ones, inherit it.
+    gc.freeze()
+    gc.enable()
+
+
+def post_fork(server, worker):
+    set_torch_threads(torch_threads)
+    server.log.info(f"Worker {worker.pid}: {torch_threads} torch threads")
+
+
+def child_exit(server, worker):
+    # drop the live gauges of a dead worker from the aggregated Prometheus metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -6,11 +6,62 @@
 # uvicorn main:app --reload
 # http://localhost:8000/docs
 
-from typing import Union, Any
-from fastapi import FastAPI
-import spacy
-from pydantic import BaseModel, HttpUrl, Field
-from src.model_helpers import combine_ner_components
+# To run with several worker processes sharing the models:
+# gunicorn -c gunicorn_conf.py main:app
+
+import hmac
+import threading
+from typing import Any, Sequence, Union
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from spacy.language import Language
+from src.config import (
+    ADMIN_TOKEN,
+    BATCH_SIZE,
+    CHUNK_CHARS,
+    FAST_SERIALISATION,
+    MAX_REQUEST_BYTES,
+    MAX_REQUEST_CHARS,
+    MODEL_WATCH_INTERVAL,
+    NDJSON_BATCH_SIZE,
+    PHASE1_MODEL_PATH,
+    PHASE2_MODEL_PATH,
+    WARMUP_BATCH_SIZES,
+    WARMUP_ROUNDS,
+)
+from src.inference import extract_instance_entities
+from src.metrics import (
+    PrometheusMiddleware,
+    latest_metrics,
+    record_queue_wait,
+    record_request,
+)
+from src.model_store import ModelStore, load_model, record_model_info
+from src.msgpack_codec import (
+    MEDIA_TYPE as MSGPACK_MEDIA_TYPE,
+    MsgpackResponse,
+    MsgpackValidationError,
+    decode_instances,
+)
+from src.ndjson import (
+    NdjsonRequestError,
+    NdjsonStreamingResponse,
+    abatched_instances,
+    aiter_ndjson_lines,
+    astream_ndjson_predictions,
+    peek_first_batch,
+)
+from src.schemas import (
+    InputContent,
+    InputContentVertexAI,
+    OutputEntities,
+    PredictionParameters,
+    ReloadRequest,
+    ResponseEntitiesVertexAI,
+)
+from src.serialisers import FastJSONResponse, Predictions, build_prediction
+from src.warmup import warm_up
 
 # Metadata
 tags_metadata = [
@@ -22,6 +73,14 @@ tags_metadata = [
         "name": "ner-vertex-ai",
         "description": "Extract named entities from multiple documents",
     },
+    {
+        "name": "ner-ndjson",
+        "description": "Extract named entities from a stream of documents (newline-delimited JSON)",
+    },
+    {
+        "name": "ner-vertex-ai-msgpack",
+        "description": "Extract named entities from multiple documents (msgpack)",
+    },
 ]
 
 # Initialisation - create a FastAPI instance
@@ -31,122 +90,77 @@ app = FastAPI(
     openapi_tags=tags_metadata,
 )
 
-print("Load the spacy models")
-nlp_phase1 = spacy.load("models/phase1_ner_trf_model/model-best")
-nlp_phase2 = spacy.load("models/phase2_ner_trf_model/model-best")
 
-nlp = combine_ner_components(nlp_phase1, nlp_phase2)
+def warm_up_model(nlp: Language) -> None:
+    duration = warm_up(nlp, WARMUP_BATCH_SIZES, WARMUP_ROUNDS)
+    print(f"Warmed up the models in {duration:.1f} seconds")
 
-# Request Bodies - Data Model class
 
+print("Load the spacy models")
+# the models are reloaded, and warmed up before being swapped in, without restarting the app
+models = ModelStore(
+    load_model(PHASE1_MODEL_PATH, PHASE2_MODEL_PATH), prepare=warm_up_model
+)
+models.add_swap_hook(record_model_info)
+record_model_info(models.model)
 
-class InputContent(BaseModel):
-    """
-    Data model for the body prediction request.
-    """
 
-    url: Union[HttpUrl, None] = Field(
-        default=None,
-        description="Valid URL of the webpage from which the text is taken.",
-    )
-    text: str = Field(
-        description="String of text to feed to the model to extract entities."
-    )
-    line_number: Union[int, None] = Field(
-        default=None, description="Line number of the text on the webpage"
-    )
-    part_of_page: Union[str, None] = Field(
-        default=None, description="Part of page (e.g., 'title')"
-    )
+# set once the models are warmed up in this process; until then, the health check and the
+# prediction endpoints answer 503, so that no traffic is routed to a cold replica
+ready = threading.Event()
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "url": "https://www.gov.uk/government/people/rishi-sunak",
-                "text": "Rishi Sunak became Prime Minister on 25 October 2022",
-                "line_number": 2,
-                "part_of_page": "title",
-            }
-        }
 
+def run_warm_up() -> None:
+    warm_up_model(models.model.nlp)
+    ready.set()
 
-class InputContentVertexAI(BaseModel):
-    """
-    JSON body format of prediction requests for Vertex AI.
-    Ref: https://cloud.google.com/vertex-ai/docs/predictions/custom-container-requirements
-    """
 
-    instances: list[InputContent]
+@app.on_event("startup")
+async def start_warm_up() -> None:
+    # in each worker process, after the fork, where torch and the allocator are used;
+    # in a thread, so that the health check can answer while the models warm up
+    if WARMUP_ROUNDS > 0:
+        threading.Thread(target=run_warm_up, daemon=True).start()
+    else:
+        ready.set()
+    # threads do not survive the fork, so each worker watches the models itself
+    if MODEL_WATCH_INTERVAL > 0:
+        models.watch(MODEL_WATCH_INTERVAL)
 
 
-# Response Data Models
+def require_ready() -> None:
+    """Rejects the prediction requests received before the end of the warm-up."""
+    if not ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="The models are warming up.",
+            headers={"Retry-After": "5"},
+        )
 
 
-class SingleEntity(BaseModel):
+def to_response(content: Any) -> Any:
     """
-    Basic response data model: returns the entities, their type and their locations.
+    Renders the response dataclasses with orjson in fast-serialisation mode;
+    otherwise, lets FastAPI validate them against the endpoint's `response_model`.
     """
+    if FAST_SERIALISATION:
+        return FastJSONResponse(content)
+    return content
 
-    name: str = Field(description="Name/text of the extracted entity instance.")
-    type: str = Field(
-        description="The entity type with which the entity name was tagged."
-    )
-    start: int = Field(
-        ge=0, description="The index of the first token of the entity name."
-    )
-    end: int = Field(description="The index of the last token of the entity name.")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "name": "25 October 2022",
-                "type": "DATE",
-                "start": 37,
-                "end": 52,
-            }
-        }
-
-
-class OutputEntities(BaseModel):
-    """
-    Response data model for a single document input: structure of responses that will be sent back by the server.
-    """
-
-    url: Union[HttpUrl, None] = Field(
-        default=None,
-        description="Valid URL of the webpage from which the text is taken.",
-    )
-    entities: list[SingleEntity]
-    line_number: Union[int, None] = Field(
-        default=None, description="Line number of the text on the webpage"
-    )
-    part_of_page: Union[str, None] = Field(
-        default=None, description="Part of page (e.g., 'title')"
-    )
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "url": "https://www.gov.uk/government/people/rishi-sunak",
-                "entities": [
-                    {"name": "Rishi Sunak", "type": "PERSON", "start": 0, "end": 11},
-                    {"name": "Prime Minister", "type": "TITLE", "start": 19, "end": 33},
-                    {"name": "25 October 2022", "type": "DATE", "start": 37, "end": 52},
-                ],
-                "line_number": 2,
-                "part_of_page": "text",
-            }
-        }
-
-
-class ResponseEntitiesVertexAI(BaseModel):
+def admit_request(request: Request, texts: Sequence[str]) -> None:
     """
-    JSON body format of prediction response for Vertex AI.
-    Response data model for multiple documents.
-    Ref: https://cloud.google.com/vertex-ai/docs/predictions/custom-container-requirements
+    Rejects a prediction request with more than MAX_REQUEST_CHARS characters of text,
+    before any inference, and records its metrics otherwise.
     """
-
-    predictions: list[OutputEntities]
+    n_characters = sum(len(text) for text in texts)
+    if n_characters > MAX_REQUEST_CHARS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"The texts have {n_characters} characters in total, "
+            f"the limit is {MAX_REQUEST_CHARS}.",
+        )
+    record_request(getattr(request.state, "received_at", None), n_characters)
 
 
 # Request paths
@@ -159,57 +173,230 @@ async def root():
 # GET endpoint for app health check to ensure server is running
 @app.get("/health-check", status_code=200)
 async def health_check():
-    return {"response": "HTTP 200 OK"}
+    model = models.model
+    status = {
+        "model_version": model.version,
+        "model_generation": model.generation,
+        "model_reloading": models.reloading,
+        "model_reload_error": models.last_error,
+    }
+    if not ready.is_set():
+        return JSONResponse(
+            {"response": "HTTP 503 Warming up", **status}, status_code=503
+        )
+    return {"response": "HTTP 200 OK", **status}
+
+
+# GET endpoint for Prometheus to scrape the metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(latest_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 # POST endpoints for predictions
 
 
-@app.post("/ner", tags=["ner"], response_model=OutputEntities)
-async def get_entities_one_doc(input: InputContent) -> Any:
-    document = nlp(input.text)
-    entities = [
-        {
-            "name": ent.text,
-            "type": ent.label_,
-            "start": ent.start_char,
-            "end": ent.end_char,
-        }
-        for ent in document.ents
-    ]
-    return {
-        "url": input.url,
-        "entities": entities,
-        "line_number": input.line_number,
-        "part_of_page": input.part_of_page,
-    }
+@app.post(
+    "/ner",
+    tags=["ner"],
+    response_model=OutputEntities,
+    dependencies=[Depends(require_ready)],
+)
+async def get_entities_one_doc(input: InputContent, request: Request) -> Any:
+    admit_request(request, [input.text])
+    nlp = models.model.nlp
+    entities = extract_instance_entities(nlp, [input], BATCH_SIZE, CHUNK_CHARS)[0]
+    return to_response(build_prediction(input, entities))
 
 
 @app.post(
-    "/ner-vertex-ai", tags=["ner-vertex-ai"], response_model=ResponseEntitiesVertexAI
+    "/ner-vertex-ai",
+    tags=["ner-vertex-ai"],
+    response_model=ResponseEntitiesVertexAI,
+    dependencies=[Depends(require_ready)],
 )
-async def get_entities(input: InputContentVertexAI) -> Any:
-    documents = [nlp(instance.text) for instance in input.instances]
-    entities = [
-        [
-            {
-                "name": ent.text,
-                "type": ent.label_,
-                "start": ent.start_char,
-                "end": ent.end_char,
-            }
-            for ent in document.ents
-        ]
-        for document in documents
-    ]
-    return {
-        "predictions": [
-            {
-                "url": instance.url,
-                "entities": ents,
-                "line_number": instance.line_number,
-                "part_of_page": instance.part_of_page,
+async def get_entities(input: InputContentVertexAI, request: Request) -> Any:
+    admit_request(request, [instance.text for instance in input.instances])
+    parameters = input.parameters or PredictionParameters()
+    entities = extract_instance_entities(
+        models.model.nlp,
+        input.instances,
+        BATCH_SIZE,
+        CHUNK_CHARS,
+        parameters.phases,
+        parameters.labels,
+    )
+    return to_response(
+        Predictions(
+            [
+                build_prediction(instance, document_entities)
+                for instance, document_entities in zip(input.instances, entities)
+            ]
+        )
+    )
+
+
+REQUEST_TOO_LARGE = f"The request body is larger than {MAX_REQUEST_BYTES} bytes."
+
+
+def check_content_length(request: Request) -> None:
+    """
+    Rejects a request whose content-length header is not a number (400), or announces
+    a body larger than MAX_REQUEST_BYTES bytes (413). The body of a request without
+    the header is limited as it is read.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        return
+    if not (content_length.isascii() and content_length.isdigit()):
+        raise HTTPException(
+            status_code=400, detail="The content-length header is not a number."
+        )
+    if int(content_length) > MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail=REQUEST_TOO_LARGE)
+
+
+async def read_body(request: Request) -> bytearray:
+    """
+    Reads the raw body of a request, rejecting it as soon as it is larger than
+    MAX_REQUEST_BYTES bytes.
+    """
+    check_content_length(request)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        # request without a content-length header
+        if len(body) > MAX_REQUEST_BYTES:
+            raise HTTPException(status_code=413, detail=REQUEST_TOO_LARGE)
+    return body
+
+
+@app.post(
+    "/ner-ndjson",
+    tags=["ner-ndjson"],
+    response_class=NdjsonStreamingResponse,
+    dependencies=[Depends(require_ready)],
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/InputContent"}
+                }
+            },
+            "required": True,
+        }
+    },
+)
+async def get_entities_ndjson(request: Request) -> NdjsonStreamingResponse:
+    """
+    Takes one `InputContent` JSON object per line and streams back one `OutputEntities`
+    JSON object per line, in the same order, as each batch of documents is processed.
+    The request body is read, validated and processed batch by batch, while the
+    predictions are sent.
+    """
+    check_content_length(request)
+    batches = abatched_instances(
+        aiter_ndjson_lines(request.stream(), MAX_REQUEST_BYTES),
+        NDJSON_BATCH_SIZE,
+        MAX_REQUEST_CHARS,
+    )
+    # the errors of the first batch get a 413 or 422 response; those of the next batches,
+    # once the response has started, end the stream with an error line
+    try:
+        _, batches = await peek_first_batch(batches)
+    except NdjsonRequestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    record_queue_wait(getattr(request.state, "received_at", None))
+    # the stream keeps the model it started with until its last batch, across reloads
+    nlp = models.model.nlp
+    return NdjsonStreamingResponse(
+        astream_ndjson_predictions(nlp, batches, NDJSON_BATCH_SIZE, CHUNK_CHARS)
+    )
+
+
+@app.post(
+    "/ner-vertex-ai-msgpack",
+    tags=["ner-vertex-ai-msgpack"],
+    response_class=MsgpackResponse,
+    dependencies=[Depends(require_ready)],
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                MSGPACK_MEDIA_TYPE: {
+                    "schema": {"$ref": "#/components/schemas/InputContentVertexAI"}
+                }
+            },
+            "required": True,
+        },
+        "responses": {
+            "200": {
+                "content": {
+                    MSGPACK_MEDIA_TYPE: {
+                        "schema": {
+                            "$ref": "#/components/schemas/ResponseEntitiesVertexAI"
+                        }
+                    }
+                }
             }
-            for instance, ents in zip(input.instances, entities)
-        ]
-    }
+        },
+    },
+)
+async def get_entities_msgpack(request: Request) -> MsgpackResponse:
+    """
+    Same as `/ner-vertex-ai`, with the request and the response encoded with msgpack
+    rather than JSON, saving their encoding and decoding for high-volume callers.
+    """
+    body = await read_body(request)
+    try:
+        instances = decode_instances(body)
+    except MsgpackValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    admit_request(request, [instance.text for instance in instances])
+    entities = extract_instance_entities(
+        models.model.nlp, instances, BATCH_SIZE, CHUNK_CHARS
+    )
+    return MsgpackResponse(
+        Predictions(
+            [
+                build_prediction(instance, document_entities)
+                for instance, document_entities in zip(instances, entities)
+            ]
+        )
+    )
+
+
+# Admin endpoints
+
+
+def require_admin(authorization: Union[str, None] = Header(default=None)) -> None:
+    """Accepts only the requests with the `ADMIN_TOKEN` bearer token, if one is set."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if authorization is None or not hmac.compare_digest(
+        authorization, f"Bearer {ADMIN_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+@app.post(
+    "/admin/reload",
+    status_code=202,
+    include_in_schema=False,
+    dependencies=[Depends(require_admin)],
+)
+async def reload_models(reload_request: Union[ReloadRequest, None] = None):
+    """
+    Reloads the models of the worker serving the request, in the background: the
+    current models keep serving until the new ones are loaded and warmed up.
+    Poll `/health-check` for the new `model_version`.
+    """
+    reload_request = reload_request or ReloadRequest()
+    if not models.start_reload(
+        reload_request.phase1_model_path, reload_request.phase2_model_path
+    ):
+        raise HTTPException(status_code=409, detail="A reload is already in progress.")
+    return {"response": "Reloading", "model_version": models.model.version}
+
+
+# record the request metrics of all the paths defined above
+app.add_middleware(PrometheusMiddleware, paths=[route.path for route in app.routes])
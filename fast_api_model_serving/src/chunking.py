@@ -0,0 +1,75 @@
+"""
+Splitting of long texts into pieces for inference.
+
+A whole manual posted as one text would become one huge spacy Doc, with transformer
+span windows over all of it and unbounded memory. Instead, long texts are cut into
+pieces of at most `max_chars` characters, preferably at the end of a sentence or line,
+otherwise at a whitespace, and the pieces are batched through `nlp.pipe` with the other texts.
+The pieces are contiguous slices of the text, so the entities found in a piece only need
+shifting by the piece's offset to be in the coordinates of the original text.
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+# end of a sentence or of a line, followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?:[.!?;:](?=\s)|\n)\s*")
+WHITESPACE = re.compile(r"\s+")
+
+
+def split_text(text: str, max_chars: int) -> List[Tuple[int, str]]:
+    """
+    Splits a text into contiguous pieces of at most `max_chars` characters.
+
+    Args:
+        text: the text to split
+        max_chars: the maximum length of a piece
+
+    Returns:
+        A list of (offset of the piece in the text, piece) tuples. Joined, the pieces
+        are the original text.
+
+    >>> split_text("One. Two. Three.", 10)
+    [(0, 'One. Two. '), (10, 'Three.')]
+    """
+    pieces = []
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start : start + max_chars]
+        end = _last_match_end(SENTENCE_BOUNDARY, window) or _last_match_end(
+            WHITESPACE, window
+        )
+        # no boundary in the window: hard cut
+        end = end or max_chars
+        pieces.append((start, window[:end]))
+        start += end
+    pieces.append((start, text[start:]))
+    return pieces
+
+
+def _last_match_end(pattern: re.Pattern, window: str) -> int:
+    ends = [match.end() for match in pattern.finditer(window)]
+    return ends[-1] if ends else 0
+
+
+def split_texts(
+    texts: Sequence[str], max_chars: int
+) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Splits the texts longer than `max_chars` into pieces (see `split_text`).
+
+    Returns:
+        The list of all the pieces, in order, and for each piece the
+        (index of its text in `texts`, offset of the piece in that text) tuple.
+    """
+    pieces = []
+    origins = []
+    for index, text in enumerate(texts):
+        if len(text) <= max_chars:
+            pieces.append(text)
+            origins.append((index, 0))
+            continue
+        for offset, piece in split_text(text, max_chars):
+            pieces.append(piece)
+            origins.append((index, offset))
+    return pieces, origins
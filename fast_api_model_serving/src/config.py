@@ -0,0 +1,48 @@
+# Configuration of the GovNER API, read from environment variables at start-up.
+
+import os
+
+# paths to the trained spacy pipelines of the phase-1 and phase-2 entities
+PHASE1_MODEL_PATH = os.getenv(
+    "PHASE1_MODEL_PATH", "models/phase1_ner_trf_model/model-best"
+)
+PHASE2_MODEL_PATH = os.getenv(
+    "PHASE2_MODEL_PATH", "models/phase2_ner_trf_model/model-best"
+)
+
+# number of texts passed to spacy's `Language.pipe` at a time
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+# number of texts processed, and streamed back, at a time by the streaming endpoint
+NDJSON_BATCH_SIZE = int(os.getenv("NDJSON_BATCH_SIZE", str(BATCH_SIZE)))
+
+# build responses with orjson and dataclasses, skipping the pydantic response-model validation
+FAST_SERIALISATION = os.getenv("FAST_SERIALISATION", "true").lower() == "true"
+
+# texts longer than this are split into sentence- or window-sized pieces before inference
+# and their entities shifted back to the offsets of the original text (0 to disable)
+CHUNK_CHARS = int(os.getenv("CHUNK_CHARS", "2000"))
+
+# hard limits, rejecting abusive requests before any inference
+# maximum number of characters of one text (422 otherwise)
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "100000"))
+# maximum number of instances of a /ner-vertex-ai request (422 otherwise)
+MAX_INSTANCES = int(os.getenv("MAX_INSTANCES", "1000"))
+# maximum number of characters of text of a request (413 otherwise)
+MAX_REQUEST_CHARS = int(os.getenv("MAX_REQUEST_CHARS", "1000000"))
+# maximum size of the body of a /ner-ndjson or /ner-vertex-ai-msgpack request (413 otherwise)
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", "20000000"))
+
+# warm-up at start-up, before the app reports itself ready (see `src.warmup`)
+# number of times each batch size is warmed up (0 to disable the warm-up)
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "1"))
+# batch sizes to warm up, comma-separated
+WARMUP_BATCH_SIZES = [
+    int(batch_size)
+    for batch_size in os.getenv("WARMUP_BATCH_SIZES", f"1,8,{BATCH_SIZE}").split(",")
+]
+
+# hot reload of the models (see `src.model_store`)
+# seconds between checks of the meta.json of the models, reloading them on change (0 to disable)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+# bearer token of the admin endpoints (disabled if empty)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
@@ -0,0 +1,156 @@
+from time import perf_counter
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+from spacy.language import Language
+from spacy.tokens import Doc
+
+from .chunking import split_texts
+from .metrics import (
+    BATCH_SIZE,
+    DUPLICATE_TEXTS,
+    ENTITIES_PER_DOCUMENT,
+    INFERENCE_LATENCY,
+    TEXTS,
+)
+from .model_helpers import components_to_disable, inference_mode
+from .serialisers import Entity
+
+
+def get_entities_from_doc(doc: Doc, offset: int = 0) -> List[Entity]:
+    """
+    Returns the named entities found in a spacy Doc, in the format of the API response.
+
+    Args:
+        doc: a spacy Doc processed by a pipeline with at least one NER component
+        offset: number of characters to shift the entity offsets by, when the Doc
+            is a piece of a longer text starting at `offset`
+
+    Returns:
+        A list of Entity(name, type, start, end), where "start" and "end"
+        are character offsets in the Doc text (plus `offset`).
+    """
+    return [
+        Entity(ent.text, ent.label_, ent.start_char + offset, ent.end_char + offset)
+        for ent in doc.ents
+    ]
+
+
+def extract_entities(
+    nlp: Language,
+    texts: Sequence[str],
+    batch_size: int,
+    chunk_chars: int = 0,
+    disable: Sequence[str] = (),
+) -> List[List[Entity]]:
+    """
+    The inference core shared by all the prediction endpoints: runs a batch of texts
+    through the spacy pipeline and returns the entities of each text, in order.
+
+    Identical texts (headers, "Contact", repeated table cells...) are run through the
+    pipeline once, and their entities copied to each of them.
+
+    Args:
+        nlp: the spacy pipeline to extract the entities with
+        texts: the texts to extract the entities from
+        batch_size: the batch size passed to `nlp.pipe`
+        chunk_chars: if > 0, texts longer than this are split into pieces
+            (see `src.chunking`), and their entities merged back
+        disable: names of the pipeline components not to run
+
+    Returns:
+        A list with the list of entities of each text.
+    """
+    # index of each text among the distinct texts, in order of first occurrence
+    unique_indices = {}
+    positions = [unique_indices.setdefault(text, len(unique_indices)) for text in texts]
+    unique_texts = list(unique_indices)
+    if chunk_chars > 0:
+        pieces, origins = split_texts(unique_texts, chunk_chars)
+    else:
+        pieces = unique_texts
+        origins = [(index, 0) for index in range(len(unique_texts))]
+
+    unique_entities = [[] for _ in unique_texts]
+    # the batches of `nlp.pipe`, timed one by one
+    for batch_start in range(0, len(pieces), batch_size):
+        batch = pieces[batch_start : batch_start + batch_size]
+        start = perf_counter()
+        with inference_mode():
+            documents = list(
+                nlp.pipe(batch, batch_size=batch_size, disable=list(disable))
+            )
+        INFERENCE_LATENCY.observe(perf_counter() - start)
+        BATCH_SIZE.observe(len(batch))
+        for (index, offset), document in zip(
+            origins[batch_start : batch_start + batch_size], documents
+        ):
+            unique_entities[index].extend(get_entities_from_doc(document, offset))
+    entities = [list(unique_entities[position]) for position in positions]
+
+    TEXTS.inc(len(texts))
+    for document_entities in entities:
+        ENTITIES_PER_DOCUMENT.observe(len(document_entities))
+    return entities
+
+
+def extract_instance_entities(
+    nlp: Language,
+    instances: Sequence,
+    batch_size: int,
+    chunk_chars: int = 0,
+    phases: Optional[Collection[int]] = None,
+    labels: Optional[Collection[str]] = None,
+) -> List[List[Entity]]:
+    """
+    Extracts the entities of instances which may select the phases and/or entity types
+    to extract (see `components_to_disable`). The instances that need the same components
+    are run through the pipeline together, with the other components disabled.
+
+    Args:
+        nlp: the pipeline returned by `combine_ner_components`
+        instances: `InputContent`-like instances, with a `text` and optional
+            `phases` and `labels`
+        batch_size: the batch size passed to `nlp.pipe`
+        chunk_chars: if > 0, texts longer than this are split into pieces
+        phases, labels: the selection of the instances that have none of their own
+
+    Returns:
+        A list with the list of entities of each instance, of the selected types only.
+
+    The texts not run through the pipeline, being duplicates of another text of their
+    group, are recorded once for all the groups.
+    """
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    selections = []
+    disables = {}
+    for index, instance in enumerate(instances):
+        selection = (
+            phases if instance.phases is None else instance.phases,
+            labels if instance.labels is None else instance.labels,
+        )
+        key = tuple(
+            None if values is None else frozenset(values) for values in selection
+        )
+        if key not in disables:
+            disables[key] = components_to_disable(nlp, *key)
+        groups.setdefault(disables[key], []).append(index)
+        selections.append(key[1])
+
+    entities: List[List[Entity]] = [[] for _ in instances]
+    duplicate_texts = 0
+    for disable, indices in groups.items():
+        texts = [instances[index].text for index in indices]
+        duplicate_texts += len(texts) - len(set(texts))
+        for index, document_entities in zip(
+            indices, extract_entities(nlp, texts, batch_size, chunk_chars, disable)
+        ):
+            selected_labels = selections[index]
+            if selected_labels is not None:
+                document_entities = [
+                    entity
+                    for entity in document_entities
+                    if entity.type in selected_labels
+                ]
+            entities[index] = document_entities
+    DUPLICATE_TEXTS.observe(duplicate_texts)
+    return entities
@@ -0,0 +1,177 @@
+"""
+Prometheus metrics of the GovNER API, exposed by the `/metrics` endpoint.
+
+Request-level metrics are recorded by `PrometheusMiddleware`, a plain ASGI middleware
+(cheaper than Starlette's BaseHTTPMiddleware, and it does not buffer streamed responses);
+model-level metrics are recorded by the inference core, in `src.inference`.
+
+When the app runs with several gunicorn workers, set the environment variable
+`PROMETHEUS_MULTIPROC_DIR` to an empty directory so that the metrics of all workers are aggregated.
+Ref: https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn
+"""
+
+import os
+from time import perf_counter
+from typing import Iterable, Optional
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+CHARACTER_BUCKETS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1e6)
+
+REQUEST_LATENCY = Histogram(
+    "ner_request_latency_seconds",
+    "Time to serve a request, from receiving it to sending the last byte of the response.",
+    ["path", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "ner_requests_in_progress",
+    "Number of requests being served.",
+    multiprocess_mode="livesum",
+)
+QUEUE_WAIT = Histogram(
+    "ner_queue_wait_seconds",
+    "Time between receiving a prediction request and starting its inference.",
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_CHARACTERS = Histogram(
+    "ner_request_characters",
+    "Number of characters of text in a prediction request.",
+    buckets=CHARACTER_BUCKETS,
+)
+INFERENCE_LATENCY = Histogram(
+    "ner_inference_latency_seconds",
+    "Time to run a batch of texts through the spacy pipeline.",
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "ner_batch_size",
+    "Number of texts in a batch run through the spacy pipeline.",
+    buckets=COUNT_BUCKETS,
+)
+ENTITIES_PER_DOCUMENT = Histogram(
+    "ner_entities_per_document",
+    "Number of entities extracted from a text.",
+    buckets=COUNT_BUCKETS,
+)
+DUPLICATE_TEXTS = Histogram(
+    "ner_duplicate_texts",
+    "Number of texts of a request (or of a /ner-ndjson batch) not run through the "
+    "spacy pipeline, being duplicates of another text of the request.",
+    buckets=COUNT_BUCKETS,
+)
+TEXTS = Counter("ner_texts", "Number of texts processed by the inference core.")
+MODEL_RELOADS = Counter(
+    "ner_model_reloads",
+    "Number of hot reloads of the models, by status (success or error).",
+    ["status"],
+)
+MODEL_INFO = Gauge(
+    "ner_model_info",
+    "Loaded NER models (always 1), labelled by phase, name and version.",
+    ["phase", "name", "version"],
+    multiprocess_mode="max",
+)
+
+
+def set_model_info(phase: str, meta: dict, loaded: bool = True) -> None:
+    """
+    Records the name and version of a loaded NER model, from its meta.json
+    (`Language.meta`), or with `loaded=False`, of a model replaced by a reload.
+    """
+    MODEL_INFO.labels(
+        phase=phase,
+        name=meta.get("name", ""),
+        version=meta.get("version", ""),
+    ).set(1 if loaded else 0)
+
+
+def record_request(received_at: Optional[float], n_characters: int) -> None:
+    """
+    Records the queue wait and the number of characters of a prediction request,
+    just before its inference starts.
+
+    Args:
+        received_at: the `perf_counter()` time the request was received at, as set by
+            `PrometheusMiddleware` in `request.state` (None if the middleware is not installed)
+        n_characters: the total number of characters of the texts of the request
+    """
+    record_queue_wait(received_at)
+    record_request_characters(n_characters)
+
+
+def record_queue_wait(received_at: Optional[float]) -> None:
+    """
+    Records the queue wait of a prediction request, just before its inference starts
+    (see `record_request`).
+    """
+    if received_at is not None:
+        QUEUE_WAIT.observe(perf_counter() - received_at)
+
+
+def record_request_characters(n_characters: int) -> None:
+    """
+    Records the number of characters of a prediction request: that of a streamed request
+    once its whole body has been read (see `record_request`).
+    """
+    REQUEST_CHARACTERS.observe(n_characters)
+
+
+def latest_metrics() -> bytes:
+    """Returns the metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording the latency and the number of in-progress HTTP requests.
+    It also stores the time each request was received at as `request.state.received_at`.
+
+    Args:
+        app: the ASGI app to wrap
+        paths: the paths to label the metrics with; any other path is labelled "other",
+            so that unknown URLs cannot blow up the number of time series.
+    """
+
+    def __init__(self, app, paths: Iterable[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        received_at = perf_counter()
+        scope.setdefault("state", {})["received_at"] = received_at
+        path = scope["path"] if scope["path"] in self.paths else "other"
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            REQUEST_LATENCY.labels(path=path, status=status).observe(
+                perf_counter() - received_at
+            )
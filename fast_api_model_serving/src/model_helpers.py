@@ -1,5 +1,13 @@
+from contextlib import nullcontext
+from typing import Collection, ContextManager, Optional, Tuple
+
 from spacy.language import Language
 
+# the components of each phase in the pipeline combined by `combine_ner_components`:
+# phase 1 is the NER of the first pipeline, listening to that pipeline's transformer,
+# phase 2 is the NER of the second pipeline, with its own copy of its transformer
+PHASE_COMPONENTS = {1: ("transformer", "ner"), 2: ("ner_2",)}
+
 
 def combine_ner_components(ner_trf1: Language, ner_trf2: Language) -> Language:
     """
@@ -23,3 +31,67 @@ def combine_ner_components(ner_trf1: Language, ner_trf2: Language) -> Language:
     ner_trf1.add_pipe("ner", name="ner_2", source=ner_trf2, before="ner")
     print(ner_trf1.pipe_names)
     return ner_trf1
+
+
+def components_to_disable(
+    nlp: Language,
+    phases: Optional[Collection[int]] = None,
+    labels: Optional[Collection[str]] = None,
+) -> Tuple[str, ...]:
+    """
+    Returns the components of the combined pipeline that are not needed to extract
+    the entities of some phases and/or some entity types, to be passed to `nlp.pipe`
+    as `disable`.
+
+    Args:
+        nlp: the pipeline returned by `combine_ner_components`
+        phases: the phases (1 and/or 2) to run; all of them if None
+        labels: the entity types to extract; only the phases with at least one of
+            them are run. All of them if None
+
+    Returns:
+        The names of the components of the phases not to run.
+    """
+    disable = []
+    for phase, components in PHASE_COMPONENTS.items():
+        ner = components[-1]
+        if ner not in nlp.pipe_names:
+            continue
+        needed = (phases is None or phase in phases) and (
+            labels is None or not set(labels).isdisjoint(nlp.get_pipe(ner).labels)
+        )
+        if not needed:
+            disable.extend(name for name in components if name in nlp.pipe_names)
+    return tuple(disable)
+
+
+def inference_mode() -> ContextManager:
+    """
+    Returns a context in which torch does not track gradients, to be entered around
+    each call of `nlp.pipe`: torch's gradient mode is thread-local, so it must be set
+    by the thread running the inference (e.g. a threadpool worker or the warm-up thread).
+    """
+    try:
+        import torch
+    except ImportError:  # no transformer components, e.g. stand-in models
+        return nullcontext()
+    return torch.no_grad()
+
+
+def threads_per_worker(n_workers: int, n_cpus: int) -> int:
+    """
+    Returns an equal share of the CPUs for each of `n_workers` processes (at least 1),
+    so that the workers' torch thread pools do not oversubscribe the cores.
+    """
+    return max(1, n_cpus // max(1, n_workers))
+
+
+def set_torch_threads(n_threads: int) -> None:
+    """
+    Sets the number of torch intra-op threads of the calling process.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(n_threads)
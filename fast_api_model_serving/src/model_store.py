@@ -0,0 +1,218 @@
+"""
+Hot reload of the models, without restarting the serving process.
+
+`ModelStore` holds the combined pipeline served by the process, as an immutable
+`LoadedModel`. A reload loads the new models and prepares them (the warm-up) in a
+background thread, off the request path, then swaps the reference in one assignment.
+Each request takes the reference once and runs all its batches on that model, so the
+requests in flight when the swap happens finish on the old model, which is freed once
+the last of them is done. A failed reload keeps the old model.
+
+A reload is triggered by a call to `reload`/`start_reload` (e.g. from an admin
+endpoint), or by `watch`, when the `meta.json` of either model changes on disk.
+Code that caches results by model version registers a swap hook to invalidate them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from time import time
+from typing import Callable, List, Optional, Tuple
+
+import spacy
+from spacy.language import Language
+
+from .metrics import MODEL_RELOADS, set_model_info
+from .model_helpers import combine_ner_components
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """A combined pipeline, with the paths and meta.json of the models it was loaded from."""
+
+    nlp: Language
+    phase1_path: str
+    phase2_path: str
+    metas: Tuple[dict, dict]
+    # fingerprint of the meta.json of both models, which hold their training scores
+    version: str
+    # number of reloads before this model was loaded
+    generation: int
+    loaded_at: float
+
+
+def model_version(metas: Tuple[dict, dict]) -> str:
+    """Returns a short fingerprint of the meta.json of the phase-1 and phase-2 models."""
+    content = json.dumps(metas, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(content).hexdigest()[:12]
+
+
+def load_model(phase1_path: str, phase2_path: str, generation: int = 0) -> LoadedModel:
+    """Loads the phase-1 and phase-2 models and combines them (see `combine_ner_components`)."""
+    nlp_phase1 = spacy.load(phase1_path)
+    nlp_phase2 = spacy.load(phase2_path)
+    metas = (dict(nlp_phase1.meta), dict(nlp_phase2.meta))
+    return LoadedModel(
+        nlp=combine_ner_components(nlp_phase1, nlp_phase2),
+        phase1_path=phase1_path,
+        phase2_path=phase2_path,
+        metas=metas,
+        version=model_version(metas),
+        generation=generation,
+        loaded_at=time(),
+    )
+
+
+def record_model_info(new: LoadedModel, old: Optional[LoadedModel] = None) -> None:
+    """Swap hook updating the `ner_model_info` metric."""
+    if old is not None:
+        for phase, meta in zip(("1", "2"), old.metas):
+            set_model_info(phase, meta, loaded=False)
+    for phase, meta in zip(("1", "2"), new.metas):
+        set_model_info(phase, meta)
+
+
+def model_files_fingerprint(*paths: str) -> Optional[tuple]:
+    """
+    Returns the modification time and size of the meta.json of each model directory,
+    or None if any of them is missing (e.g. while a model is being copied).
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(os.path.join(path, "meta.json"))
+        except FileNotFoundError:
+            return None
+        fingerprint.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+SwapHook = Callable[[LoadedModel, LoadedModel], None]
+
+
+class ModelStore:
+    """
+    Holds the model served by the process and swaps it atomically on reload.
+
+    Args:
+        model: the initially loaded model
+        prepare: called on the pipeline of a newly loaded model, before it is swapped
+            in (e.g. the warm-up)
+    """
+
+    def __init__(
+        self, model: LoadedModel, prepare: Optional[Callable[[Language], None]] = None
+    ):
+        self._model = model
+        self._prepare = prepare
+        self._hooks: List[SwapHook] = []
+        self._reload_lock = threading.Lock()
+        self.last_error: Optional[str] = None
+
+    @property
+    def model(self) -> LoadedModel:
+        """The current model; take it once per request, and use it for the whole request."""
+        return self._model
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def add_swap_hook(self, hook: SwapHook) -> None:
+        """Registers a function called with (new model, old model) after each swap."""
+        self._hooks.append(hook)
+
+    def reload(
+        self, phase1_path: Optional[str] = None, phase2_path: Optional[str] = None
+    ) -> Optional[LoadedModel]:
+        """
+        Loads and prepares the models (from the paths of the current model by default),
+        then swaps them in. Blocks until the swap; raises the loading error, keeping the
+        current model, if the new models cannot be loaded.
+
+        Returns:
+            The new model, or None if another reload is already in progress.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return None
+        try:
+            old = self._model
+            try:
+                new = load_model(
+                    phase1_path or old.phase1_path,
+                    phase2_path or old.phase2_path,
+                    old.generation + 1,
+                )
+                if self._prepare is not None:
+                    self._prepare(new.nlp)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                MODEL_RELOADS.labels(status="error").inc()
+                raise
+            self._model = new
+            self.last_error = None
+            MODEL_RELOADS.labels(status="success").inc()
+            for hook in self._hooks:
+                hook(new, old)
+            return new
+        finally:
+            self._reload_lock.release()
+
+    def start_reload(
+        self, phase1_path: Optional[str] = None, phase2_path: Optional[str] = None
+    ) -> bool:
+        """
+        Starts a reload in a background thread.
+
+        Returns:
+            False if a reload is already in progress, True otherwise.
+        """
+        if self.reloading:
+            return False
+        threading.Thread(
+            target=self._reload_in_background,
+            args=(phase1_path, phase2_path),
+            daemon=True,
+        ).start()
+        return True
+
+    def _reload_in_background(
+        self, phase1_path: Optional[str], phase2_path: Optional[str]
+    ) -> None:
+        try:
+            model = self.reload(phase1_path, phase2_path)
+        except Exception:
+            print(
+                f"Failed to reload the models, keeping the current ones: {self.last_error}"
+            )
+            return
+        if model is not None:
+            print(f"Reloaded the models: version {model.version}")
+
+    def watch(self, interval: float, stop: Optional[threading.Event] = None) -> None:
+        """
+        Starts a daemon thread checking the meta.json of the current models every
+        `interval` seconds, and reloading them once a change has been stable for one
+        interval (so that a model being copied is not loaded half-way).
+        """
+        threading.Thread(
+            target=self._watch, args=(interval, stop or threading.Event()), daemon=True
+        ).start()
+
+    def _watch(self, interval: float, stop: threading.Event) -> None:
+        seen, loaded, pending = None, None, None
+        while not stop.wait(interval):
+            model = self._model
+            current = model_files_fingerprint(model.phase1_path, model.phase2_path)
+            if model is not seen:
+                # first check, or the model was reloaded (possibly from other paths)
+                seen, loaded, pending = model, current, None
+            elif current is None or current == loaded:
+                pending = None
+            elif current != pending:
+                pending = current
+            else:
+                loaded, pending = current, None
+                self._reload_in_background(None, None)
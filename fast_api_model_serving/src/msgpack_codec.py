@@ -0,0 +1,199 @@
+"""
+msgpack transport of the Vertex AI-style requests and responses, for high-volume callers.
+
+The request body is the msgpack encoding of an `InputContentVertexAI` object and the
+response the msgpack encoding of a `ResponseEntitiesVertexAI` object, with the same
+field names as the JSON API (including the optional `parameters`). The instances are
+checked against the same constraints as the pydantic models (field types, MAX_TEXT_CHARS,
+MAX_INSTANCES), without building pydantic objects; the `url` is passed through as given
+rather than parsed as an `HttpUrl`.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import msgpack
+from fastapi.responses import Response
+
+from .config import MAX_INSTANCES, MAX_TEXT_CHARS
+from .model_helpers import PHASE_COMPONENTS
+
+MEDIA_TYPE = "application/x-msgpack"
+
+
+@dataclass
+class Instance:
+    """Mirrors `InputContent`."""
+
+    __slots__ = ("url", "text", "line_number", "part_of_page", "phases", "labels")
+    url: Optional[str]
+    text: str
+    line_number: Optional[int]
+    part_of_page: Optional[str]
+    phases: Optional[List[int]]
+    labels: Optional[List[str]]
+
+
+# the type of every field of an instance; all but the text are optional
+FIELD_TYPES = {"url": str, "text": str, "line_number": int, "part_of_page": str}
+REQUIRED_FIELDS = {"text"}
+
+
+def _is_instance(value, value_type: type) -> bool:
+    """`isinstance`, except that a bool is not an int."""
+    return isinstance(value, value_type) and not isinstance(value, bool)
+
+
+class MsgpackValidationError(ValueError):
+    """Invalid msgpack request, with a list of errors in the format of pydantic's."""
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _error(loc: list, msg: str, type_: str) -> dict:
+    return {"loc": ["body", *loc], "msg": msg, "type": type_}
+
+
+def _check_selection(loc: list, selection: dict) -> List[dict]:
+    """Checks the `phases` and `labels` of an instance or of the request parameters."""
+    errors = []
+    phases = selection.get("phases")
+    if phases is not None and (
+        not isinstance(phases, list)
+        or any(
+            not _is_instance(phase, int) or phase not in PHASE_COMPONENTS
+            for phase in phases
+        )
+    ):
+        errors.append(
+            _error(
+                [*loc, "phases"],
+                f"value is not a list of phases {list(PHASE_COMPONENTS)}",
+                "value_error.phases",
+            )
+        )
+    labels = selection.get("labels")
+    if labels is not None and (
+        not isinstance(labels, list)
+        or not all(isinstance(label, str) for label in labels)
+    ):
+        errors.append(
+            _error(
+                [*loc, "labels"], "value is not a valid list of str", "type_error.list"
+            )
+        )
+    return errors
+
+
+def _check_instance(index: int, instance) -> List[dict]:
+    loc = ["instances", index]
+    if not isinstance(instance, dict):
+        return [_error(loc, "value is not a valid dict", "type_error.dict")]
+    if "text" not in instance:
+        return [_error([*loc, "text"], "field required", "value_error.missing")]
+    errors = []
+    for field, field_type in FIELD_TYPES.items():
+        value = instance.get(field)
+        if value is None:
+            if field in REQUIRED_FIELDS:
+                errors.append(
+                    _error(
+                        [*loc, field],
+                        "none is not an allowed value",
+                        "type_error.none.not_allowed",
+                    )
+                )
+        elif not _is_instance(value, field_type):
+            errors.append(
+                _error(
+                    [*loc, field],
+                    f"value is not a valid {field_type.__name__}",
+                    f"type_error.{field_type.__name__}",
+                )
+            )
+    text = instance["text"]
+    if isinstance(text, str) and len(text) > MAX_TEXT_CHARS:
+        errors.append(
+            _error(
+                [*loc, "text"],
+                f"ensure this value has at most {MAX_TEXT_CHARS} characters",
+                "value_error.any_str.max_length",
+            )
+        )
+    return errors + _check_selection(loc, instance)
+
+
+def decode_instances(body: bytes) -> List[Instance]:
+    """
+    Decodes and validates the instances of a msgpack request.
+    Raises a MsgpackValidationError if the body is not a valid request.
+    """
+    try:
+        content = msgpack.unpackb(body, raw=False)
+    except ValueError as e:
+        msg = f"invalid msgpack: {e}" if str(e) else "invalid msgpack"
+        raise MsgpackValidationError([_error([], msg, "value_error.msgpack")])
+    if not isinstance(content, dict) or "instances" not in content:
+        raise MsgpackValidationError(
+            [_error(["instances"], "field required", "value_error.missing")]
+        )
+    instances = content["instances"]
+    if not isinstance(instances, list):
+        raise MsgpackValidationError(
+            [_error(["instances"], "value is not a valid list", "type_error.list")]
+        )
+    if len(instances) > MAX_INSTANCES:
+        raise MsgpackValidationError(
+            [
+                _error(
+                    ["instances"],
+                    f"ensure this value has at most {MAX_INSTANCES} items",
+                    "value_error.list.max_items",
+                )
+            ]
+        )
+    parameters = content.get("parameters") or {}
+    if not isinstance(parameters, dict):
+        raise MsgpackValidationError(
+            [_error(["parameters"], "value is not a valid dict", "type_error.dict")]
+        )
+    errors = _check_selection(["parameters"], parameters)
+    for index, instance in enumerate(instances):
+        errors.extend(_check_instance(index, instance))
+    if errors:
+        raise MsgpackValidationError(errors)
+    # the request parameters apply to the instances without a selection of their own
+    phases = parameters.get("phases")
+    labels = parameters.get("labels")
+    return [
+        Instance(
+            url=instance.get("url"),
+            text=instance["text"],
+            line_number=instance.get("line_number"),
+            part_of_page=instance.get("part_of_page"),
+            phases=phases if instance.get("phases") is None else instance["phases"],
+            labels=labels if instance.get("labels") is None else instance["labels"],
+        )
+        for instance in instances
+    ]
+
+
+def _slots_to_dict(obj) -> dict:
+    # the response dataclasses of `src.serialisers` are slotted, in the field order
+    return {slot: getattr(obj, slot) for slot in obj.__slots__}
+
+
+def packb(content) -> bytes:
+    """Serialises a response dataclass (or any msgpack-compatible object) to msgpack bytes."""
+    return msgpack.packb(content, default=_slots_to_dict)
+
+
+class MsgpackResponse(Response):
+    """A msgpack response, for the response dataclasses of `src.serialisers`."""
+
+    media_type = MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return packb(content)
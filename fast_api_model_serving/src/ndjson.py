@@ -0,0 +1,206 @@
+"""
+Helpers for the newline-delimited JSON (NDJSON) streaming endpoint.
+
+Each line of the request body is one instance (the same fields as `InputContent`),
+each line of the response is one prediction (the same fields as `OutputEntities`).
+The endpoint chains async generators over `Request.stream()`: `aiter_ndjson_lines` splits
+the body chunks into lines as they are received, `abatched_instances` validates them into
+batches of instances, and `astream_ndjson_predictions` runs each batch through the models
+in a worker thread and yields its predictions. The body is received while the predictions
+of the previous batches are sent, so that only about one batch of lines, instances and
+spacy Docs is held in memory at any time, however many lines the request contains.
+`peek_first_batch` reads the first batch before the response starts, so that an invalid
+first line is answered with an HTTP error rather than an error line in the stream.
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, Iterator, List, Tuple, Union
+
+from pydantic import ValidationError
+from spacy.language import Language
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .inference import extract_instance_entities
+from .metrics import record_request_characters
+from .schemas import InputContent
+from .serialisers import build_prediction, dumps
+
+
+class NdjsonRequestError(Exception):
+    """
+    An invalid line of an NDJSON request, or a limit exceeded by the request, with the
+    status code and the detail of the HTTP error to answer with.
+    """
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def iter_ndjson_lines(body: Union[bytes, bytearray]) -> Iterator[bytes]:
+    """
+    Yields the non-empty lines of an NDJSON body, without the line terminators.
+    """
+    for line in body.splitlines():
+        if line.strip():
+            yield line
+
+
+async def aiter_ndjson_lines(
+    chunks: AsyncIterable[bytes], max_bytes: int
+) -> AsyncIterator[bytes]:
+    """
+    Yields the non-empty lines of an NDJSON body received in chunks (e.g.
+    `Request.stream()`), as soon as each line is complete, without the line terminators.
+
+    Raises:
+        NdjsonRequestError: 413, as soon as the body is larger than `max_bytes` bytes
+    """
+    n_bytes = 0
+    # the incomplete last line of the chunks received so far
+    pending = bytearray()
+    async for chunk in chunks:
+        n_bytes += len(chunk)
+        if n_bytes > max_bytes:
+            raise NdjsonRequestError(
+                413, f"The request body is larger than {max_bytes} bytes."
+            )
+        end = max(chunk.rfind(b"\n"), chunk.rfind(b"\r")) + 1
+        if not end:
+            pending += chunk
+            continue
+        pending += chunk[:end]
+        for line in iter_ndjson_lines(pending):
+            yield bytes(line)
+        pending = bytearray(chunk[end:])
+    for line in iter_ndjson_lines(pending):
+        yield bytes(line)
+
+
+async def aenumerate(iterable: AsyncIterable) -> AsyncIterator[Tuple[int, Any]]:
+    """`enumerate` of an async iterable."""
+    index = 0
+    async for item in iterable:
+        yield index, item
+        index += 1
+
+
+async def abatched_instances(
+    lines: AsyncIterable[bytes], batch_size: int, max_chars: int
+) -> AsyncIterator[List[InputContent]]:
+    """
+    Parses and validates the lines of an NDJSON request as `InputContent` instances, and
+    yields them in lists of (at most) `batch_size`, as soon as each list is complete.
+
+    Raises:
+        NdjsonRequestError: 422 for an invalid line, with its index among the non-empty
+            lines, or 413 as soon as the texts have more than `max_chars` characters
+    """
+    batch = []
+    n_characters = 0
+    async for line_index, line in aenumerate(lines):
+        try:
+            instance = InputContent.parse_raw(line)
+        except ValidationError as e:
+            raise NdjsonRequestError(422, {"line": line_index, "errors": e.errors()})
+        n_characters += len(instance.text)
+        if n_characters > max_chars:
+            raise NdjsonRequestError(
+                413,
+                f"The texts have at least {n_characters} characters in total, "
+                f"the limit is {max_chars}.",
+            )
+        batch.append(instance)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def peek_first_batch(
+    batches: AsyncIterator[list],
+) -> Tuple[list, AsyncIterator[list]]:
+    """
+    Reads the first batch of `batches`, so that its errors are raised before the
+    response starts.
+
+    Returns:
+        The first batch (empty if there is none), and an iterator of all the batches,
+        the first one included.
+    """
+    try:
+        first_batch = await batches.__anext__()
+    except StopAsyncIteration:
+        first_batch = []
+
+    async def all_batches() -> AsyncIterator[list]:
+        if first_batch:
+            yield first_batch
+        async for batch in batches:
+            yield batch
+
+    return first_batch, all_batches()
+
+
+def predict_ndjson_batch(
+    nlp: Language, batch: List, batch_size: int, chunk_chars: int = 0
+) -> bytes:
+    """Extracts the named entities of a batch of instances, as NDJSON lines."""
+    entities = extract_instance_entities(nlp, batch, batch_size, chunk_chars)
+    return b"".join(
+        dumps(build_prediction(instance, document_entities)) + b"\n"
+        for instance, document_entities in zip(batch, entities)
+    )
+
+
+async def astream_ndjson_predictions(
+    nlp: Language,
+    batches: AsyncIterable[List],
+    batch_size: int,
+    chunk_chars: int = 0,
+) -> AsyncIterator[bytes]:
+    """
+    Extracts the named entities from an async stream of batches of instances (see
+    `abatched_instances`) and yields the predictions of each batch as NDJSON.
+    The batches are run through the pipeline in a worker thread, so that the event loop
+    keeps receiving the request body and sending the response meanwhile.
+
+    The status of the response is sent before the first prediction: if the request turns
+    out to be invalid later on, the stream ends with one `{"error": {"status_code": ...,
+    "detail": ...}}` line, after the predictions of the previous batches.
+    The number of characters of the request is recorded at the end of the stream.
+    """
+    n_characters = 0
+    try:
+        async for batch in batches:
+            n_characters += sum(len(instance.text) for instance in batch)
+            yield await run_in_threadpool(
+                predict_ndjson_batch, nlp, batch, batch_size, chunk_chars
+            )
+    except NdjsonRequestError as e:
+        yield dumps(
+            {"error": {"status_code": e.status_code, "detail": e.detail}}
+        ) + b"\n"
+    finally:
+        record_request_characters(n_characters)
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """
+    A streaming response whose content reads the body of the request while it is sent.
+
+    `StreamingResponse` listens for the client disconnecting by receiving the request
+    messages, which would take the body chunks from the content; here the content
+    receives them all itself, and a disconnected client interrupts it as
+    `Request.stream()` raises `ClientDisconnect`.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
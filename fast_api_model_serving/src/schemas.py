@@ -0,0 +1,165 @@
+# Data models of the GovNER API requests and responses.
+# These pydantic models validate the requests and define the API's OpenAPI schema.
+
+from typing import Literal, Union
+
+from pydantic import BaseModel, Field, HttpUrl
+
+from .config import MAX_INSTANCES, MAX_TEXT_CHARS
+
+# Request Bodies - Data Model class
+
+
+class InputContent(BaseModel):
+    """
+    Data model for the body prediction request.
+    """
+
+    url: Union[HttpUrl, None] = Field(
+        default=None,
+        description="Valid URL of the webpage from which the text is taken.",
+    )
+    text: str = Field(
+        max_length=MAX_TEXT_CHARS,
+        description="String of text to feed to the model to extract entities.",
+    )
+    line_number: Union[int, None] = Field(
+        default=None, description="Line number of the text on the webpage"
+    )
+    part_of_page: Union[str, None] = Field(
+        default=None, description="Part of page (e.g., 'title')"
+    )
+    phases: Union[list[Literal[1, 2]], None] = Field(
+        default=None,
+        description="NER phases (1 and/or 2) to extract the entities of. "
+        "By default, those of the request parameters, or both.",
+    )
+    labels: Union[list[str], None] = Field(
+        default=None,
+        description="Entity types to extract (e.g., 'PERSON'); only the phases with "
+        "these types are run. By default, those of the request parameters, or all.",
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "url": "https://www.gov.uk/government/people/rishi-sunak",
+                "text": "Rishi Sunak became Prime Minister on 25 October 2022",
+                "line_number": 2,
+                "part_of_page": "title",
+            }
+        }
+
+
+class PredictionParameters(BaseModel):
+    """
+    Parameters of a prediction request for Vertex AI, applying to all its instances
+    (an instance's own `phases` and `labels` take precedence).
+    """
+
+    phases: Union[list[Literal[1, 2]], None] = Field(
+        default=None,
+        description="NER phases (1 and/or 2) to extract the entities of. By default, both.",
+    )
+    labels: Union[list[str], None] = Field(
+        default=None,
+        description="Entity types to extract (e.g., 'PERSON'); only the phases with "
+        "these types are run. By default, all.",
+    )
+
+
+class InputContentVertexAI(BaseModel):
+    """
+    JSON body format of prediction requests for Vertex AI.
+    Ref: https://cloud.google.com/vertex-ai/docs/predictions/custom-container-requirements
+    """
+
+    instances: list[InputContent] = Field(max_items=MAX_INSTANCES)
+    parameters: Union[PredictionParameters, None] = None
+
+
+# Response Data Models
+
+
+class SingleEntity(BaseModel):
+    """
+    Basic response data model: returns the entities, their type and their locations.
+    """
+
+    name: str = Field(description="Name/text of the extracted entity instance.")
+    type: str = Field(
+        description="The entity type with which the entity name was tagged."
+    )
+    start: int = Field(
+        ge=0, description="The index of the first token of the entity name."
+    )
+    end: int = Field(description="The index of the last token of the entity name.")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "name": "25 October 2022",
+                "type": "DATE",
+                "start": 37,
+                "end": 52,
+            }
+        }
+
+
+class OutputEntities(BaseModel):
+    """
+    Response data model for a single document input: structure of responses that will be sent back by the server.
+    """
+
+    url: Union[HttpUrl, None] = Field(
+        default=None,
+        description="Valid URL of the webpage from which the text is taken.",
+    )
+    entities: list[SingleEntity]
+    line_number: Union[int, None] = Field(
+        default=None, description="Line number of the text on the webpage"
+    )
+    part_of_page: Union[str, None] = Field(
+        default=None, description="Part of page (e.g., 'title')"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "url": "https://www.gov.uk/government/people/rishi-sunak",
+                "entities": [
+                    {"name": "Rishi Sunak", "type": "PERSON", "start": 0, "end": 11},
+                    {"name": "Prime Minister", "type": "TITLE", "start": 19, "end": 33},
+                    {"name": "25 October 2022", "type": "DATE", "start": 37, "end": 52},
+                ],
+                "line_number": 2,
+                "part_of_page": "text",
+            }
+        }
+
+
+class ResponseEntitiesVertexAI(BaseModel):
+    """
+    JSON body format of prediction response for Vertex AI.
+    Response data model for multiple documents.
+    Ref: https://cloud.google.com/vertex-ai/docs/predictions/custom-container-requirements
+    """
+
+    predictions: list[OutputEntities]
+
+
+# Admin Data Models
+
+
+class ReloadRequest(BaseModel):
+    """
+    Body of a model reload request: the paths of the models to load, by default
+    those of the models currently served.
+    """
+
+    phase1_model_path: Union[str, None] = Field(
+        default=None, description="Path of the phase-1 spacy pipeline."
+    )
+    phase2_model_path: Union[str, None] = Field(
+        default=None, description="Path of the phase-2 spacy pipeline."
+    )
@@ -0,0 +1,77 @@
+"""
+Fast serialisation of the API responses.
+
+The pydantic response models in `src.schemas` define the OpenAPI schema, but validating
+every entity of every prediction through them (including re-parsing each `url` as an
+`HttpUrl`) on the way out costs as much as the model for entity-dense pages.
+The typed dataclasses below mirror those response models field by field, in the same order,
+and are serialised straight to JSON bytes by orjson, bypassing response validation.
+The JSON is byte-for-byte the same as the one FastAPI renders through the pydantic models.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import orjson
+from fastapi.responses import Response
+
+
+@dataclass
+class Entity:
+    """Mirrors `SingleEntity`."""
+
+    __slots__ = ("name", "type", "start", "end")
+    name: str
+    type: str
+    start: int
+    end: int
+
+
+@dataclass
+class Prediction:
+    """Mirrors `OutputEntities`."""
+
+    __slots__ = ("url", "entities", "line_number", "part_of_page")
+    url: Optional[str]
+    entities: List[Entity]
+    line_number: Optional[int]
+    part_of_page: Optional[str]
+
+
+@dataclass
+class Predictions:
+    """Mirrors `ResponseEntitiesVertexAI`."""
+
+    __slots__ = ("predictions",)
+    predictions: List[Prediction]
+
+
+def build_prediction(instance, entities: List[Entity]) -> Prediction:
+    """
+    Builds the prediction for one input instance (`InputContent`) from its entities.
+    The validated `url` is passed on as a plain string.
+    """
+    return Prediction(
+        url=None if instance.url is None else str(instance.url),
+        entities=entities,
+        line_number=instance.line_number,
+        part_of_page=instance.part_of_page,
+    )
+
+
+def dumps(content) -> bytes:
+    """Serialises a response dataclass (or any JSON-compatible object) to JSON bytes."""
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(Response):
+    """
+    A JSON response rendered by orjson, for the response dataclasses above.
+    Returning a Response from an endpoint makes FastAPI skip the `response_model` validation,
+    while keeping the `response_model` in the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
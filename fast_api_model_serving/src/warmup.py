@@ -0,0 +1,65 @@
+"""
+Warm-up of a newly started replica.
+
+The first requests served by a fresh process are much slower than the next ones: torch
+initialises its thread pools and kernels lazily, the spacy vocab and string store grow with
+the first texts, and the memory allocator has yet to reach its steady state. `warm_up`
+pays that cost before any real request: it runs GOV.UK snippets of several lengths
+(titles, descriptions, body lines) through the pipeline, at each of the batch sizes the
+pipeline will see. The app reports itself ready only once the warm-up is over.
+"""
+
+from itertools import cycle, islice
+from time import perf_counter
+from typing import List, Sequence
+
+from spacy.language import Language
+
+from .model_helpers import inference_mode
+
+# representative GOV.UK texts, from a title to a long body paragraph
+WARMUP_SNIPPETS = [
+    "Apply for a passport",
+    "Rishi Sunak became Prime Minister on 25 October 2022",
+    "Universal Credit is a payment to help with your living costs. You may be able to get "
+    "it if you're on a low income, out of work or you cannot work.",
+    "You can contact HM Revenue and Customs by phone on 0300 200 3300, Monday to Friday, "
+    "8am to 6pm. The Department for Education will publish the guidance for schools in "
+    "England, Scotland, Wales and Northern Ireland in March 2023.",
+    " ".join(
+        [
+            "The Secretary of State for Education, the Rt Hon Gillian Keegan MP, is "
+            "responsible for the work of the Department for Education, including early "
+            "years, children's social care, teachers' pay, the school curriculum, school "
+            "improvement and the establishment of academies and free schools.",
+            "The Office for National Statistics published the Labour Force Survey results "
+            "for July to September 2022 on 15 November 2022.",
+            "Local authorities in London, Manchester and Birmingham will receive funding "
+            "under the Levelling Up Fund from April 2023.",
+        ]
+        * 3
+    ),
+]
+
+
+def warmup_texts(n_texts: int) -> List[str]:
+    """Returns `n_texts` warm-up snippets, cycling through all their lengths."""
+    return list(islice(cycle(WARMUP_SNIPPETS), n_texts))
+
+
+def warm_up(nlp: Language, batch_sizes: Sequence[int], rounds: int = 1) -> float:
+    """
+    Runs batches of warm-up snippets through a pipeline, `rounds` times for each batch size,
+    so that every code path of the first real requests has run at least once.
+    The pipeline is called directly, so the warm-up is not recorded in the model metrics.
+
+    Returns:
+        The duration of the warm-up, in seconds.
+    """
+    start = perf_counter()
+    with inference_mode():
+        for _ in range(rounds):
+            for batch_size in batch_sizes:
+                for _ in nlp.pipe(warmup_texts(batch_size), batch_size=batch_size):
+                    pass
+    return perf_counter() - start
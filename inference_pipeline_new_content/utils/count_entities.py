@@ -0,0 +1,183 @@
+"""
+Local port of `sql_queries/count_entities.txt` and of the counts update of
+`sql_queries/update_entity_accumulation.txt`, to count the entity instances per GOV.UK
+url without BigQuery.
+
+`count_entities` computes the title, description, text and total counts of each
+(url, name_lower, type, url_entity_nametype) in a single grouped pass over the entity
+instances, where the query scans them four times and joins the results.
+The rows are ordered by url and type, NULLs first, as in the query; the query leaves
+the order of the rows with the same url and type undefined, here they are ordered by
+name_lower and url_entity_nametype.
+
+`update_entity_counts` maintains the accumulated counts incrementally, as
+`update_entity_accumulation.txt` does: the counts of the urls that were re-extracted
+(the urls of the new entity instances) are replaced by their new counts, and the counts
+of the other urls are kept, without recounting them.
+
+The entity instances are the output of `postprocess_predictions.py` (Parquet or CSV).
+
+To run:
+
+```shell
+cd inference_pipeline_new_content
+python utils/count_entities.py named_entities_all.parquet named_entities_counts.parquet
+# add the counts of the newly extracted entities to the accumulated counts
+python utils/count_entities.py named_entities_all.parquet named_entities_counts.parquet \
+  --accumulated-counts-filepath accumulated_counts.parquet
+```
+"""
+
+import time
+from pathlib import Path
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import typer
+
+KEYS = ["url", "name_lower", "type", "url_entity_nametype"]
+PARTS_OF_PAGE = ["title", "description", "text"]
+
+COUNTS_SCHEMA = pa.schema(
+    [(key, pa.string()) for key in KEYS]
+    + [(f"{part}_count", pa.int64()) for part in PARTS_OF_PAGE]
+    + [("total_count", pa.int64())]
+)
+
+
+def sort_counts(counts: pa.Table) -> pa.Table:
+    """Orders the counts by url and type (NULLs first), then by the other keys."""
+    order = pc.sort_indices(
+        counts,
+        sort_keys=[
+            (key, "ascending")
+            for key in ["url", "type", "name_lower", "url_entity_nametype"]
+        ],
+        null_placement="at_start",
+    )
+    return counts.take(order)
+
+
+def count_entities(named_entities: pa.Table) -> pa.Table:
+    """
+    Counts the entity instances of each (url, name_lower, type, url_entity_nametype),
+    per part of page and in total.
+
+    Args:
+        named_entities: a table with the columns of `postprocess_predictions.OUTPUT_SCHEMA`
+            (at least the KEYS and `part_of_page`)
+
+    Returns:
+        A table with the columns of COUNTS_SCHEMA.
+
+    Note:
+        The query does not join the counts of the keys with a NULL value (FULL JOIN does
+        not match NULLs), so it splits them into one row per part of page; here they
+        are counted like the other keys. Predictions always have a name and a type, so
+        the keys are never NULL in practice.
+    """
+    part_of_page = named_entities.column("part_of_page")
+    # one 0/1 column per part of page, summed in the same grouped pass as the total
+    flags = {
+        part: pc.fill_null(pc.equal(part_of_page, part), False).cast(pa.int64())
+        for part in PARTS_OF_PAGE
+    }
+    table = pa.table(
+        {
+            **{key: named_entities.column(key).cast(pa.string()) for key in KEYS},
+            **flags,
+        }
+    )
+    # the flags are never null, so the count of one of them is the number of instances
+    # (the keys may be null, and pyarrow 10 has no "count_all" aggregation)
+    total_flag = PARTS_OF_PAGE[0]
+    grouped = table.group_by(KEYS).aggregate(
+        [(part, "sum") for part in PARTS_OF_PAGE] + [(total_flag, "count")]
+    )
+    counts = pa.table(
+        {
+            **{key: grouped.column(key) for key in KEYS},
+            **{
+                f"{part}_count": grouped.column(f"{part}_sum") for part in PARTS_OF_PAGE
+            },
+            "total_count": grouped.column(f"{total_flag}_count"),
+        },
+        schema=COUNTS_SCHEMA,
+    )
+    return sort_counts(counts)
+
+
+def update_entity_counts(
+    accumulated_counts: pa.Table, named_entities: pa.Table
+) -> pa.Table:
+    """
+    Replaces the counts of the urls of `named_entities` in `accumulated_counts` by their
+    counts in `named_entities`, as `update_entity_accumulation.txt` does.
+
+    Args:
+        accumulated_counts: the counts of the entities extracted so far, with the
+            columns of COUNTS_SCHEMA
+        named_entities: the newly extracted entity instances of the re-extracted urls
+
+    Returns:
+        The updated counts, with the columns of COUNTS_SCHEMA.
+    """
+    affected_urls = pc.unique(named_entities.column("url").cast(pa.string()))
+    accumulated_counts = accumulated_counts.select(COUNTS_SCHEMA.names).cast(
+        COUNTS_SCHEMA
+    )
+    kept = accumulated_counts.filter(
+        pc.invert(pc.is_in(accumulated_counts.column("url"), value_set=affected_urls))
+    )
+    return sort_counts(pa.concat_tables([kept, count_entities(named_entities)]))
+
+
+def read_table(path: Path) -> pa.Table:
+    """Reads a Parquet (.parquet) or CSV (any other extension) file."""
+    if path.suffix == ".parquet":
+        return pq.read_table(path)
+    return pacsv.read_csv(path)
+
+
+def write_table(table: pa.Table, path: Path) -> None:
+    """Writes a Parquet (.parquet) or CSV (any other extension) file."""
+    if path.suffix == ".parquet":
+        pq.write_table(table, path)
+    else:
+        pacsv.write_csv(table, path)
+
+
+def main(
+    input_filepath: Path = typer.Argument(..., exists=True, dir_okay=False),
+    output_filepath: Path = typer.Argument(..., dir_okay=False),
+    accumulated_counts_filepath: Optional[Path] = typer.Option(
+        None,
+        exists=True,
+        dir_okay=False,
+        help="Counts to update with the counts of the input entities",
+    ),
+) -> None:
+    """
+    Counts the entity instances of a file output by `postprocess_predictions.py` and
+    saves the counts, optionally merged into accumulated counts.
+    """
+    start = time.perf_counter()
+    named_entities = read_table(input_filepath)
+    if accumulated_counts_filepath is None:
+        counts = count_entities(named_entities)
+    else:
+        counts = update_entity_counts(
+            read_table(accumulated_counts_filepath), named_entities
+        )
+    write_table(counts, output_filepath)
+    print(
+        f"{counts.num_rows} entity counts saved to {output_filepath} "
+        f"in {time.perf_counter() - start:.1f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,267 @@
+"""
+Local, file-based store of the entities extracted so far, updated incrementally.
+
+`update_entity_accumulation.txt` deletes the rows of the re-extracted urls from the
+`named_entities_all` and `named_entities_counts` tables, then re-inserts them, and the
+whole counts table is then exported to `named_entities_counts.csv.gz`. `EntityStore`
+keeps both tables as Parquet files partitioned by url hash bucket, so that:
+
+- `upsert` rewrites only the buckets of the re-extracted urls: in each of them, the rows
+  of these urls are replaced by the new ones, with the same semantics as the query;
+- `export_deltas` exports only the counts of the buckets changed since a given store
+  version, one gzipped CSV file per bucket. A consumer replaces the rows of a bucket
+  with the content of its delta file.
+
+The cost of a daily update scales with the number of buckets touched, i.e. with the
+number of changed pages as long as there are more buckets than daily changed pages
+(each bucket holds about 1/n_buckets of the corpus).
+
+Layout:
+
+```
+<root>/manifest.json
+<root>/named_entities_all/bucket=0042.parquet
+<root>/named_entities_counts/bucket=0042.parquet
+```
+
+To run:
+
+```shell
+cd inference_pipeline_new_content
+python -m utils.entity_store upsert entity_store named_entities_all.parquet
+python -m utils.entity_store export-deltas entity_store deltas --since-version 41
+```
+"""
+
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import typer
+
+from .count_entities import COUNTS_SCHEMA, read_table, update_entity_counts
+from .postprocess_predictions import OUTPUT_SCHEMA
+
+ENTITIES_TABLE = "named_entities_all"
+COUNTS_TABLE = "named_entities_counts"
+
+# the schema of `named_entities_all`, where the character offsets are integers
+ENTITIES_SCHEMA = pa.schema(
+    [
+        pa.field(field.name, pa.int64())
+        if field.name in ("char_start", "char_end")
+        else field
+        for field in OUTPUT_SCHEMA
+    ]
+)
+SCHEMAS = {ENTITIES_TABLE: ENTITIES_SCHEMA, COUNTS_TABLE: COUNTS_SCHEMA}
+
+DEFAULT_N_BUCKETS = 1024
+
+
+def url_buckets(urls, n_buckets: int) -> pa.Array:
+    """
+    Returns the bucket of each url: the CRC-32 of the url modulo `n_buckets`, which is
+    stable across processes and platforms. The hash is computed once per distinct url.
+    """
+    if isinstance(urls, pa.ChunkedArray):
+        urls = urls.combine_chunks()
+    encoded = urls.cast(pa.string()).dictionary_encode(null_encoding="encode")
+    buckets = pa.array(
+        [
+            zlib.crc32((url or "").encode("utf-8")) % n_buckets
+            for url in encoded.dictionary.to_pylist()
+        ],
+        pa.int64(),
+    )
+    return pc.take(buckets, encoded.indices)
+
+
+def write_atomically(table: pa.Table, path: Path) -> None:
+    """Writes a Parquet file, so that readers see either the old or the new file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class EntityStore:
+    """
+    The `named_entities_all` and `named_entities_counts` tables, as Parquet files
+    partitioned by url hash bucket.
+
+    Args:
+        root: the directory of the store, created if missing
+        n_buckets: the number of buckets of a new store; an existing store keeps the
+            number of buckets it was created with
+    """
+
+    def __init__(self, root: Path, n_buckets: int = DEFAULT_N_BUCKETS):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            # `buckets`: the store version of the last update of each bucket
+            manifest = {"n_buckets": n_buckets, "version": 0, "buckets": {}}
+        self.n_buckets: int = manifest["n_buckets"]
+        self.version: int = manifest["version"]
+        self.bucket_versions: Dict[int, int] = {
+            int(bucket): version for bucket, version in manifest["buckets"].items()
+        }
+
+    def path(self, table_name: str, bucket: int) -> Path:
+        return self.root / table_name / f"bucket={bucket:04d}.parquet"
+
+    def read_bucket(self, table_name: str, bucket: int) -> pa.Table:
+        """Reads one bucket of a table (an empty table if the bucket has no rows yet)."""
+        path = self.path(table_name, bucket)
+        if not path.exists():
+            return SCHEMAS[table_name].empty_table()
+        return pq.read_table(path)
+
+    def read(self, table_name: str = COUNTS_TABLE) -> pa.Table:
+        """Reads a whole table."""
+        tables = [
+            self.read_bucket(table_name, bucket)
+            for bucket in sorted(self.bucket_versions)
+        ]
+        return pa.concat_tables([SCHEMAS[table_name].empty_table()] + tables)
+
+    def upsert(self, named_entities: pa.Table) -> List[int]:
+        """
+        Replaces the entities and counts of the urls of `named_entities` by theirs,
+        rewriting only the buckets of these urls.
+
+        Args:
+            named_entities: the entity instances of the re-extracted urls, as output by
+                `postprocess_predictions`
+
+        Returns:
+            The buckets rewritten, which are exported by the next `export_deltas`.
+        """
+        named_entities = named_entities.select(ENTITIES_SCHEMA.names).cast(
+            ENTITIES_SCHEMA
+        )
+        if named_entities.num_rows == 0:
+            return []
+        buckets = url_buckets(named_entities.column("url"), self.n_buckets)
+        touched = sorted(pc.unique(buckets).to_pylist())
+        # sort the rows by bucket once, then slice each bucket
+        order = pc.sort_indices(buckets)
+        named_entities, buckets = named_entities.take(order), buckets.take(order)
+        counts = pc.value_counts(buckets)
+        sizes = dict(
+            zip(
+                counts.field("values").to_pylist(),
+                counts.field("counts").to_pylist(),
+            )
+        )
+
+        self.version += 1
+        for table_name in SCHEMAS:
+            (self.root / table_name).mkdir(parents=True, exist_ok=True)
+        offset = 0
+        for bucket in touched:
+            new = named_entities.slice(offset, sizes[bucket])
+            offset += sizes[bucket]
+            old = self.read_bucket(ENTITIES_TABLE, bucket)
+            kept = old.filter(
+                pc.invert(
+                    pc.is_in(old.column("url"), value_set=pc.unique(new.column("url")))
+                )
+            )
+            write_atomically(
+                pa.concat_tables([kept, new]), self.path(ENTITIES_TABLE, bucket)
+            )
+            write_atomically(
+                update_entity_counts(self.read_bucket(COUNTS_TABLE, bucket), new),
+                self.path(COUNTS_TABLE, bucket),
+            )
+            self.bucket_versions[bucket] = self.version
+        self.write_manifest()
+        return touched
+
+    def write_manifest(self) -> None:
+        manifest = {
+            "n_buckets": self.n_buckets,
+            "version": self.version,
+            "buckets": {
+                str(bucket): version
+                for bucket, version in sorted(self.bucket_versions.items())
+            },
+        }
+        tmp_path = self.manifest_path.with_name("manifest.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def changed_buckets(self, since_version: int = 0) -> List[int]:
+        """Returns the buckets updated after the store version `since_version`."""
+        return sorted(
+            bucket
+            for bucket, version in self.bucket_versions.items()
+            if version > since_version
+        )
+
+    def export_deltas(
+        self, output_dir: Path, since_version: int = 0, table_name: str = COUNTS_TABLE
+    ) -> List[Path]:
+        """
+        Exports the buckets of a table updated after the store version `since_version`
+        (all of them by default), to one gzipped CSV file per bucket.
+        Pass the current `version` of the store as `since_version` to the next export.
+
+        Returns:
+            The paths of the files written.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for bucket in self.changed_buckets(since_version):
+            path = output_dir / f"{table_name}-bucket={bucket:04d}.csv.gz"
+            with pa.CompressedOutputStream(str(path), "gzip") as f:
+                pacsv.write_csv(self.read_bucket(table_name, bucket), f)
+            paths.append(path)
+        return paths
+
+
+app = typer.Typer()
+
+
+@app.command()
+def upsert(
+    store_dir: Path = typer.Argument(..., file_okay=False),
+    input_filepath: Path = typer.Argument(..., exists=True, dir_okay=False),
+    n_buckets: int = typer.Option(DEFAULT_N_BUCKETS, help="For a new store only"),
+) -> None:
+    """Upserts the entities of a file output by `postprocess_predictions.py`."""
+    store = EntityStore(store_dir, n_buckets)
+    touched = store.upsert(read_table(input_filepath))
+    print(
+        f"{len(touched)} of {store.n_buckets} buckets updated: version {store.version}"
+    )
+
+
+@app.command()
+def export_deltas(
+    store_dir: Path = typer.Argument(..., exists=True, file_okay=False),
+    output_dir: Path = typer.Argument(..., file_okay=False),
+    since_version: int = typer.Option(
+        0, help="Export the buckets updated after this version (default: all of them)"
+    ),
+) -> None:
+    """Exports the counts of the buckets updated since a version of the store."""
+    store = EntityStore(store_dir)
+    paths = store.export_deltas(output_dir, since_version)
+    print(f"{len(paths)} buckets exported to {output_dir}: version {store.version}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,277 @@
+"""
+Local, vectorised port of `sql_queries/postprocess_predictions.txt`, to post-process
+NER prediction files without BigQuery (local testing, backfills).
+
+It unnests the entities of each prediction into one row per entity instance, and
+builds the same columns as the SQL query, with the same values:
+
+- `name` and `type` are extracted with `JSON_EXTRACT`, which returns JSON values:
+  they keep their JSON quotes (e.g. `"England"`), and so does `name_lower`;
+- `char_start` and `char_end` are extracted with `JSON_EXTRACT_SCALAR`, as strings;
+- `url_entity_nametype` is 'https://www.gov.uk/named-entity/' + type + '/' +
+  encodeURIComponent(name_lower), e.g.
+  `https://www.gov.uk/named-entity/"GPE"/%22england%22`;
+- the rows are ordered by url and line_number, NULLs first, as BigQuery does.
+  Rows with the same url and line_number keep their input order.
+
+The prediction JSON strings are parsed by Arrow's multithreaded JSON reader, in batches
+of whole lines of bounded size, and the string functions (JSON quoting, URI encoding)
+are computed once per distinct value.
+
+The input is either the BigQuery table of raw predictions, with the columns
+`url`, `part_of_page`, `line_number` and `prediction` (the JSON string of an
+`OutputEntities`), exported to Parquet or JSONL, or the JSONL files output by Vertex AI
+batch predictions, with one `{"instance": ..., "prediction": ...}` object per line.
+
+To run:
+
+```shell
+cd inference_pipeline_new_content
+python utils/postprocess_predictions.py predictions.jsonl named_entities_all.parquet
+```
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+import typer
+
+NAMED_ENTITY_URI = "https://www.gov.uk/named-entity/"
+
+ENTITY_TYPE = pa.struct(
+    [
+        ("name", pa.string()),
+        ("type", pa.string()),
+        ("start", pa.int64()),
+        ("end", pa.int64()),
+    ]
+)
+PREDICTION_TYPE = pa.struct([("entities", pa.list_(ENTITY_TYPE))])
+
+# the prediction JSON is passed to the JSON reader in batches of whole lines of about
+# PARSE_BATCH_BYTES, each parsed in blocks of PARSE_BLOCK_BYTES in parallel
+PARSE_BATCH_BYTES = 64 << 20
+PARSE_BLOCK_BYTES = 1 << 20
+
+OUTPUT_SCHEMA = pa.schema(
+    [
+        ("url", pa.string()),
+        ("name", pa.string()),
+        ("name_lower", pa.string()),
+        ("type", pa.string()),
+        ("char_start", pa.string()),
+        ("char_end", pa.string()),
+        ("part_of_page", pa.string()),
+        ("line_number", pa.int64()),
+        ("url_entity_nametype", pa.string()),
+    ]
+)
+
+
+def json_extract_string(value: str) -> str:
+    """The JSON value of a string, as returned by BigQuery's JSON_EXTRACT."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def encode_uri_component(value: str) -> str:
+    """
+    JavaScript's encodeURIComponent, as in the ENCODE_URI_COMPONENT UDF: percent-encodes
+    the UTF-8 bytes of all characters but A-Z a-z 0-9 - _ . ! ~ * ' ( ).
+    Strings that cannot be encoded (lone surrogates) are returned as they are.
+    """
+    try:
+        return quote(value, safe="!~*'()")
+    except UnicodeEncodeError:
+        return value
+
+
+def map_distinct(array, function: Callable[[str], str]) -> pa.Array:
+    """
+    Applies a string function to each distinct non-null value of a string array only,
+    and returns the results for the whole array (nulls stay null).
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    encoded = array.dictionary_encode()
+    dictionary = pa.array(
+        [function(value) for value in encoded.dictionary.to_pylist()], pa.string()
+    )
+    return pc.take(dictionary, encoded.indices)
+
+
+def struct_field(values, name: str):
+    """
+    The child `name` of a (chunked) struct array, with the nulls of the parent, by
+    its field index: the pinned pyarrow 10 does not take field names in
+    `pc.struct_field`.
+    """
+    return pc.struct_field(values, [values.type.get_field_index(name)])
+
+
+def iter_prediction_batches(predictions, batch_bytes: int) -> Iterator[pa.Array]:
+    """
+    Splits a (chunked) string array of prediction JSON objects into string arrays of
+    consecutive rows, of at most `batch_bytes` bytes of JSON with their line breaks (or
+    of one row, if longer), with the nulls replaced by empty objects.
+    """
+    if isinstance(predictions, pa.ChunkedArray):
+        chunks = predictions.chunks
+    else:
+        chunks = [predictions]
+    for chunk in chunks:
+        chunk = pc.fill_null(chunk, "{}")
+        # the end of each row of the chunk, in bytes of NDJSON
+        ends = np.cumsum(pc.binary_length(chunk).to_numpy(zero_copy_only=False) + 1)
+        start = 0
+        while start < len(chunk):
+            limit = (ends[start - 1] if start else 0) + batch_bytes
+            stop = max(start + 1, int(np.searchsorted(ends, limit, side="right")))
+            yield chunk.slice(start, stop - start).cast(pa.string())
+            start = stop
+
+
+def parse_predictions(predictions) -> pa.Array:
+    """
+    Parses a string array of prediction JSON objects (one per row, null allowed) into
+    a struct array with their `entities`, with Arrow's multithreaded JSON reader.
+
+    The predictions are passed to the reader as NDJSON buffers of about
+    PARSE_BATCH_BYTES, and each buffer is parsed in blocks of PARSE_BLOCK_BYTES (or
+    of the longest line) in parallel, so that the JSON is never held as a whole.
+    """
+    entities_type = PREDICTION_TYPE.field("entities").type
+    parse_options = pajson.ParseOptions(
+        explicit_schema=pa.schema([("entities", entities_type)]),
+        unexpected_field_behavior="ignore",
+    )
+    chunks = []
+    for lines in iter_prediction_batches(predictions, PARSE_BATCH_BYTES):
+        # one prediction per line; the compact JSON of a prediction has no raw line
+        # breaks. The data buffer of the lines joined with a line break is the NDJSON
+        ndjson = pc.binary_join_element_wise(lines, "", "\n")
+        line_lengths = pc.binary_length(ndjson)
+        body = ndjson.buffers()[2].slice(0, pc.sum(line_lengths).as_py())
+        block_size = max(PARSE_BLOCK_BYTES, pc.max(line_lengths).as_py() + 1)
+        parsed = pajson.read_json(
+            pa.BufferReader(body),
+            read_options=pajson.ReadOptions(block_size=block_size),
+            parse_options=parse_options,
+        )
+        chunks.extend(parsed.column("entities").chunks)
+    entities = pa.chunked_array(chunks, entities_type).combine_chunks()
+    return pa.StructArray.from_arrays([entities], fields=[PREDICTION_TYPE[0]])
+
+
+def postprocess_predictions(predictions: pa.Table) -> pa.Table:
+    """
+    Unnests the entities of the raw predictions and adds their lower-case name and URI,
+    as `sql_queries/postprocess_predictions.txt` does.
+
+    Args:
+        predictions: a table with the columns `url`, `part_of_page`, `line_number`,
+            and `prediction`, either the JSON string of a prediction or a struct
+            with its `entities`
+
+    Returns:
+        A table with the columns of OUTPUT_SCHEMA, one row per entity instance.
+    """
+    prediction = predictions.column("prediction")
+    if pa.types.is_string(prediction.type) or pa.types.is_large_string(prediction.type):
+        prediction = parse_predictions(prediction)
+    elif isinstance(prediction, pa.ChunkedArray):
+        prediction = prediction.combine_chunks()
+    entities = struct_field(prediction, "entities")
+
+    # UNNEST: one row per entity, rows without entities dropped
+    parents = pc.list_parent_indices(entities)
+    flat = pc.list_flatten(entities)
+    name = map_distinct(struct_field(flat, "name"), json_extract_string)
+    entity_type = map_distinct(struct_field(flat, "type"), json_extract_string)
+    name_lower = pc.utf8_lower(name)
+    url_entity_nametype = pc.binary_join_element_wise(
+        NAMED_ENTITY_URI,
+        entity_type,
+        "/",
+        map_distinct(name_lower, encode_uri_component),
+        "",
+    )
+
+    output = pa.table(
+        {
+            "url": pc.take(predictions.column("url"), parents),
+            "name": name,
+            "name_lower": name_lower,
+            "type": entity_type,
+            "char_start": struct_field(flat, "start").cast(pa.string()),
+            "char_end": struct_field(flat, "end").cast(pa.string()),
+            "part_of_page": pc.take(predictions.column("part_of_page"), parents),
+            "line_number": pc.take(predictions.column("line_number"), parents),
+            "url_entity_nametype": url_entity_nametype,
+        }
+    ).cast(OUTPUT_SCHEMA)
+    order = pc.sort_indices(
+        output,
+        sort_keys=[("url", "ascending"), ("line_number", "ascending")],
+        null_placement="at_start",
+    )
+    return output.take(order)
+
+
+def read_predictions(path: Path, input_format: Optional[str] = None) -> pa.Table:
+    """
+    Reads raw predictions from a Parquet or JSONL file: either an export of the BigQuery
+    table of predictions, or a Vertex AI batch prediction output file.
+    The format is given by the file extension, unless `input_format` is set.
+    """
+    if (input_format or path.suffix.lstrip(".")) == "parquet":
+        table = pq.read_table(path)
+    else:
+        table = pajson.read_json(path)
+    if "instance" in table.column_names:
+        # Vertex AI output: {"instance": {"url": ..., ...}, "prediction": {...}}
+        instance = table.column("instance")
+        columns = {
+            name: struct_field(instance, name)
+            for name in ("url", "part_of_page", "line_number")
+        }
+        table = pa.table({**columns, "prediction": table.column("prediction")})
+    return table
+
+
+def main(
+    input_filepath: Path = typer.Argument(..., exists=True, dir_okay=False),
+    output_filepath: Path = typer.Argument(..., dir_okay=False),
+    input_format: Optional[str] = typer.Option(
+        None, help="'parquet' or 'jsonl'; by default, from the input file extension"
+    ),
+) -> None:
+    """
+    Post-processes a file of raw predictions, and saves the entity instances
+    to a Parquet (.parquet) or CSV (any other extension) file.
+    """
+    start = time.perf_counter()
+    named_entities = postprocess_predictions(
+        read_predictions(input_filepath, input_format)
+    )
+    if output_filepath.suffix == ".parquet":
+        pq.write_table(named_entities, output_filepath)
+    else:
+        import pyarrow.csv as pacsv
+
+        pacsv.write_csv(named_entities, output_filepath)
+    print(
+        f"{named_entities.num_rows} entity instances saved to {output_filepath} "
+        f"in {time.perf_counter() - start:.1f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,121 @@
+"""
+Benchmark of the loading of a sample of the preprocessed content store: with
+`pd.read_csv` of the whole store, then filtered to the sampled base_path's and trimmed
+to the columns needed, as `make_data` did, and with `load_preprocessed_content_store`,
+reading the gzipped TSV file in blocks, or its conversion to Parquet. Each design runs
+in a new process, whose runtime and peak resident memory are reported.
+
+The store is generated, unless an existing one is given with `--path`. From the root
+directory of this project, run:
+
+```shell
+python -m src.make_data.benchmarks.bench_load_content_store --rows 200000
+```
+"""
+
+import argparse
+import csv
+import gzip
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+
+import pandas as pd
+
+from src.make_data.load_content_store import (
+    CONTENT_STORE_COLUMNS,
+    convert_to_parquet,
+    load_preprocessed_content_store,
+)
+
+# a few of the columns of the preprocessed content store
+COLUMNS = CONTENT_STORE_COLUMNS + [
+    "title",
+    "description",
+    "document_type",
+    "schema_name",
+    "first_published_at",
+    "publishing_app",
+    "organisations",
+    "taxons",
+    "details",
+]
+WORDS = "the of and to tax vehicle child benefit pay report guidance employers".split()
+
+
+def make_content_store(path, n_rows, seed):
+    rng = random.Random(seed)
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(COLUMNS)
+        for i in range(n_rows):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 400)))
+            writer.writerow(
+                [f"/page-{i}", f"id-{i}", text, f"Page {i}", "A page", "guide", "guide"]
+                + ["2020-01-01", "publisher", "{}", "[]", '{"body": "<p>Text</p>"}']
+            )
+
+
+def load_with_read_csv(path, base_paths):
+    df = pd.read_csv(path, compression="gzip", header=0, sep="\t")
+    df = df[df["base_path"].isin(base_paths)]
+    return df[CONTENT_STORE_COLUMNS]
+
+
+DESIGNS = {
+    "pd.read_csv": load_with_read_csv,
+    "streaming TSV": load_preprocessed_content_store,
+    "Parquet": load_preprocessed_content_store,
+}
+
+
+def run(design, path, base_paths):
+    start = time.perf_counter()
+    df = DESIGNS[design](path, base_paths)
+    seconds = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return len(df), seconds, peak_rss
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--path", help="gzipped TSV file of a preprocessed content store"
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp_dir, "preprocessed_content_store.csv.gz")
+            make_content_store(path, args.rows, args.seed)
+        parquet_path = os.path.join(tmp_dir, "preprocessed_content_store.parquet")
+        convert_to_parquet(path, parquet_path)
+        base_paths = set(
+            pd.read_parquet(parquet_path, columns=["base_path"])["base_path"].sample(
+                args.sample, random_state=args.seed
+            )
+        )
+
+        results = []
+        for design in DESIGNS:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                results.append(
+                    pool.apply(
+                        run,
+                        (
+                            design,
+                            parquet_path if design == "Parquet" else path,
+                            base_paths,
+                        ),
+                    )
+                )
+        print(f"{'design':>15} {'rows':>8} {'seconds':>8} {'peak RSS MiB':>13}")
+        for design, (num_rows, seconds, peak_rss) in zip(DESIGNS, results):
+            print(f"{design:>15} {num_rows:>8} {seconds:>8.2f} {peak_rss:>13.0f}")
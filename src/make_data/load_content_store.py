@@ -0,0 +1,276 @@
+"""
+Out-of-core reading of the preprocessed content store (ppcs), a gzipped TSV file of all
+the content items of GOV.UK, with their text.
+
+The store is read in blocks by the pyarrow streaming CSV reader, with only the columns
+needed, and each block is filtered to the base_path's of interest before the next one
+is read, so that the whole store is never held in memory. The store can be converted
+once to Parquet, sorted by base_path in row groups of a bounded number of rows: only
+the row groups whose base_path range (from their min/max statistics) holds some of the
+base_path's of interest are then read, which is much faster than decompressing and
+parsing the TSV file again. The position of each row in the store is kept in a
+`store_order` column, so that the rows are returned in the order of the store.
+
+To convert the store to Parquet, from the root directory of this project, run:
+
+```shell
+python -m src.make_data.load_content_store \
+    /tmp/govukmirror/preprocessed_content_store_250522.csv.gz \
+    /tmp/govukmirror/preprocessed_content_store_250522.parquet
+```
+"""
+
+import csv
+import io
+import os
+import resource
+import time
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from src.utils.helpers_arrow import (
+    iter_merged_batches,
+    iter_parquet_runs,
+    row_groups_with_values,
+    sort_batch,
+)
+
+# the columns used to make the datasets of sentences
+CONTENT_STORE_COLUMNS = ["base_path", "content_id", "text"]
+
+# size of the blocks of the TSV file parsed at once
+DEFAULT_BLOCK_SIZE = 16 << 20
+
+# number of rows per row group of the Parquet conversion, the unit of its reads
+PARQUET_ROW_GROUP_SIZE = 2000
+
+# column of the Parquet conversion with the position of each row in the store
+STORE_ORDER_COLUMN = "store_order"
+
+# the values parsed as missing by pd.read_csv
+NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def report(message: str, start: float) -> None:
+    """Prints a message with the time elapsed since `start` and the peak memory used."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_arrow = pa.default_memory_pool().max_memory() / 2**20
+    print(
+        f"{message} in {time.perf_counter() - start:0.1f} seconds. "
+        f"Peak memory: {peak_rss:0.0f} MiB (process RSS), {peak_arrow:0.0f} MiB (Arrow)"
+    )
+
+
+def read_column_names(path_to_gz: str) -> List[str]:
+    """Returns the column names, from the header of the TSV file."""
+    with pa.input_stream(path_to_gz, compression="detect") as stream:
+        return next(
+            csv.reader(io.TextIOWrapper(stream, encoding="utf-8"), delimiter="\t")
+        )
+
+
+def open_content_store_csv(
+    path_to_gz: str, columns: List[str], block_size: int = DEFAULT_BLOCK_SIZE
+) -> pacsv.CSVStreamingReader:
+    """
+    Opens the TSV file of the store, to read the record batches of `columns` one by one.
+    All the values are read as strings, and the missing values as in pd.read_csv.
+    """
+    return pacsv.open_csv(
+        path_to_gz,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        parse_options=pacsv.ParseOptions(delimiter="\t", newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: pa.string() for column in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def filter_batches(
+    batches: Iterable[pa.RecordBatch], base_paths: Optional[Iterable[str]]
+) -> Iterator[pa.RecordBatch]:
+    """Filters each record batch to the rows of `base_paths`, or none if it is None."""
+    if base_paths is None:
+        yield from batches
+        return
+    value_set = pa.array(list(base_paths), pa.string())
+    for batch in batches:
+        yield batch.filter(pc.is_in(batch.column("base_path"), value_set=value_set))
+
+
+def load_preprocessed_content_store(
+    path: str,
+    base_paths: Optional[Iterable[str]] = None,
+    columns: List[str] = CONTENT_STORE_COLUMNS,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> pd.DataFrame:
+    """
+    Load the preprocessed content store (ppcs) into a DataFrame, with only the rows of
+    `base_paths` and the `columns` given, without holding the whole store in memory.
+    You can get the ppcs from 'govuk-data-integration' S3 bucket.
+    :param path: the gzipped TSV file of the store, or its conversion to Parquet
+        (.parquet)
+    :param base_paths: the base_path's to keep, or None to keep all the rows
+    :param columns: the columns to keep
+    :param block_size: size of the blocks of the TSV file parsed at once
+    :return: the rows in the order of the store, with a new index, the values as
+        strings, and the missing values as NaN, as read by pd.read_csv
+    """
+    print(f"Loading preprocessed content store {path}")
+    start = time.perf_counter()
+    if str(path).endswith(".parquet"):
+        table = read_parquet(path, base_paths, columns)
+    else:
+        reader = open_content_store_csv(path, columns, block_size)
+        table = pa.Table.from_batches(
+            filter_batches(reader, base_paths), schema=reader.schema
+        )
+    # pd.read_csv reads the missing values as NaN, rather than None
+    df = table.select(columns).to_pandas().fillna(np.nan)
+    report(f"Loaded successfully. Shape: {df.shape}", start)
+    return df
+
+
+def read_parquet(
+    path: str, base_paths: Optional[Iterable[str]], columns: List[str]
+) -> pa.Table:
+    """
+    Reads the rows of `base_paths` of the Parquet conversion of the store (see
+    convert_to_parquet()), batch by batch, from the row groups which may hold them only.
+    :return: the `columns` of the rows, in the order of the store
+    """
+    parquet_file = pq.ParquetFile(path)
+    schema = parquet_file.schema_arrow
+    if base_paths is None:
+        row_groups = range(parquet_file.num_row_groups)
+        values = None
+    else:
+        values = sorted(set(base_paths))
+        row_groups = row_groups_with_values(parquet_file, "base_path", values)
+    # the columns needed, in the order of the file
+    read_schema = pa.schema(
+        [
+            field
+            for field in schema
+            if field.name in columns or field.name in ("base_path", STORE_ORDER_COLUMN)
+        ]
+    )
+    table = pa.Table.from_batches(
+        filter_batches(
+            parquet_file.iter_batches(
+                batch_size=PARQUET_ROW_GROUP_SIZE,
+                row_groups=list(row_groups),
+                columns=read_schema.names,
+            ),
+            values,
+        ),
+        schema=read_schema,
+    )
+    if STORE_ORDER_COLUMN in read_schema.names:
+        table = table.sort_by(STORE_ORDER_COLUMN)
+    return table.select(columns)
+
+
+def iter_sorted_blocks(
+    reader: pacsv.CSVStreamingReader,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Yields the blocks of the store sorted by base_path, with the position of each row in
+    the store as STORE_ORDER_COLUMN.
+    """
+    num_rows = 0
+    for batch in reader:
+        store_order = pa.array(
+            np.arange(num_rows, num_rows + batch.num_rows), pa.int64()
+        )
+        batch = pa.RecordBatch.from_arrays(
+            batch.columns + [store_order],
+            names=batch.schema.names + [STORE_ORDER_COLUMN],
+        )
+        num_rows += batch.num_rows
+        yield sort_batch(batch, "base_path")
+
+
+def convert_to_parquet(
+    path_to_gz: str,
+    parquet_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+) -> int:
+    """
+    Converts the TSV file of the store to Parquet, with all its columns as strings,
+    sorted by base_path in row groups of `row_group_size` rows, without holding the
+    whole store in memory: each block is sorted and written to a temporary file, and
+    the sorted blocks are then merged. The Parquet file is replaced once complete.
+    :return: the number of rows converted
+    """
+    print(f"Converting {path_to_gz} to {parquet_path}")
+    start = time.perf_counter()
+    reader = open_content_store_csv(
+        path_to_gz, read_column_names(path_to_gz), block_size
+    )
+    blocks_path = f"{parquet_path}.blocks.tmp"
+    tmp_path = f"{parquet_path}.tmp"
+    try:
+        schema = reader.schema.append(pa.field(STORE_ORDER_COLUMN, pa.int64()))
+        num_rows = 0
+        with pq.ParquetWriter(blocks_path, schema) as writer:
+            for batch in iter_sorted_blocks(reader):
+                writer.write_batch(batch)
+                num_rows += batch.num_rows
+        runs = iter_parquet_runs(
+            pq.ParquetFile(blocks_path), "base_path", row_group_size
+        )
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for batch in iter_merged_batches(runs, row_group_size, "base_path"):
+                writer.write_batch(batch)
+        os.replace(tmp_path, parquet_path)
+    finally:
+        for path in [blocks_path, tmp_path]:
+            if os.path.exists(path):
+                os.remove(path)
+    report(f"Converted {num_rows} rows", start)
+    return num_rows
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Convert the preprocessed content store to Parquet"
+    )
+    parser.add_argument("path_to_gz", help="gzipped TSV file of the store")
+    parser.add_argument("parquet_path", help="Parquet file to write")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    convert_to_parquet(args.path_to_gz, args.parquet_path, args.block_size)
@@ -1,7 +1,10 @@
-import tqdm
 import json
-import spacy
+
 import pandas as pd
+import spacy
+import tqdm
+
+from src.make_data.load_content_store import load_preprocessed_content_store
 
 # disabled unnecessary spacy NLP pipeline components
 disabled_pipelines = [
@@ -16,17 +19,6 @@ nlp = spacy.load("en_core_web_lg", disable=disabled_pipelines)
 nlp.add_pipe(added_pipeline)
 
 
-def load_preprocessed_content_store(path_to_gz):
-    """
-    Load the preprocessed content store (ppcs) into a DataFrame.
-    You can get the ppcs from 'govuk-data-integration' S3 bucket.
-    """
-    print("Loading preprocessed content store .gz")
-    df = pd.read_csv(path_to_gz, compression="gzip", header=0, sep="\t")
-    print("Loaded successfully. Shape: {}".format(df.shape))
-    return df
-
-
 def get_base_path_sample_list(base_path_file, col):
     base_paths_df = pd.read_csv(base_path_file)
     base_paths_list = list(base_paths_df[col])
@@ -37,7 +29,7 @@ def filter_content_store_by_basepathlist(dataframe, base_path_col, base_path_lis
     """
     Filter preprocessed content store by base path list.
     """
-    print("Shape before filter: {}".format(df.shape))
+    print("Shape before filter: {}".format(dataframe.shape))
     df_filt = dataframe[dataframe[base_path_col].isin(base_path_list)]
     print("Shape after filter: {}".format(df_filt.shape))
     return df_filt
@@ -103,6 +95,7 @@ if __name__ == "__main__":
 
     import os
     import time
+
     import dask.dataframe as dd
 
     DIR_STRATA = os.getenv("DIR_SRC_STRATA")
@@ -116,9 +109,10 @@ if __name__ == "__main__":
     )
     output_filepath = os.path.join(DIR_OUTPUT, "sampled_sentences.jsonl")
 
-    df = load_preprocessed_content_store(
-        path_to_gz="/tmp/govukmirror/preprocessed_content_store_250522.csv.gz"
-    )
+    # the conversion of the store to Parquet, if any (see src/make_data/load_content_store.py)
+    PPCS_FILEPATH = "/tmp/govukmirror/preprocessed_content_store_250522.csv.gz"
+    PPCS_PARQUET_FILEPATH = "/tmp/govukmirror/preprocessed_content_store_250522.parquet"
+
     base_path_schema_list = get_base_path_sample_list(
         ramdom_schemas_filepath, col="base_path"
     )
@@ -126,10 +120,14 @@ if __name__ == "__main__":
         ramdom_taxons_filepath, col="base_path"
     )
     base_path_list = set(base_path_schema_list + base_path_taxon_list)
-    df_filt = filter_content_store_by_basepathlist(
-        df, base_path_col="base_path", base_path_list=base_path_list
+    # the store is filtered to the sampled base_path's as it is read
+    df_trim = load_preprocessed_content_store(
+        PPCS_PARQUET_FILEPATH
+        if os.path.exists(PPCS_PARQUET_FILEPATH)
+        else PPCS_FILEPATH,
+        base_paths=base_path_list,
+        columns=["base_path", "content_id", "text"],
     )
-    df_trim = trim_dataframe(df_filt, columns=["base_path", "content_id", "text"])
 
     print("Preprocessing sentences...")
     tic = time.perf_counter()
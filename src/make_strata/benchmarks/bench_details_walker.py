@@ -0,0 +1,136 @@
+"""
+Benchmark of the walk through the `details` payloads of large manuals and guides by
+`extract_text_from_content_details`: the explicit-stack walker, which extracts the text
+of the html fragments and joins it once, against the previous recursive implementation,
+which joined and normalised the text of every list and dict. The outputs of both are
+checked to be identical.
+
+The payloads are generated: guides with many parts, each with a multiple content type
+body, and manuals whose sections are nested `depth` levels deep. With `--keep-html`,
+the html is joined without extracting its text, which measures the walk alone.
+
+From the root directory of this project, run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_details_walker
+python -m src.make_strata.benchmarks.bench_details_walker --keep-html
+```
+"""
+
+import argparse
+import re
+import time
+
+from src.make_strata.preprocess_text import (
+    extract_text_from_content_details,
+    extract_text_from_html,
+    is_html_like,
+)
+
+PARAGRAPH = (
+    "<p>Employers &amp; employees must keep records for 3 years, "
+    'see <a href="/guidance/records">keeping records</a>.</p>\n'
+)
+
+
+def extract_text_from_content_details_recursive(data, keep_html=False) -> str:
+    """The previous implementation of `extract_text_from_content_details`."""
+    if isinstance(data, list):
+        return re.sub(
+            " +",
+            " ",
+            " ".join(
+                [
+                    extract_text_from_content_details_recursive(item, keep_html)
+                    for item in data
+                ]
+            ),
+        ).strip()
+    elif isinstance(data, dict):
+        if "content_type" in data.keys() and data["content_type"] != "text/html":
+            return " "
+        return extract_text_from_content_details_recursive(
+            list(data.values()), keep_html
+        )
+    elif is_html_like(data):
+        if keep_html:
+            return data
+        return extract_text_from_html(data)
+    return " "
+
+
+def guide(n_parts, n_paragraphs):
+    """The details of a guide, with a govspeak and an html body per part."""
+    return {
+        "parts": [
+            {
+                "title": f"Part {i}",
+                "slug": f"part-{i}",
+                "body": [
+                    {"content_type": "text/govspeak", "content": f"## Part {i}"},
+                    {
+                        "content_type": "text/html",
+                        "content": f"<h2>Part {i}</h2>\n" + PARAGRAPH * n_paragraphs,
+                    },
+                ],
+            }
+            for i in range(n_parts)
+        ],
+        "external_related_links": [],
+    }
+
+
+def manual(depth, n_sections, n_paragraphs):
+    """The details of a manual, with sections of sections `depth` levels deep."""
+    details = {"body": PARAGRAPH * n_paragraphs, "child_section_groups": []}
+    for level in range(depth):
+        details = {
+            "body": f"<h2>Level {level}</h2>\n" + PARAGRAPH * n_paragraphs,
+            "child_section_groups": [
+                {
+                    "title": f"Group {level}",
+                    "child_sections": [
+                        {
+                            "section_id": f"S{level}-{i}",
+                            "title": f"Section {i}",
+                            "description": PARAGRAPH,
+                        }
+                        for i in range(n_sections)
+                    ]
+                    + [details],
+                }
+            ],
+        }
+    return details
+
+
+PAYLOADS = {
+    "guide, 10 parts": guide(10, 20),
+    "guide, 200 parts": guide(200, 20),
+    "manual, depth 10": manual(10, 10, 20),
+    "manual, depth 50": manual(50, 10, 20),
+}
+
+IMPLEMENTATIONS = {
+    "recursive": extract_text_from_content_details_recursive,
+    "explicit stack": extract_text_from_content_details,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--keep-html", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'payload':>18} {'implementation':>15} {'ms/doc':>8}")
+    for payload_name, details in PAYLOADS.items():
+        outputs = []
+        for name, extract_text in IMPLEMENTATIONS.items():
+            outputs.append(extract_text(details, args.keep_html))
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                extract_text(details, args.keep_html)
+            seconds = (time.perf_counter() - start) / args.repeat
+            print(f"{payload_name:>18} {name:>15} {seconds * 1e3:>8.2f}")
+        assert outputs[0] == outputs[1], f"the outputs differ for {payload_name}"
@@ -0,0 +1,110 @@
+"""
+Benchmark of the html to text extraction of the content items (`extract_text_from_html`,
+through `extract_text_from_content_details`): time and peak memory allocated per
+document, of the current implementation, which queries the text nodes with a compiled
+XPath returning plain strings and normalises the whitespace in a single pass, and of
+the previous one, which evaluated the XPath expression on each call and normalised the
+whitespace in several passes. The outputs of both are checked to be identical.
+The allocations are those of the Python objects: the lxml tree, allocated by libxml2,
+is not traced.
+
+The corpus is a JSON file of items with a `details` payload, by default the fixtures of
+the tests, or the `details` column of the Parquet file written by
+`ContentStore.extract_content_to_parquet()`. From the root directory of this project,
+run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_html_to_text --repeat 100
+python -m src.make_strata.benchmarks.bench_html_to_text \
+    --parquet src/make_strata/data/content_store.parquet --limit 10000
+```
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+from lxml import etree
+
+from src.make_strata import preprocess_text
+from src.make_strata.preprocess_text import extract_text_from_content_details
+
+FIXTURES_FILEPATH = "tests/test_make_strata/fixtures/details_payloads.json"
+
+
+def extract_text_from_html_tree(body: str) -> str:
+    """The previous implementation of `extract_text_from_html`."""
+    r = None
+    if body and body != "\n" and not body.isspace():
+        try:
+            tree = etree.HTML(body)
+            r = tree.xpath("//text()")
+            r = " ".join(r)
+            r = r.strip().replace("\n", " ").replace("\r", " ").replace("\t", " ")
+            r = r.replace("\n", " ").replace('\\"', '"')
+            r = " ".join(r.split())
+        except ValueError as e:
+            print("exception @ extract:", type(body), body, e)
+    if not r:
+        r = " "
+    return r
+
+
+IMPLEMENTATIONS = {
+    "previous": extract_text_from_html_tree,
+    "current": preprocess_text.extract_text_from_html,
+}
+
+
+def load_corpus(args):
+    if args.parquet:
+        details = pq.read_table(args.parquet, columns=["details"]).column("details")
+        details = details.drop_null().to_pylist()[: args.limit]
+        return [json.loads(value) for value in details]
+    with open(args.fixtures) as f:
+        return [item["details"] for item in json.load(f)][: args.limit]
+
+
+def bench(corpus, repeat):
+    """:return: the texts, and the median time and peak allocations per document"""
+    texts = [
+        extract_text_from_content_details(details) for details in corpus
+    ]  # warm up
+    seconds, peaks = [], []
+    for details in corpus:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract_text_from_content_details(details)
+        seconds.append((time.perf_counter() - start) / repeat)
+        tracemalloc.start()
+        extract_text_from_content_details(details)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return texts, statistics.median(seconds), statistics.median(peaks), sum(seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", default=FIXTURES_FILEPATH)
+    parser.add_argument("--parquet", help="content store Parquet file, with details")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    print(f"{len(corpus)} documents")
+    print(
+        f"{'implementation':>15} {'median us/doc':>14} {'median peak KiB':>16} {'total s':>8}"
+    )
+    outputs = {}
+    for name, extract_text_from_html in IMPLEMENTATIONS.items():
+        with patch.object(
+            preprocess_text, "extract_text_from_html", extract_text_from_html
+        ):
+            outputs[name], seconds, peak, total = bench(corpus, args.repeat)
+        print(f"{name:>15} {seconds * 1e6:>14.1f} {peak / 1024:>16.1f} {total:>8.3f}")
+    assert outputs["previous"] == outputs["current"], "the outputs differ"
@@ -0,0 +1,89 @@
+"""
+Benchmark of the extraction throughput (documents per second) of the content store,
+with a single cursor read by this process (`ContentStore.multiprocess_content_urls`)
+and with parallel _id range scans, where each worker fetches its own documents
+(`ContentStore.iter_range_scans`).
+
+Both designs extract and process the page paths of the content store
+(`pagepaths_query()`, `PAGEPATHS_FIELDS`, `process_url_and_metadata`), and the processed
+items are consumed and discarded.
+
+With the content store restored in a local MongoDB (see `src/make_strata/README.md`),
+from the root directory of this project, run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_range_scans --range-size 2000 --batch-size 1000
+```
+"""
+
+import argparse
+import json
+import time
+from functools import partial
+
+import pymongo
+
+from src.make_strata.extract_content_store import (
+    MONGO_ADDRESS,
+    PAGEPATHS_FIELDS,
+    ContentStore,
+    pagepaths_query,
+)
+from src.make_strata.preprocess_content import process_url_and_metadata
+
+
+def bench_single_cursor(args) -> int:
+    content_store = ContentStore()
+    content_db = content_store.init_client(args.address)
+    content_items, num_docs = content_store.query_db_get_pagepaths(content_db)
+    return sum(
+        1 for _ in content_store.multiprocess_content_urls(content_items, num_docs)
+    )
+
+
+def bench_range_scans(args) -> int:
+    items = ContentStore().iter_range_scans(
+        pagepaths_query(),
+        PAGEPATHS_FIELDS,
+        process_url_and_metadata,
+        client_factory=partial(pymongo.MongoClient, args.address),
+        range_size=args.range_size,
+        batch_size=args.batch_size,
+    )
+    return sum(1 for _ in items)
+
+
+DESIGNS = {"single-cursor": bench_single_cursor, "range-scans": bench_range_scans}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", default=MONGO_ADDRESS)
+    parser.add_argument("--designs", nargs="+", choices=DESIGNS, default=list(DESIGNS))
+    parser.add_argument("--range-size", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="optional JSON file to save the results to")
+    args = parser.parse_args()
+
+    results = []
+    for design in args.designs:
+        start = time.monotonic()
+        num_docs = DESIGNS[design](args)
+        seconds = time.monotonic() - start
+        results.append(
+            {
+                "design": design,
+                "documents": num_docs,
+                "seconds": seconds,
+                "documents_per_second": num_docs / seconds,
+            }
+        )
+    print(f"{'design':>15} {'documents':>10} {'seconds':>8} {'docs/s':>8}")
+    for r in results:
+        print(
+            f"{r['design']:>15} {r['documents']:>10} {r['seconds']:>8.1f} "
+            f"{r['documents_per_second']:>8.0f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,102 @@
+"""
+Benchmark of `get_strata` on a generated content store: the single pass through the
+taxon chains of the content items (`get_level1_taxon_title`), and the previous
+implementation, which exploded the taxon chains into a dataframe of taxons, replaced
+the missing values with `applymap`, filtered the level-1 taxons and merged their titles
+back. Reports the time and the peak memory allocated, and checks that the outputs of
+both are identical.
+
+The taxonomy and the taxons of the content items are generated as in
+`bench_taxon_chains`. From the root directory of this project, run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_strata --items 500000
+```
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.make_strata.benchmarks.bench_taxon_chains import make_taxonomy
+from src.make_strata.preprocess_content import resolve_taxon_chain
+from src.make_strata.strata import get_strata
+
+
+def get_strata_exploded(content_store_df: pd.DataFrame) -> pd.DataFrame:
+    """The previous implementation of `get_strata`."""
+    replace_value = {"title": "", "level": 1}
+    taxons = content_store_df[["base_path", "taxons"]].copy()
+    taxons = taxons.explode("taxons").explode("taxons")
+    taxons = taxons.applymap(lambda x: replace_value if isinstance(x, float) else x)
+    taxons = taxons[[isinstance(x, dict) and x["level"] == 1 for x in taxons["taxons"]]]
+    taxons["taxon_level1"] = taxons["taxons"].apply(lambda x: x.get("title"))
+    taxons = taxons[["base_path", "taxon_level1"]].copy()
+    taxons.drop_duplicates(inplace=True)
+    taxons.drop_duplicates(subset="base_path", keep="first", inplace=True)
+    return pd.merge(
+        content_store_df[
+            ["base_path", "schema_name", "document_type", "publishing_app"]
+        ],
+        taxons,
+        how="left",
+        on="base_path",
+        validate="one_to_one",
+    )
+
+
+def make_content_store_df(n_items, branching, depth, seed):
+    """:return: the page paths of the content store, as ContentStore.extract_pagepaths()"""
+    rng = random.Random(seed)
+    taxons = make_taxonomy(branching, depth)
+    taxon_chains = {}
+    return pd.DataFrame(
+        {
+            "base_path": [f"/page-{i}" for i in range(n_items)],
+            "schema_name": "guide",
+            "document_type": "guide",
+            "publishing_app": "publisher",
+            # a tenth of the content items are not tagged to any taxon
+            "taxons": [
+                [
+                    resolve_taxon_chain(taxon, taxon_chains)
+                    for taxon in rng.sample(taxons, rng.randint(1, 4))
+                ]
+                if rng.random() > 0.1
+                else float("nan")
+                for _ in range(n_items)
+            ],
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=500_000)
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    content_store_df = make_content_store_df(
+        args.items, args.branching, args.depth, args.seed
+    )
+    print(f"{len(content_store_df)} content items")
+
+    outputs = []
+    print(f"{'implementation':>15} {'seconds':>8} {'peak MiB':>9}")
+    for name, get_strata_ in {
+        "explode": get_strata_exploded,
+        "single pass": get_strata,
+    }.items():
+        tracemalloc.start()
+        start = time.perf_counter()
+        outputs.append(get_strata_(content_store_df))
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>15} {seconds:>8.2f} {peak / 2**20:>9.1f}")
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
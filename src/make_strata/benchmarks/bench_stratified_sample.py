@@ -0,0 +1,89 @@
+"""
+Benchmark of the stratified random sampling of `sample_paths_by_strata`: the vectorised
+`get_stratified_samples`, drawing the samples of the schemes in one call, and the
+previous implementation, which sampled each stratum of each scheme in a
+`groupby(...).apply(lambda x: x.sample(...))` callback. Both draw samples of the same
+sizes, but not of the same rows.
+
+The strata are generated: `--rows` rows, each in one of `--strata` strata of each of
+`--schemes` schemes, with all the weights equal to 1. From the root directory of this
+project, run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_stratified_sample --rows 1000000 --strata 2000
+```
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.make_strata.sample_paths_by_strata import (
+    get_strata_sizes,
+    get_stratified_samples,
+)
+
+
+def get_stratified_sample_groupby(df, strata_col, weights, sample_size, seed):
+    """The previous implementation of `get_stratified_sample`."""
+    df = df.copy()
+    weighted_size_strata = get_strata_sizes(weights, sample_size)
+    df = df.groupby(strata_col, as_index=False).apply(
+        lambda x: x.sample(n=weighted_size_strata[x.name], random_state=seed)
+    )
+    df["seed"] = seed
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--strata", type=int, default=2000)
+    parser.add_argument("--schemes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    strata_df = pd.DataFrame(
+        {
+            "base_path": [f"/page-{i}" for i in range(args.rows)],
+            **{
+                f"stratum_{j}": pd.Series(rng.integers(0, args.strata, args.rows)).map(
+                    lambda stratum: f"stratum {stratum}"
+                )
+                for j in range(args.schemes)
+            },
+        }
+    )
+    weights = {f"stratum {stratum}": 1 for stratum in range(args.strata)}
+    # a tenth of the smallest stratum per stratum
+    sample_size = args.strata * (strata_df["stratum_0"].value_counts().min() // 10)
+    schemes = {
+        f"stratum_{j}": (f"stratum_{j}", weights, sample_size)
+        for j in range(args.schemes)
+    }
+    print(f"{args.rows} rows, {args.schemes} schemes of {args.strata} strata")
+
+    print(f"{'implementation':>15} {'seconds':>8} {'rows sampled':>13}")
+    start = time.perf_counter()
+    samples = [
+        get_stratified_sample_groupby(strata_df, *scheme, args.seed)
+        for scheme in schemes.values()
+    ]
+    seconds = time.perf_counter() - start
+    print(f"{'groupby-apply':>15} {seconds:>8.2f} {sum(map(len, samples)):>13}")
+
+    start = time.perf_counter()
+    vectorised_samples = get_stratified_samples(strata_df, schemes, args.seed)
+    seconds = time.perf_counter() - start
+    print(
+        f"{'vectorised':>15} {seconds:>8.2f} "
+        f"{sum(map(len, vectorised_samples.values())):>13}"
+    )
+    for sample, (name, vectorised_sample) in zip(samples, vectorised_samples.items()):
+        assert (
+            sample.groupby(name).size().to_dict()
+            == vectorised_sample.groupby(name).size().to_dict()
+        ), "the sizes of the strata differ"
@@ -0,0 +1,80 @@
+"""
+Benchmark of the resolution of the taxon chains of the content items, as in
+`process_url_and_metadata`: the recursive `chain_taxons`, and `resolve_taxon_chain`,
+which memoises the chain of each taxon by content_id, from a cold cache, as in a new
+worker process. The outputs of both are checked to be identical.
+
+The taxonomy is generated: `--branching` child taxons per taxon, `--depth` levels deep,
+and each content item is tagged to 1 to 4 random taxons, with their ancestry expanded
+up to the root taxon as in the `expanded_links` of the content store.
+
+From the root directory of this project, run:
+
+```shell
+python -m src.make_strata.benchmarks.bench_taxon_chains --depth 8 --items 100000
+```
+"""
+
+import argparse
+import random
+import time
+
+from src.make_strata.preprocess_content import chain_taxons, resolve_taxon_chain
+
+
+def make_taxonomy(branching, depth):
+    """:return: the taxons, each with its parent taxons expanded up to the root taxon"""
+    root = {
+        "title": "Root",
+        "content_id": "root",
+        "base_path": "/",
+        "document_type": "taxon",
+        "links": {"root_taxon": []},
+    }
+    level, taxons = [root], [root]
+    for depth_ in range(depth - 1):
+        level = [
+            {
+                "title": f"{parent['title']} {i}",
+                "content_id": f"{parent['content_id']}-{i}",
+                "base_path": f"{parent['base_path'].rstrip('/')}/{i}",
+                "document_type": "taxon",
+                "links": {"parent_taxons": [parent]},
+            }
+            for parent in level
+            for i in range(branching)
+        ]
+        taxons += level
+    return taxons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    taxons = make_taxonomy(args.branching, args.depth)
+    items = [rng.sample(taxons, rng.randint(1, 4)) for _ in range(args.items)]
+    print(f"{len(taxons)} taxons, {len(items)} content items")
+
+    implementations = {
+        "recursive": lambda taxon: chain_taxons(taxon, []),
+        # a new cache per run
+        "memoised": lambda taxon, taxon_chains={}: resolve_taxon_chain(
+            taxon, taxon_chains
+        ),
+    }
+    outputs = []
+    print(f"{'implementation':>15} {'seconds':>8} {'us/item':>8}")
+    for name, resolve in implementations.items():
+        start = time.perf_counter()
+        outputs.append(
+            [[resolve(taxon) for taxon in item_taxons] for item_taxons in items]
+        )
+        seconds = time.perf_counter() - start
+        print(f"{name:>15} {seconds:>8.2f} {seconds / len(items) * 1e6:>8.2f}")
+    assert outputs[0] == outputs[1], "the outputs differ"
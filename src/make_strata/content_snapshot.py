@@ -0,0 +1,297 @@
+import json
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.make_strata.extract_content_store import (
+    EXCLUSION_DOCUMENT_TYPE,
+    EXCLUSION_PUBLISHING_APP,
+    EXCLUSION_SCHEMA_NAME,
+    PAGEPATHS_COLUMNS,
+    PAGEPATHS_FIELDS,
+    ContentStore,
+    content_schema,
+    iter_record_batches,
+    pagepaths_query,
+    write_parquet,
+)
+from src.make_strata.preprocess_content import process_url_and_metadata
+from src.utils.helpers_arrow import iter_merged_batches, iter_parquet_runs, sort_batch
+
+WATERMARK_FIELDS = ["updated_at", "public_updated_at"]
+
+# columns of the page paths holding nested values, saved as JSON strings
+JSON_COLUMNS = ["organisations", "taxons"]
+
+
+def is_included(item):
+    """
+    Whether a content item matches pagepaths_query(): live, English, and not of a
+    blocked publishing app, schema or document type.
+    """
+    return (
+        item.get("publishing_app") not in EXCLUSION_PUBLISHING_APP
+        and item.get("schema_name") not in EXCLUSION_SCHEMA_NAME
+        and item.get("document_type") not in EXCLUSION_DOCUMENT_TYPE
+        and item.get("document_type") is not None
+        and item.get("locale") == "en"
+        and item.get("phase") == "live"
+    )
+
+
+def encode_watermark(value):
+    """
+    :param value: datetime or str, as stored in the content store
+    :return: JSON string keeping the type of the value
+    """
+    if isinstance(value, datetime):
+        return json.dumps({"type": "datetime", "value": value.isoformat()})
+    return json.dumps({"type": "str", "value": str(value)})
+
+
+def decode_watermark(watermark):
+    watermark = json.loads(watermark)
+    if watermark["type"] == "datetime":
+        return datetime.fromisoformat(watermark["value"])
+    return watermark["value"]
+
+
+def changed_query(watermark):
+    """
+    Query of the content items updated or published at or after the watermark, whatever
+    their schema, locale or phase, so that the items unpublished since are found too.
+    """
+    return {"$or": [{field: {"$gte": watermark}} for field in WATERMARK_FIELDS]}
+
+
+class WatermarkTracker:
+    """Tracks the latest updated_at/public_updated_at of the content items read."""
+
+    def __init__(self):
+        self.watermark = None
+
+    def update(self, item):
+        for field in WATERMARK_FIELDS:
+            value = item.get(field)
+            if value is None:
+                continue
+            if self.watermark is None or (
+                type(value) is type(self.watermark) and value > self.watermark
+            ):
+                self.watermark = value
+
+
+class ChangeFilter:
+    """
+    Filters the changed content items read to those kept in the snapshot, tracking the
+    watermark, and, on an incremental update, listing the _id's of the others to delete.
+    """
+
+    def __init__(self, incremental):
+        self.tracker = WatermarkTracker()
+        self.incremental = incremental
+        self.deleted = []
+
+    def delete(self, item):
+        # a snapshot extracted from scratch has no items to delete
+        if self.incremental:
+            self.deleted.append(item["_id"])
+
+    def included(self, items):
+        """:param items: iterable of content items, as queried"""
+        for item in items:
+            self.tracker.update(item)
+            if is_included(item):
+                yield item
+            else:
+                self.delete(item)
+
+    def not_withdrawn(self, items):
+        """:param items: iterable of processed content items"""
+        for item in items:
+            if item["withdrawn"]:
+                self.delete(item)
+            else:
+                yield item
+
+
+class ContentSnapshot:
+    """
+    Local copy of the page paths of the content store, as a Parquet file keyed by
+    base_path, updated incrementally.
+
+    The first update extracts the content items matching pagepaths_query(). The next
+    ones query only the content items updated (updated_at or public_updated_at) since
+    the latest update time read by the previous update, the watermark, saved in the
+    Parquet metadata:
+    - the changed items which match pagepaths_query() replace their previous version;
+    - the others (unpublished, e.g. now of schema "gone" or "redirect", or no longer
+      live or English) and the withdrawn items are deleted from the snapshot.
+    Unlike extract_pagepaths(), the snapshot does not hold the withdrawn items.
+    Content items deleted from the content store altogether cannot be detected from
+    their timestamps: remove the snapshot file to extract everything again.
+
+    Methods
+    -------
+    update()
+        merges the changes since the previous update into the snapshot
+    read_dataframe()
+        returns the snapshot as the dataframe of ContentStore.extract_pagepaths()
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path: str
+            Parquet file of the snapshot
+        """
+        self.path = path
+        self.columns = PAGEPATHS_COLUMNS
+
+    @property
+    def watermark(self):
+        """The latest update time of the content items read by the previous update."""
+        if not os.path.exists(self.path):
+            return None
+        metadata = pq.read_schema(self.path).metadata or {}
+        if b"watermark" not in metadata:
+            return None
+        return decode_watermark(metadata[b"watermark"].decode("utf-8"))
+
+    def read(self):
+        """:return: pyarrow.Table"""
+        if not os.path.exists(self.path):
+            return content_schema(self.columns).empty_table()
+        return pq.read_table(self.path)
+
+    def read_dataframe(self):
+        """
+        :return: pd.DataFrame, with the nested columns (taxons, organisations) decoded,
+            and NaN where they are missing, as in ContentStore.extract_pagepaths()
+        """
+        df = self.read().to_pandas()
+        for col in JSON_COLUMNS:
+            df[col] = [
+                json.loads(value) if value is not None else float("nan")
+                for value in df[col]
+            ]
+        return df
+
+    def write(self, record_batches, watermark):
+        """
+        Replaces the snapshot file by the record batches, written as they come, with
+        the watermark in its metadata.
+        """
+        schema = content_schema(self.columns)
+        if watermark is not None:
+            schema = schema.with_metadata({"watermark": encode_watermark(watermark)})
+        tmp_path = f"{self.path}.tmp"
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for batch in record_batches:
+                writer.write_batch(batch)
+        os.replace(tmp_path, self.path)
+
+    def query(self, mongodb_collection, previous_watermark):
+        """
+        :return: cursor of the content items changed since the previous watermark, or,
+            on the first update, of the content items matching pagepaths_query(), in no
+            particular order: each batch of them is sorted before the batches are merged
+        """
+        query = (
+            pagepaths_query()
+            if previous_watermark is None
+            else changed_query(previous_watermark)
+        )
+        return mongodb_collection.find(
+            query, {**PAGEPATHS_FIELDS, "phase": 1}, no_cursor_timeout=True
+        )
+
+    def merge(self, changed_path, deleted, batch_size):
+        """
+        Merges the changed rows into the snapshot, by batches.
+        :param changed_path: Parquet file of the changed rows, one row group per run
+            of rows ordered by base_path
+        :param deleted: list of the base_path's to delete
+        :param batch_size: number of rows per record batch
+        :return: generator of the record batches of the merged snapshot, ordered by
+            base_path, and the number of rows deleted
+        """
+        runs = iter_parquet_runs(pq.ParquetFile(changed_path), "base_path", batch_size)
+        if not os.path.exists(self.path):
+            return iter_merged_batches(runs, batch_size, "base_path"), 0
+
+        deleted = pa.array(deleted, pa.string())
+        removed = pa.concat_arrays(
+            [deleted] + [chunk for base_paths, _ in runs for chunk in base_paths.chunks]
+        )
+        snapshot = pq.ParquetFile(self.path)
+        base_paths = snapshot.read(columns=["base_path"]).column("base_path")
+        is_kept = pc.invert(pc.is_in(base_paths, value_set=removed))
+        kept = (
+            batch.filter(pc.invert(pc.is_in(batch["base_path"], value_set=removed)))
+            for batch in snapshot.iter_batches(batch_size=batch_size)
+        )
+        runs.insert(0, (base_paths.filter(is_kept), kept))
+        num_deleted = pc.sum(pc.is_in(base_paths, value_set=deleted)).as_py() or 0
+        return iter_merged_batches(runs, batch_size, "base_path"), num_deleted
+
+    def update(self, content_store=None, mongodb_collection=None, batch_size=10_000):
+        """
+        Queries the content items changed since the watermark, and merges them into the
+        snapshot.
+        :param content_store: ContentStore processing the content items
+        :param mongodb_collection: default: ContentStore.init_client()
+        :param batch_size: number of rows per record batch, and per batch of changed
+            rows written to disk before they are merged
+        :return: dict with the numbers of items upserted and deleted, and the watermark
+        """
+        content_store = content_store or ContentStore()
+        if mongodb_collection is None:
+            mongodb_collection = content_store.init_client()
+        previous_watermark = self.watermark
+        changes = ChangeFilter(incremental=previous_watermark is not None)
+        processed = content_store.iter_processed_items(
+            changes.included(self.query(mongodb_collection, previous_watermark)),
+            process_url_and_metadata,
+        )
+        changed_path = f"{self.path}.changed.tmp"
+        try:
+            num_changed = write_parquet(
+                (
+                    sort_batch(batch, "base_path")
+                    for batch in iter_record_batches(
+                        changes.not_withdrawn(processed), self.columns, batch_size
+                    )
+                ),
+                changed_path,
+                self.columns,
+            )
+            watermark = changes.tracker.watermark
+            if watermark is None:
+                watermark = previous_watermark
+            merged, num_deleted = self.merge(changed_path, changes.deleted, batch_size)
+            self.write(merged, watermark)
+        finally:
+            if os.path.exists(changed_path):
+                os.remove(changed_path)
+
+        return {
+            "upserted": num_changed,
+            # the deleted items which were in the snapshot
+            "deleted": num_deleted,
+            "watermark": watermark,
+        }
+
+
+if __name__ == "__main__":
+
+    SNAPSHOT_FILEPATH = "src/make_strata/data/content_store_pagepaths.parquet"
+
+    snapshot = ContentSnapshot(SNAPSHOT_FILEPATH)
+    print(f"watermark before the update: {snapshot.watermark}")
+    print(f"update: {snapshot.update()}")
+    print(f"size of the snapshot: {snapshot.read().num_rows}")
@@ -3,11 +3,19 @@
 
 # -*- coding: utf-8 -*-
 
+import json
 import logging
 import logging.config
 import multiprocessing
 import warnings
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from itertools import islice
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pymongo
 from tqdm import tqdm
 
@@ -94,6 +102,355 @@ EXCLUSION_SCHEMA_NAME = [
 
 EXCLUSION_DOCUMENT_TYPE = ["world_news_story", "welsh_language_scheme"]
 
+PAGEPATHS_FIELDS = {
+    "expanded_links.organisations": 1,
+    "expanded_links.taxons": 1,
+    "title": 1,
+    "locale": 1,
+    "schema_name": 1,
+    "document_type": 1,
+    "content_id": 1,
+    "first_published_at": 1,
+    "public_updated_at": 1,
+    "updated_at": 1,
+    "withdrawn_notice": 1,
+    "publishing_app": 1,
+}
+
+CONTENT_FIELDS = {
+    "expanded_links.ordered_contacts": 1,
+    "details.body": 1,
+    "details.step_by_step_nav": 1,
+    "details.brand": 1,
+    "details.documents": 1,
+    "details.attachments": 1,
+    "details.email_addresses": 1,
+    "details.final_outcome_detail": 1,
+    "details.final_outcome_documents": 1,
+    "details.government": 1,
+    "details.groups.name": 1,
+    "details.groups.description": 1,
+    "details.headers": 1,
+    "details.introduction": 1,
+    "details.introductory_paragraph": 1,
+    "details.licence_overview": 1,
+    "details.licence_short_description": 1,
+    "details.logo": 1,
+    "details.metadata": 1,
+    "details.more_information": 1,
+    "details.more_info_phone_number": 1,
+    "details.more_info_post_address": 1,
+    "details.more_info_email_address": 1,
+    "details.need_to_know": 1,
+    "details.nodes": 1,
+    "details.other_ways_to_apply": 1,
+    "details.summary": 1,
+    "details.ways_to_respond": 1,
+    "details.what_you_need_to_know": 1,
+    "details.will_continue_on": 1,
+    "details.parts": 1,
+    "details.phone_numbers": 1,
+    "details.post_addresses": 1,
+    "details.collection_groups": 1,
+    "details.transaction_start_link": 1,
+    "title": 1,
+    "locale": 1,
+    "schema_name": 1,
+    "document_type": 1,
+    "content_id": 1,
+    "first_published_at": 1,
+    "public_updated_at": 1,
+    "updated_at": 1,
+    "withdrawn_notice": 1,
+    "publishing_app": 1,
+}
+
+
+def pagepaths_query(
+    block_list_pubapp=EXCLUSION_PUBLISHING_APP,
+    block_list_schema=EXCLUSION_SCHEMA_NAME,
+    block_list_doctypes=EXCLUSION_DOCUMENT_TYPE,
+):
+    """Query of the live English content items, but for the blocked apps and types."""
+    return {
+        "$and": [
+            {"publishing_app": {"$nin": block_list_pubapp}},
+            {"schema_name": {"$nin": block_list_schema}},
+            {"document_type": {"$nin": block_list_doctypes}},
+            {"locale": "en"},
+            {"phase": "live"},
+        ]
+    }
+
+
+def content_query(pagepaths_list=None):
+    """
+    Query of the live English content items of a list of page paths, or of all the
+    live English content items if `pagepaths_list` is None.
+    """
+    query = [{"locale": "en"}, {"phase": "live"}]
+    if pagepaths_list is not None:
+        query.insert(0, {"_id": {"$in": pagepaths_list}})
+    return {"$and": query}
+
+
+PAGEPATHS_COLUMNS = [
+    "base_path",
+    "content_id",
+    "title",
+    "publishing_app",
+    "locale",
+    "schema_name",
+    "document_type",
+    "organisations",
+    "taxons",
+    "first_published_at",
+    "public_updated_at",
+    "updated_at",
+    "withdrawn",
+    "withdrawn_at",
+    "withdrawn_explanation",
+]
+
+# the fields of the content items output by `process_content_item`
+CONTENT_COLUMNS = [
+    "base_path",
+    "content_id",
+    "title",
+    "description",
+    "publishing_app",
+    "locale",
+    "schema_name",
+    "document_type",
+    "first_published_at",
+    "public_updated_at",
+    "updated_at",
+    "withdrawn",
+    "withdrawn_at",
+    "withdrawn_explanation",
+    "withdrawn_notice",
+    "text",
+    "contact_details",
+    "details_parts",
+    "details",
+]
+
+# number of content items per task sent to a worker process when streaming: the
+# tasks start small, for the first results to come quickly, and grow up to the maximum
+STREAM_INITIAL_CHUNKSIZE = 4
+STREAM_CHUNKSIZE = 64
+
+
+def imap_bounded(
+    pool,
+    func,
+    items,
+    num_workers,
+    chunksize=STREAM_CHUNKSIZE,
+    max_in_flight=None,
+    initial_chunksize=None,
+):
+    """
+    Like `pool.imap(func, items, chunksize)`, in order, but reads `items` only as fast as
+    the results are consumed: at most `max_in_flight` chunks (by default, two per worker)
+    are read and processed ahead of the consumer. `pool.imap` reads all the items
+    into its task queue upfront, and queues all the results until they are consumed.
+    The chunks are sized without knowing the number of items: they start at
+    `initial_chunksize` items and double with each chunk, up to `chunksize`.
+    :param pool: multiprocessing.Pool
+    :param func: function applied to each item, in the worker processes
+    :param items: iterable, e.g. a pymongo cursor
+    :param num_workers: number of processes of the pool
+    :param chunksize: (maximum) number of items per task
+    :param max_in_flight: number of tasks submitted ahead of the consumer
+    :param initial_chunksize: number of items of the first task (default: chunksize)
+    :return: generator of func(item)
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * num_workers
+    items = iter(items)
+    pending = deque()
+    size = min(initial_chunksize or chunksize, chunksize)
+
+    def submit():
+        nonlocal size
+        chunk = list(islice(items, size))
+        if chunk:
+            pending.append(pool.map_async(func, chunk, chunksize=len(chunk)))
+        size = min(2 * size, chunksize)
+
+    for _ in range(max_in_flight):
+        submit()
+    while pending:
+        results = pending.popleft().get()
+        submit()
+        yield from results
+
+
+def to_string_value(value):
+    """
+    Converts a field of a content item to a Parquet string value: nested values
+    (e.g. details, taxons) are encoded as JSON, other values as strings.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def content_schema(columns):
+    """Arrow schema of the content items: strings, but for the boolean `withdrawn`."""
+    return pa.schema(
+        [(col, pa.bool_() if col == "withdrawn" else pa.string()) for col in columns]
+    )
+
+
+def to_record_batch(content_items, columns):
+    """
+    :param content_items: list of processed content items
+    :param columns: fields kept, missing fields are null
+    :return: pyarrow.RecordBatch
+    """
+    schema = content_schema(columns)
+    arrays = []
+    for field in schema:
+        values = [item.get(field.name) for item in content_items]
+        if field.type != pa.bool_():
+            values = [to_string_value(value) for value in values]
+        arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(content_items, columns, batch_size=10_000):
+    """
+    Groups processed content items into record batches of up to `batch_size` rows, as
+    `create_content_dataframe` does for the whole content store: `_id` is renamed
+    `base_path`, and the items without a document_type are dropped.
+    :param content_items: iterable of processed content items
+    :param columns: fields kept, see PAGEPATHS_COLUMNS and CONTENT_COLUMNS
+    :param batch_size: number of rows per record batch
+    :return: generator of pyarrow.RecordBatch
+    """
+    batch = []
+    for item in content_items:
+        if item.get("document_type") is None:
+            continue
+        item["base_path"] = item.pop("_id", None)
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield to_record_batch(batch, columns)
+            batch = []
+    if batch:
+        yield to_record_batch(batch, columns)
+
+
+def write_parquet(record_batches, path, columns):
+    """
+    Writes record batches to a Parquet file as they come, one row group per batch.
+    :return: number of rows written
+    """
+    num_rows = 0
+    with pq.ParquetWriter(path, content_schema(columns)) as writer:
+        for batch in record_batches:
+            writer.write_batch(batch)
+            num_rows += batch.num_rows
+    return num_rows
+
+
+MONGO_ADDRESS = "mongodb://localhost:27017/"
+
+# number of documents per range scanned by a worker, and fetched per round trip
+SCAN_RANGE_SIZE = 2000
+SCAN_BATCH_SIZE = 1000
+
+
+def get_collection(mongo_client):
+    return mongo_client["content_store"]["content_items"]
+
+
+def id_range_filter(lower, upper):
+    """Filter of the _id's in [lower, upper), where None is unbounded."""
+    bounds = {}
+    if lower is not None:
+        bounds["$gte"] = lower
+    if upper is not None:
+        bounds["$lt"] = upper
+    return {"_id": bounds} if bounds else {}
+
+
+def ranges_of_sorted_ids(ids, range_size=SCAN_RANGE_SIZE):
+    """
+    Splits sorted _id's into contiguous ranges of `range_size` _id's.
+    :return: list of (lower, upper) bounds of the _id's in [lower, upper), where None
+        is unbounded
+    """
+    boundaries = [id_ for i, id_ in enumerate(ids) if i > 0 and i % range_size == 0]
+    return list(zip([None] + boundaries, boundaries + [None]))
+
+
+def id_ranges(mongodb_collection, range_size=SCAN_RANGE_SIZE):
+    """
+    Splits the collection into contiguous _id ranges of `range_size` documents, with a
+    scan of the _id index only (covered by the index, without reading the documents
+    nor filtering them). The query of the range scans is applied within each range, so
+    a range holds at most `range_size` matching documents, and possibly much fewer.
+    :return: list of (lower, upper) bounds, see ranges_of_sorted_ids()
+    """
+    ids = (
+        mongodb_collection.find({}, {"_id": 1}, batch_size=10 * range_size)
+        .sort("_id", 1)
+        .hint("_id_")
+    )
+    return ranges_of_sorted_ids((item["_id"] for item in ids), range_size)
+
+
+# state of a range scan worker, set once per worker by init_scan_worker()
+_scan_worker = {}
+
+
+def init_scan_worker(client_factory, query, fields, process, batch_size, pagepaths):
+    """
+    Opens the collection of a range scan worker, and keeps what is common to all its
+    ranges, so that the tasks carry only the bounds of their range.
+    :param pagepaths: sorted page paths the scans are restricted to, or None
+    """
+    _scan_worker.update(
+        collection=get_collection(client_factory()),
+        query=query,
+        fields=fields,
+        process=process,
+        batch_size=batch_size,
+        pagepaths=pagepaths,
+    )
+
+
+def scan_id_range(bounds):
+    """
+    Fetches the documents of one _id range, with the projection applied by the server,
+    and processes them in the worker which fetched them. If the worker's scans are
+    restricted to a list of page paths, only those of the range are queried.
+    :param bounds: (lower, upper) bounds of the _id range, see ranges_of_sorted_ids()
+    :return: list of processed content items
+    """
+    lower, upper = bounds
+    pagepaths = _scan_worker["pagepaths"]
+    if pagepaths is None:
+        id_range = id_range_filter(lower, upper)
+    else:
+        start = 0 if lower is None else bisect_left(pagepaths, lower)
+        end = len(pagepaths) if upper is None else bisect_left(pagepaths, upper)
+        if start == end:
+            return []
+        id_range = {"_id": {"$in": pagepaths[start:end]}}
+    cursor = _scan_worker["collection"].find(
+        {"$and": [_scan_worker["query"], id_range]},
+        _scan_worker["fields"],
+        batch_size=_scan_worker["batch_size"],
+    )
+    process = _scan_worker["process"]
+    return [process(item) for item in cursor]
+
 
 class ContentStore:
     """
@@ -124,7 +481,7 @@ class ContentStore:
 
         self.selected_pagepaths = selected_pagepaths
 
-    def init_client(self, address="mongodb://localhost:27017/"):
+    def init_client(self, address=MONGO_ADDRESS):
         """
         :param address:
         :return:
@@ -148,34 +505,17 @@ class ContentStore:
         :param block_list:
         :return:
         """
-        fields = {
-            "expanded_links.organisations": 1,
-            "expanded_links.taxons": 1,
-            "title": 1,
-            "locale": 1,
-            "schema_name": 1,
-            "document_type": 1,
-            "content_id": 1,
-            "first_published_at": 1,
-            "public_updated_at": 1,
-            "updated_at": 1,
-            "withdrawn_notice": 1,
-            "publishing_app": 1,
-        }
-
-        query = {
-            "$and": [
-                {"publishing_app": {"$nin": block_list_pubapp}},
-                {"schema_name": {"$nin": block_list_schema}},
-                {"document_type": {"$nin": block_list_doctypes}},
-                {"locale": "en"},
-                {"phase": "live"},
-            ]
-        }
+        query = pagepaths_query(
+            block_list_pubapp, block_list_schema, block_list_doctypes
+        )
 
         self.logger.info("Querying db...")
-        content_items = mongodb_collection.find(query, fields, no_cursor_timeout=True)
-        num_docs = mongodb_collection.count_documents(query)
+        content_items = mongodb_collection.find(
+            query, PAGEPATHS_FIELDS, no_cursor_timeout=True
+        )
+        # the query is not run a second time to count the matching documents:
+        # the number of documents of the collection is an upper bound, for the logs only
+        num_docs = mongodb_collection.estimated_document_count()
 
         return content_items, num_docs
 
@@ -185,122 +525,126 @@ class ContentStore:
         :param pagepaths_list:
         :return:
         """
-
-        fields = {
-            "expanded_links.ordered_contacts": 1,
-            "details.body": 1,
-            "details.step_by_step_nav": 1,
-            "details.brand": 1,
-            "details.documents": 1,
-            "details.attachments": 1,
-            "details.email_addresses": 1,
-            "details.final_outcome_detail": 1,
-            "details.final_outcome_documents": 1,
-            "details.government": 1,
-            "details.groups.name": 1,
-            "details.groups.description": 1,
-            "details.headers": 1,
-            "details.introduction": 1,
-            "details.introductory_paragraph": 1,
-            "details.licence_overview": 1,
-            "details.licence_short_description": 1,
-            "details.logo": 1,
-            "details.metadata": 1,
-            "details.more_information": 1,
-            "details.more_info_phone_number": 1,
-            "details.more_info_post_address": 1,
-            "details.more_info_email_address": 1,
-            "details.need_to_know": 1,
-            "details.nodes": 1,
-            "details.other_ways_to_apply": 1,
-            "details.summary": 1,
-            "details.ways_to_respond": 1,
-            "details.what_you_need_to_know": 1,
-            "details.will_continue_on": 1,
-            "details.parts": 1,
-            "details.phone_numbers": 1,
-            "details.post_addresses": 1,
-            "details.collection_groups": 1,
-            "details.transaction_start_link": 1,
-            "title": 1,
-            "locale": 1,
-            "schema_name": 1,
-            "document_type": 1,
-            "content_id": 1,
-            "first_published_at": 1,
-            "public_updated_at": 1,
-            "updated_at": 1,
-            "withdrawn_notice": 1,
-            "publishing_app": 1,
-        }
-
-        query = {
-            "$and": [
-                {"_id": {"$in": pagepaths_list}},
-                {"locale": "en"},
-                {"phase": "live"},
-            ]
-        }
+        query = content_query(pagepaths_list)
 
         self.logger.info("Querying db...")
-        content_items = mongodb_collection.find(query, fields, no_cursor_timeout=True)
-        num_docs = mongodb_collection.count_documents(query)
+        content_items = mongodb_collection.find(
+            query, CONTENT_FIELDS, no_cursor_timeout=True
+        )
+        # the query is not run a second time to count the matching documents:
+        # the number of documents of the collection is an upper bound, for the logs only
+        num_docs = mongodb_collection.estimated_document_count()
 
         return content_items, num_docs
 
-    def multiprocess_content_urls(self, content_item_cursor, num_docs):
+    def iter_processed_items(
+        self, content_item_cursor, process, chunksize=STREAM_CHUNKSIZE
+    ):
         """
-        :param content_item_cursor:
-        :return:
+        Processes the content items in worker processes, and yields them in order as
+        they are processed, while the workers keep processing the next ones.
+        Memory is bounded by the number of items in flight (see imap_bounded).
+        The progress bar counts the items read, whatever the size of the cursor.
+        :param content_item_cursor: iterable of content items
+        :param process: process_url_and_metadata or process_content_item
+        :param chunksize: maximum number of items per task sent to a worker
+        :return: generator of processed content items
         """
-        self.logger.info("Computing cursor size...")
-        num_docs = num_docs
-        num_work = int(multiprocessing.cpu_count() / 2)
-        chunksize, extra = divmod(num_docs, num_work * 4)
-        if extra:
-            chunksize += 1
-
-        self.logger.info(
-            "Got {num_docs} documents. {num_work} workers, {chunksize} items per worker cycle."
-        )
+        num_work = max(1, int(multiprocessing.cpu_count() / 2))
+        self.logger.info(f"{num_work} workers, up to {chunksize} items per task.")
         self.logger.info("Working...")
         pool = multiprocessing.Pool(processes=num_work)
-        results = pool.imap(
-            process_url_and_metadata,
-            (content_item for content_item in tqdm(content_item_cursor)),
-            chunksize=chunksize,
+        try:
+            yield from imap_bounded(
+                pool,
+                process,
+                (content_item for content_item in tqdm(content_item_cursor)),
+                num_work,
+                chunksize=chunksize,
+                initial_chunksize=STREAM_INITIAL_CHUNKSIZE,
+            )
+        finally:
+            # all the results are consumed, or the consumer stopped early
+            pool.terminate()
+            pool.join()
+        self.logger.info("Finished...")
+
+    def iter_range_scans(
+        self,
+        query,
+        fields,
+        process,
+        client_factory=None,
+        range_size=SCAN_RANGE_SIZE,
+        batch_size=SCAN_BATCH_SIZE,
+        pool_class=multiprocessing.Pool,
+        pagepaths=None,
+    ):
+        """
+        Splits the collection into _id ranges (see id_ranges()), and has each worker
+        fetch the documents of a range matching `query` with its own cursor, then
+        process them. The ranges hold about the same number of documents of the
+        collection, not of matching documents. Unlike
+        iter_processed_items(), the documents are not fetched and decoded by this
+        process. Yields the processed content items in _id order.
+        The query, the projection and the page paths are sent once to each worker, and
+        each task only carries the bounds of its range.
+        :param query: e.g. pagepaths_query() or content_query()
+        :param fields: projection, e.g. PAGEPATHS_FIELDS or CONTENT_FIELDS
+        :param process: process_url_and_metadata or process_content_item
+        :param client_factory: returns a MongoClient, called in each worker
+        :param range_size: number of documents of the collection (or page paths) per
+            range
+        :param batch_size: number of documents per round trip to the database
+        :param pool_class: multiprocessing.Pool, or a thread pool
+        :param pagepaths: optional list of page paths the documents are restricted to:
+            the ranges are split from the page paths, without querying the database
+        :return: generator of processed content items
+        """
+        if client_factory is None:
+            client_factory = partial(pymongo.MongoClient, MONGO_ADDRESS)
+        if pagepaths is None:
+            mongo_client = client_factory()
+            ranges = id_ranges(get_collection(mongo_client), range_size)
+            mongo_client.close()
+        else:
+            pagepaths = sorted(set(pagepaths))
+            ranges = ranges_of_sorted_ids(pagepaths, range_size)
+
+        num_work = max(1, int(multiprocessing.cpu_count() / 2))
+        self.logger.info(f"{len(ranges)} ranges, {num_work} workers.")
+        pool = pool_class(
+            processes=num_work,
+            initializer=init_scan_worker,
+            initargs=(client_factory, query, fields, process, batch_size, pagepaths),
         )
-        pool.close()
-        pool.join()
+        try:
+            for items in imap_bounded(
+                pool, scan_id_range, tqdm(ranges), num_work, chunksize=1
+            ):
+                yield from items
+        finally:
+            pool.terminate()
+            pool.join()
         self.logger.info("Finished...")
-        return results
+
+    def multiprocess_content_urls(self, content_item_cursor, num_docs):
+        """
+        :param content_item_cursor:
+        :param num_docs: (estimated) number of documents, for the logs only
+        :return: generator of processed content items
+        """
+        self.logger.info(f"Got at most {num_docs} documents.")
+        return self.iter_processed_items(content_item_cursor, process_url_and_metadata)
 
     def multiprocess_content_items(self, content_item_cursor, num_docs):
         """
         :param content_item_cursor:
-        :return:
+        :param num_docs: (estimated) number of documents, for the logs only
+        :return: generator of processed content items
         """
-        self.logger.info("Computing cursor size...")
-        num_docs = num_docs
-        num_work = int(multiprocessing.cpu_count() / 2)
-        chunksize, extra = divmod(num_docs, num_work * 4)
-        if extra:
-            chunksize += 1
-
-        self.logger.info(
-            "Got {num_docs} documents. {num_work} workers, {chunksize} items per worker cycle."
-        )
-        self.logger.info("Working...")
-        pool = multiprocessing.Pool(processes=num_work)
-        results = pool.imap(
-            process_content_item,
-            (content_item for content_item in tqdm(content_item_cursor)),
-            chunksize=chunksize,
-        )
-        pool.close()
-        pool.join()
-        self.logger.info("Finished...")
-        return results
+        self.logger.info(f"Got at most {num_docs} documents.")
+        return self.iter_processed_items(content_item_cursor, process_content_item)
 
     def create_pagepaths_dataframe(self, content_item_list, num_docs):
         """
@@ -308,23 +652,7 @@ class ContentStore:
         :return:
         """
 
-        cols = [
-            "base_path",
-            "content_id",
-            "title",
-            "publishing_app",
-            "locale",
-            "schema_name",
-            "document_type",
-            "organisations",
-            "taxons",
-            "first_published_at",
-            "public_updated_at",
-            "updated_at",
-            "withdrawn",
-            "withdrawn_at",
-            "withdrawn_explanation",
-        ]
+        cols = PAGEPATHS_COLUMNS
 
         self.logger.info(f"Creating content_store dataframe with columns {cols}...")
 
@@ -372,3 +700,62 @@ class ContentStore:
         content_item_df = self.create_content_dataframe(content_items, num_docs)
 
         return content_item_df
+
+    def extract_pagepaths_to_parquet(self, path, batch_size=10_000, range_scans=True):
+        """
+        Same as extract_pagepaths(), streamed to a Parquet file, so that memory is
+        bounded by the batch size rather than by the size of the content store.
+        Nested fields (organisations, taxons) are encoded as JSON strings.
+        With range_scans, the workers fetch the documents themselves (see
+        iter_range_scans()); otherwise, they are fetched with a single cursor.
+        :return: number of rows written
+        """
+        if range_scans:
+            content_items = self.iter_range_scans(
+                pagepaths_query(), PAGEPATHS_FIELDS, process_url_and_metadata
+            )
+        else:
+            content_db = self.init_client()
+            content_items = self.multiprocess_content_urls(
+                *self.query_db_get_pagepaths(content_db)
+            )
+        return write_parquet(
+            iter_record_batches(
+                content_items,
+                PAGEPATHS_COLUMNS,
+                batch_size,
+            ),
+            path,
+            PAGEPATHS_COLUMNS,
+        )
+
+    def extract_content_to_parquet(self, path, batch_size=10_000, range_scans=True):
+        """
+        Same as extract_content(), streamed to a Parquet file, so that memory is
+        bounded by the batch size rather than by the size of the content store.
+        Nested fields (details, withdrawn_notice, details_parts) are encoded as JSON
+        strings. With range_scans, the workers fetch the documents themselves (see
+        iter_range_scans()); otherwise, they are fetched with a single cursor.
+        :return: number of rows written
+        """
+        if range_scans:
+            content_items = self.iter_range_scans(
+                content_query(),
+                CONTENT_FIELDS,
+                process_content_item,
+                pagepaths=self.selected_pagepaths,
+            )
+        else:
+            content_db = self.init_client()
+            content_items = self.multiprocess_content_items(
+                *self.query_db_get_content(content_db, self.selected_pagepaths)
+            )
+        return write_parquet(
+            iter_record_batches(
+                content_items,
+                CONTENT_COLUMNS,
+                batch_size,
+            ),
+            path,
+            CONTENT_COLUMNS,
+        )
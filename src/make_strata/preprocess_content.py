@@ -20,7 +20,7 @@ def process_url_and_metadata(item):
         if "taxons" in item["expanded_links"]:
             taxon_list = []
             for taxon in item["expanded_links"]["taxons"]:
-                taxon_chain = chain_taxons(taxon, [])
+                taxon_chain = resolve_taxon_chain(taxon)
                 taxon_list.append(taxon_chain)
 
             item["taxons"] = taxon_list
@@ -230,6 +230,54 @@ def chain_taxons(taxon, taxon_list):
             return index_taxon_chain(taxon_list + [get_taxon_data(taxon)])
 
 
+# the taxon chains resolved by this process, by taxon content_id: the ancestry of a
+# taxon is the same in the expanded links of all the content items tagged to it
+TAXON_CHAINS = {}
+
+# deeper chains are cycles in the parent_taxons links
+MAX_TAXON_DEPTH = 100
+
+
+def resolve_taxon_chain(taxon, taxon_chains=TAXON_CHAINS):
+    """
+    Same as chain_taxons(taxon, []), with the chains of the taxon and of its parents
+    memoised in taxon_chains, so that an ancestry shared by many content items is
+    resolved once per process.
+    :param taxon: taxon of the expanded links of a content item
+    :param taxon_chains: dict of the chains resolved so far, by taxon content_id
+    :return: list of the taxon data, from the taxon up to its root taxon, with their
+        level (1 for the root taxon), or None if the chain does not reach a root taxon.
+        The dicts of the taxon data are shared by the chains of the taxon and of its
+        children in this process: they must not be modified.
+    """
+    # the taxons, from `taxon` up, whose chain is not resolved yet
+    unresolved = []
+    chain = ()
+    while "links" in taxon:
+        if taxon.get("content_id") in taxon_chains:
+            chain = taxon_chains[taxon["content_id"]]
+            break
+        unresolved.append(taxon)
+        if len(unresolved) > MAX_TAXON_DEPTH:
+            raise ValueError(f"taxon chain deeper than {MAX_TAXON_DEPTH}: {taxon}")
+        if "parent_taxons" in taxon["links"]:
+            taxon = taxon["links"]["parent_taxons"][0]
+        elif "root_taxon" in taxon["links"]:
+            break
+        else:
+            return None
+    else:
+        return None
+
+    for taxon in reversed(unresolved):
+        taxon_data = get_taxon_data(taxon)
+        taxon_data["level"] = len(chain) + 1
+        chain = (taxon_data,) + chain
+        taxon_chains[taxon_data["content_id"]] = chain
+    # a new list per content item, as from chain_taxons()
+    return list(chain)
+
+
 def resize_for_input_limits(text):
     """
     Neo4j has a max input size (by default) of 2MB for content item text - adhere to this to avoid import failures.
@@ -1,4 +1,5 @@
 import re
+import threading
 
 # from bs4 import BeautifulSoup
 from lxml import etree
@@ -19,11 +20,70 @@ def is_html_like(text):
     return False
 
 
+def is_non_html_content(data) -> bool:
+    """
+    Checks whether data is a dict of content of another type than html, e.g. one of
+    the {"content_type": "text/govspeak", "content": ...} items of a multiple content
+    type body
+    """
+    return (
+        isinstance(data, dict)
+        and "content_type" in data
+        and data["content_type"] != "text/html"
+    )
+
+
+def iter_values(data: Union[list, dict]):
+    return iter(data.values() if isinstance(data, dict) else data)
+
+
+def iter_html_fragments(data: Union[List[dict], dict]):
+    """
+    Walks depth-first through nested lists and dicts, with an explicit stack, and
+    yields the html strings in order, skipping the branches of non-html content types
+    :param data: content_item['details'], or a nested list or dict of it
+    """
+    stack = [iter_values(data)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, (list, dict)):
+                if not is_non_html_content(item):
+                    stack.append(iter_values(item))
+                    break
+            elif is_html_like(item):
+                yield item
+        else:
+            stack.pop()
+
+
+def join_html_fragments(data: Union[List[dict], dict]) -> str:
+    """
+    Joins the html strings of nested lists and dicts, with the whitespace at both ends
+    of each list or dict stripped, and runs of spaces collapsed
+    :param data: content_item['details'], or a nested list or dict of it
+    """
+    # the fragments of the lists and dicts being walked through
+    stack = [(iter_values(data), [])]
+    while True:
+        values, fragments = stack[-1]
+        for item in values:
+            if isinstance(item, (list, dict)) and not is_non_html_content(item):
+                stack.append((iter_values(item), []))
+                break
+            fragments.append(item if is_html_like(item) else " ")
+        else:
+            html = re.sub(" +", " ", " ".join(fragments)).strip()
+            stack.pop()
+            if not stack:
+                return html
+            stack[-1][1].append(html)
+
+
 def extract_text_from_content_details(
     data: Union[List[dict], dict], keep_html=False
 ) -> str:
     """
-    Recurses through lists and dicts to find html and then extract text or html if specified
+    Walks through lists and dicts to find html and then extract text or html if specified
 
     Args:
         data: content_item['details']. This function can accept a nested list or dict, or string.
@@ -31,26 +91,19 @@ def extract_text_from_content_details(
         The extract content as plain text.
 
     """
-    if isinstance(data, list):
-        # whitespace aggregated as we skip through unsuitable text fragments (slugs, titles, govspeak)
-        return re.sub(
-            " +",
-            " ",
-            " ".join(
-                [extract_text_from_content_details(item, keep_html) for item in data]
-            ),
-        ).strip()
-    elif isinstance(data, dict):
-        if "content_type" in data.keys() and data["content_type"] != "text/html":
-            return " "
-        return extract_text_from_content_details(list(data.values()), keep_html)
-    elif is_html_like(data):
-        # could be optional
-        # data = remove_tables_from_html(data)
-        if keep_html:
-            return data
-        return extract_text_from_html(data)
-    return " "
+    if not isinstance(data, (list, dict)) or is_non_html_content(data):
+        if is_html_like(data):
+            # could be optional
+            # data = remove_tables_from_html(data)
+            return data if keep_html else extract_text_from_html(data)
+        return " "
+    if keep_html:
+        return join_html_fragments(data)
+    # the text extracted is stripped, with whitespace normalised, or " " if empty:
+    # whitespace aggregated as we skip through unsuitable text fragments (slugs,
+    # titles, govspeak) is dropped at once
+    texts = (extract_text_from_html(html) for html in iter_html_fragments(data))
+    return " ".join(text for text in texts if text != " ")
 
 
 # def extract_links_from_content_details(data):
@@ -81,9 +134,26 @@ def extract_text_from_content_details(
 #    return str(soup)
 
 
+# compiled XPath objects cannot be shared across threads
+_thread_local = threading.local()
+
+
+def get_text_nodes_xpath():
+    """
+    :return: the compiled "//text()" XPath of this thread, returning plain strings
+        rather than "smart" strings referencing their parent element
+    """
+    xpath = getattr(_thread_local, "text_nodes_xpath", None)
+    if xpath is None:
+        xpath = _thread_local.text_nodes_xpath = etree.XPath(
+            "//text()", smart_strings=False
+        )
+    return xpath
+
+
 def extract_text_from_html(body: str) -> str:
     """
-    Extract text from html body
+    Extract text from html body, with whitespace normalised in a single pass
     :param body: <str> containing html.
     """
     r = None
@@ -91,11 +161,9 @@ def extract_text_from_html(body: str) -> str:
     if body and body != "\n" and not body.isspace():
         try:
             tree = etree.HTML(body)
-            r = tree.xpath("//text()")
-            r = " ".join(r)
-            r = r.strip().replace("\n", " ").replace("\r", " ").replace("\t", " ")
-            r = r.replace("\n", " ").replace('\\"', '"')
-            r = " ".join(r.split())
+            if tree is not None:
+                r = " ".join(get_text_nodes_xpath()(tree))
+                r = " ".join(r.replace('\\"', '"').split())
         except ValueError as e:
             print("exception @ extract:", type(body), body, e)
     if not r:
@@ -1,40 +1,103 @@
+from typing import Dict, Tuple
+
+import numpy as np
 import pandas as pd
 import yaml
-from typing import Dict
 
+# bits of the random keys of the rows (a permutation of their positions), prefixed
+# with their stratum in int64 sort keys
+RANDOM_KEY_BITS = 40
 
-def get_stratified_sample(
-    df: pd.DataFrame,
-    strata_col: str,
-    weights: Dict[str, int],
-    sample_size: int,
-    seed: int,
-) -> pd.DataFrame:
-    """ """
-    df = df.copy()
+
+def get_strata_sizes(weights: Dict[str, float], sample_size: int) -> Dict[str, int]:
+    """
+    Returns the sample size of each stratum: its weight times the size of the strata if
+    they were all of the same size.
+    """
     num_strata = len(weights)
     size_strata_if_equal_size = int(round(sample_size / num_strata, 0))
-    weighted_size_strata = {
+    return {
         stratum: int(round(weight * size_strata_if_equal_size, 0))
         for stratum, weight in weights.items()
     }
 
-    df = df.groupby(strata_col, as_index=False).apply(
-        lambda x: x.sample(n=weighted_size_strata[x.name], random_state=seed)
-    )
 
-    df["seed"] = seed
+def get_stratified_samples(
+    df: pd.DataFrame,
+    schemes: Dict[str, Tuple[str, Dict[str, float], int]],
+    seed: int,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Draws a stratified random sample of the rows of df for each sampling scheme, with
+    vectorised operations whatever the number of strata: the rows get a random key per
+    scheme, a random permutation of their positions, from a generator seeded with
+    `seed`, and the rows of each stratum with the lowest keys are sampled, up to the
+    sample size of the stratum.
+    The samples of the schemes are independent, and reproducible for a given seed,
+    df and order of the schemes: the sample of the first scheme is the one drawn by
+    get_stratified_sample() with the same seed.
+    Args:
+        df: the rows to sample from, e.g. the output of get_strata()
+        schemes: (strata_col, weights, sample_size) of each sampling scheme, by name
+        seed: seed of the random keys
+    Returns:
+        The sample of each scheme, ordered by stratum, with the original index and a
+        "seed" column. The rows with a missing stratum are never sampled.
+    Raises:
+        KeyError: if a stratum of df has no weight
+        ValueError: if a stratum has fewer rows than its sample size
+    """
+    rng = np.random.default_rng(seed)
+    random_keys = [rng.permutation(len(df)) for _ in schemes]
+    samples = {}
+    for i, (name, (strata_col, weights, sample_size)) in enumerate(schemes.items()):
+        # -1 for the missing strata
+        codes, strata = pd.factorize(df[strata_col], sort=True)
+        strata_sizes = get_strata_sizes(weights, sample_size)
+        sizes = np.array([strata_sizes[stratum] for stratum in strata], dtype=np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(strata))
+        if (counts < sizes).any():
+            j = np.argmax(counts < sizes)
+            raise ValueError(
+                f"{name}: cannot sample {sizes[j]} rows from the {counts[j]} rows of "
+                f"stratum {strata[j]!r}"
+            )
+
+        # the rows by stratum, then by random key, and their rank within their stratum:
+        # one sort of the random keys prefixed with the strata, which are all distinct
+        order = np.argsort((codes << RANDOM_KEY_BITS) | random_keys[i])
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ranks = np.arange(len(order)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(order)])
+        )
+
+        is_sampled = (sorted_codes >= 0) & (ranks < sizes[sorted_codes])
+        samples[name] = df.iloc[order[is_sampled]].assign(seed=seed)
+    return samples
 
-    return df
+
+def get_stratified_sample(
+    df: pd.DataFrame,
+    strata_col: str,
+    weights: Dict[str, float],
+    sample_size: int,
+    seed: int,
+) -> pd.DataFrame:
+    """
+    Draws a stratified random sample of the rows of df, see get_stratified_samples().
+    """
+    return get_stratified_samples(
+        df, {strata_col: (strata_col, weights, sample_size)}, seed
+    )[strata_col]
 
 
 if __name__ == "__main__":
 
+    import argparse
     import os
     from datetime import date
 
-    import argparse
-
     strata_parser = argparse.ArgumentParser(
         description="Run src.make_strata.sample_paths_by_strata"
     )
@@ -110,10 +173,17 @@ if __name__ == "__main__":
         for row in strata_df.taxon_level1_orig
     ]
 
-    # stratified random sample by schemas/document_types
-    schemas_stratified_random_sample_df = get_stratified_sample(
-        strata_df, "schema_strata_name", SCHEMAS_WEIGHTS, SCHEMA_DOCS_SAMPLE_SIZE, SEED
+    # stratified random samples by schemas/document_types and by taxons
+    stratified_random_samples = get_stratified_samples(
+        strata_df,
+        {
+            "schemas": ("schema_strata_name", SCHEMAS_WEIGHTS, SCHEMA_DOCS_SAMPLE_SIZE),
+            "taxons": ("taxon_level1", TAXONS_WEIGHTS, TAXONS_SAMPLE_SIZE),
+        },
+        SEED,
     )
+
+    schemas_stratified_random_sample_df = stratified_random_samples["schemas"]
     print(
         "Stratified random sample by Schema name/Document type: sample sizes by strata"
     )
@@ -127,10 +197,7 @@ if __name__ == "__main__":
         ["seed", "schema_name", "document_type", "schema_strata_name", "base_path"]
     ].to_csv(STRATA_DOCTYPE_OUTPATH, index=False)
 
-    # stratified random sample by taxons
-    taxons_stratified_random_sample_df = get_stratified_sample(
-        strata_df, "taxon_level1", TAXONS_WEIGHTS, TAXONS_SAMPLE_SIZE, SEED
-    )
+    taxons_stratified_random_sample_df = stratified_random_samples["taxons"]
     print("Stratified random sample by Taxons: sample sizes by strata")
     print(taxons_stratified_random_sample_df.groupby("taxon_level1").base_path.count())
     actual_sample_taxons = dict(
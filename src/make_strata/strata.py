@@ -1,4 +1,5 @@
 import pandas as pd
+from pandas.api.types import is_list_like
 
 
 def get_strata(content_store_df: pd.DataFrame) -> pd.DataFrame:
@@ -9,68 +10,60 @@ def get_strata(content_store_df: pd.DataFrame) -> pd.DataFrame:
         A dataframe with base_path, schema_name, document_type and first-level taxon as columns.
         When a base_path has multiple first-level taxons, only one is kept.
     """
-    taxons = filter_level1_taxon(content_store_df, "base_path", "taxons")
-    taxons["taxon_level1"] = dictcolumn_to_col(taxons, "taxons", "title")
-    taxons = taxons[["base_path", "taxon_level1"]].copy()
-
-    # for base_path's with several of the same level-1 taxon
-    taxons.drop_duplicates(inplace=True)
-    # for base_path with more than one level-1 taxon, let's retain only one
-    taxons.drop_duplicates(subset="base_path", keep="first", inplace=True)
-
-    strata_df = pd.merge(
-        content_store_df[
-            ["base_path", "schema_name", "document_type", "publishing_app"]
-        ],
-        taxons,
-        how="left",
-        on="base_path",
-        validate="one_to_one",
+    if not content_store_df["base_path"].is_unique:
+        raise ValueError("the base_path's of the content store are not unique")
+
+    strata_df = content_store_df[
+        ["base_path", "schema_name", "document_type", "publishing_app"]
+    ].reset_index(drop=True)
+    strata_df["taxon_level1"] = pd.Series(
+        [get_level1_taxon_title(taxons) for taxons in content_store_df["taxons"]],
+        dtype=object,
     )
 
     return strata_df
 
 
-def filter_level1_taxon(df: pd.DataFrame, id_col: str, taxon_col: str) -> pd.DataFrame:
+def explode_value(value) -> list:
     """
-    Only keep the level-1 taxon for each content item.
-    Original index is preserved.
+    The values a list-like value is exploded into by pd.Series.explode(): its items, or
+    NaN if it is empty. Other values are kept as they are.
     """
-    REPLACE_VALUE = {"title": "", "level": 1}
-
-    taxons_df = df[[id_col, taxon_col]].copy()
-
-    try:
-        # each row contains exactly one dict: {id: val}
-        exploded_df = taxons_df.explode(taxon_col).explode(taxon_col)
-
-        # replace NaN with empty dict
-        exploded_df = exploded_df.applymap(
-            lambda x: REPLACE_VALUE if isinstance(x, float) else x
-        )
+    if is_list_like(value):
+        return list(value) or [float("nan")]
+    return [value]
 
-        # return level-1 taxon only
-        return exploded_df[
-            [isinstance(x, dict) and x["level"] == 1 for x in exploded_df[taxon_col]]
-        ]
-    except Exception as e:
-        print(e)
 
-
-def dictcolumn_to_col(df: pd.DataFrame, dict_col: str, dict_value: str):
+def get_level1_taxon_title(taxons):
     """
-    Return the dict[dict_value] as a separate column.
+    Returns the title of the first level-1 taxon of a content item, in a single pass
+    through its taxon chains, without exploding them into a dataframe.
+    A missing value (NaN) or empty list of taxons, or empty taxon chain, counts as a
+    level-1 taxon with an empty title.
+    Args:
+        taxons: the taxon chains of a content item, lists of taxon dicts, from the
+            leaf taxon up to its level-1 taxon, or NaN
+    Returns:
+        The title, "", or NaN if no taxon is of level 1.
     """
-
-    return df[dict_col].apply(lambda x: x.get(dict_value))
+    for taxon_chain in explode_value(taxons):
+        for taxon in explode_value(taxon_chain):
+            if isinstance(taxon, float):
+                return ""
+            if isinstance(taxon, dict) and taxon["level"] == 1:
+                return taxon.get("title")
+    return float("nan")
 
 
 if __name__ == "__main__":
 
-    from src.make_strata.extract_content_store import ContentStore
+    from src.make_strata.content_snapshot import ContentSnapshot
 
-    content_store = ContentStore()
-    content_store_df = content_store.extract_pagepaths()
+    # the local snapshot of the content store, updated with the changes since its last update
+    SNAPSHOT_FILEPATH = "src/make_strata/data/content_store_pagepaths.parquet"
+    snapshot = ContentSnapshot(SNAPSHOT_FILEPATH)
+    print(f"update of the content store snapshot: {snapshot.update()}")
+    content_store_df = snapshot.read_dataframe()
     print(f"size of content store: {content_store_df.shape}")
     print(
         f"number of unique base_path in content_store_df: {content_store_df.base_path.nunique()}"
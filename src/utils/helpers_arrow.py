@@ -0,0 +1,104 @@
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+def sort_batch(batch: pa.RecordBatch, key: str) -> pa.RecordBatch:
+    """Returns the record batch ordered by its `key` column."""
+    return batch.take(pc.sort_indices(batch, sort_keys=[(key, "ascending")]))
+
+
+class RowReader:
+    """Reads a given number of rows at a time from an iterable of record batches."""
+
+    def __init__(self, batches: Iterable[pa.RecordBatch]):
+        self.batches = iter(batches)
+        self.pending = None
+
+    def read(self, num_rows: int) -> pa.Table:
+        """Returns the next `num_rows` rows."""
+        read = []
+        while num_rows:
+            if self.pending is None or not self.pending.num_rows:
+                self.pending = next(self.batches)
+            rows = self.pending.slice(0, num_rows)
+            self.pending = self.pending.slice(rows.num_rows)
+            read.append(rows)
+            num_rows -= rows.num_rows
+        return pa.Table.from_batches(read)
+
+
+def iter_merged_batches(
+    runs: List[Tuple[pa.ChunkedArray, Iterable[pa.RecordBatch]]],
+    batch_size: int,
+    key: str,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Merges runs of rows ordered by their `key` column, without holding more than a
+    batch of each run in memory: only the keys of all the rows are, to find how many
+    rows of each run a merged batch takes.
+    :param runs: list of (keys of the rows of the run, in order, iterable of the record
+        batches of the run)
+    :param batch_size: number of rows per merged batch
+    :param key: name of the column the runs are ordered by
+    :return: generator of record batches, ordered by `key`
+    """
+    if not runs:
+        return
+    keys = pa.chunked_array(
+        [chunk for run_keys, _ in runs for chunk in run_keys.chunks],
+        runs[0][0].type,
+    )
+    run_ids = np.repeat(np.arange(len(runs)), [len(run_keys) for run_keys, _ in runs])
+    merged_run_ids = run_ids[pc.sort_indices(keys).to_numpy()]
+    readers = [RowReader(batches) for _, batches in runs]
+    for start in range(0, len(merged_run_ids), batch_size):
+        counts = np.bincount(
+            merged_run_ids[start : start + batch_size], minlength=len(runs)
+        )
+        merged = pa.concat_tables(
+            [reader.read(count) for reader, count in zip(readers, counts) if count]
+        )
+        yield from merged.sort_by(key).combine_chunks().to_batches()
+
+
+def iter_parquet_runs(
+    parquet_file: pq.ParquetFile, key: str, batch_size: int
+) -> List[Tuple[pa.ChunkedArray, Iterator[pa.RecordBatch]]]:
+    """
+    Returns the row groups of a Parquet file, each ordered by `key`, as runs to merge
+    with iter_merged_batches(): their keys, and their record batches, read lazily.
+    """
+    return [
+        (
+            parquet_file.read_row_group(i, columns=[key]).column(key),
+            parquet_file.iter_batches(batch_size=batch_size, row_groups=[i]),
+        )
+        for i in range(parquet_file.num_row_groups)
+    ]
+
+
+def row_groups_with_values(
+    parquet_file: pq.ParquetFile, column: str, values: Sequence
+) -> List[int]:
+    """
+    Returns the row groups of a Parquet file which may hold some of the `values` of a
+    column, according to the min/max statistics of the column in each row group.
+    :param values: sorted values, without nulls
+    """
+    metadata = parquet_file.metadata
+    index = parquet_file.schema_arrow.get_field_index(column)
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        statistics = metadata.row_group(i).column(index).statistics
+        if statistics is None or not statistics.has_min_max:
+            row_groups.append(i)
+            continue
+        position = bisect_left(values, statistics.min)
+        if position < len(values) and values[position] <= statistics.max:
+            row_groups.append(i)
+    return row_groups
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import math
+
+import httpx
+import pytest
+
+from fast_api_model_serving.benchmarks.load_test import (
+    DEFAULT_LINES,
+    LineSampler,
+    parse_mix,
+    percentile,
+    read_lines,
+    run_load,
+)
+
+LINES = {"title": ["Universal Credit"], "text": ["Rishi Sunak became Prime Minister"]}
+
+
+def test_percentile_interpolates():
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert math.isnan(percentile([], 50))
+
+
+def test_parse_mix_is_correct():
+    assert parse_mix("title=0.15, description=0.15,text=0.7") == {
+        "title": 0.15,
+        "description": 0.15,
+        "text": 0.7,
+    }
+
+
+def test_read_lines_of_the_default_lines():
+    lines = read_lines(DEFAULT_LINES)
+    assert {"title", "description", "text"} <= set(lines)
+    assert all(lines.values())
+
+
+def test_line_sampler_draws_the_parts_of_the_mix():
+    sampler = LineSampler(LINES, {"title": 1.0, "description": 1.0}, seed=0)
+    instance = sampler.payload("ner", batch_size=3)
+    assert instance["part_of_page"] == "title"
+    assert instance["text"] == "Universal Credit"
+    payload = sampler.payload("ner-vertex-ai", batch_size=3)
+    assert [instance["line_number"] for instance in payload["instances"]] == [2, 3, 4]
+
+
+def test_line_sampler_rejects_a_mix_without_lines():
+    with pytest.raises(ValueError):
+        LineSampler(LINES, {"description": 1.0}, seed=0)
+
+
+def run_against(handler, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://test"
+        ) as client:
+            return await run_load(
+                client, sampler=LineSampler(LINES, {"text": 1.0}, seed=0), **kwargs
+            )
+
+    return asyncio.run(run())
+
+
+def test_run_load_at_a_fixed_rate():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200 if len(requests) % 2 else 503, json={})
+
+    result = run_against(
+        handler,
+        endpoint="ner-vertex-ai",
+        batch_size=2,
+        rps=40,
+        concurrency=2,
+        duration=0.1,
+    )
+    assert len(requests) == result["requests"] == 4
+    assert result["endpoint"] == "/ner-vertex-ai"
+    assert result["status_codes"] == {"200": 2, "503": 2}
+    # the texts of the successful requests only
+    assert result["texts_per_sec"] == pytest.approx(4 / result["elapsed_seconds"])
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["max"]
+
+
+def test_run_load_back_to_back():
+    def handler(request):
+        return httpx.Response(200, json={})
+
+    result = run_against(
+        handler, endpoint="ner", batch_size=2, rps=0, concurrency=2, duration=0.05
+    )
+    assert result["requests"] > 0
+    assert result["status_codes"] == {"200": result["requests"]}
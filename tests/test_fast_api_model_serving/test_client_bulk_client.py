@@ -0,0 +1,119 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from fast_api_model_serving.client.bulk_client import (
+    pack_requests,
+    predict_to_file,
+    read_instances,
+)
+
+INSTANCES = [
+    {"url": f"https://www.gov.uk/page-{i}", "text": "word " * i, "line_number": i}
+    for i in range(50)
+]
+
+
+def fake_api(fail_first: int = 0, status_code: int = 503):
+    """A stand-in for the API: one prediction per instance, after a random delay."""
+    calls = {"n": 0, "sizes": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if calls["n"] <= fail_first:
+            return httpx.Response(status_code)
+        instances = json.loads(request.content)["instances"]
+        calls["sizes"].append(len(instances))
+        await asyncio.sleep(random.random() / 100)
+        return httpx.Response(
+            200,
+            json={
+                "predictions": [
+                    {
+                        "url": instance.get("url"),
+                        "entities": [],
+                        "line_number": instance.get("line_number"),
+                        "part_of_page": instance.get("part_of_page"),
+                    }
+                    for instance in instances
+                ]
+            },
+        )
+
+    return httpx.MockTransport(handler), calls
+
+
+def run(instances, outfile, transport, **kwargs):
+    return asyncio.run(
+        predict_to_file(
+            instances, str(outfile), "http://test", transport=transport, **kwargs
+        )
+    )
+
+
+def test_read_instances_jsonl_and_parquet(tmp_path):
+    rows = [{"url": "https://www.gov.uk/a", "text": "A", "extra": 1}, {"text": "B"}]
+    jsonl = tmp_path / "instances.jsonl"
+    jsonl.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n")
+    parquet = tmp_path / "instances.parquet"
+    pq.write_table(pa.Table.from_pylist(rows), parquet)
+
+    assert list(read_instances(str(jsonl))) == [
+        {"url": "https://www.gov.uk/a", "text": "A"},
+        {"text": "B"},
+    ]
+    assert list(read_instances(str(parquet))) == [
+        {"url": "https://www.gov.uk/a", "text": "A"},
+        {"url": None, "text": "B"},
+    ]
+
+
+def test_pack_requests_respects_budgets():
+    requests = list(pack_requests(INSTANCES, max_tokens=100, max_instances=8))
+    assert [i for request in requests for i in request] == INSTANCES
+    for request in requests:
+        assert len(request) <= 8
+        assert len(request) == 1 or sum(len(i["text"]) // 4 + 1 for i in request) <= 100
+
+
+def test_pack_requests_oversized_instance_is_alone():
+    instances = [{"text": "a"}, {"text": "a" * 1000}, {"text": "a"}]
+    assert [len(r) for r in pack_requests(instances, 10, 10)] == [1, 1, 1]
+
+
+def test_predict_to_file_writes_predictions_in_order(tmp_path):
+    transport, calls = fake_api()
+    outfile = tmp_path / "predictions.jsonl"
+    n = run(INSTANCES, outfile, transport, concurrency=4, max_instances=3)
+
+    predictions = [json.loads(line) for line in outfile.read_text().splitlines()]
+    assert n == len(INSTANCES)
+    assert [p["url"] for p in predictions] == [i["url"] for i in INSTANCES]
+    assert max(calls["sizes"]) == 3
+
+
+def test_predict_to_file_retries_transient_errors(tmp_path):
+    transport, calls = fake_api(fail_first=2)
+    outfile = tmp_path / "predictions.jsonl"
+    n = run(INSTANCES[:5], outfile, transport, concurrency=1, backoff=0)
+    assert n == 5
+    assert calls["n"] == 3
+
+
+def test_predict_to_file_gives_up_after_max_retries(tmp_path):
+    transport, calls = fake_api(fail_first=10)
+    with pytest.raises(httpx.HTTPStatusError):
+        run(INSTANCES[:5], tmp_path / "out.jsonl", transport, max_retries=2, backoff=0)
+    assert calls["n"] == 3
+
+
+def test_predict_to_file_does_not_retry_client_errors(tmp_path):
+    transport, calls = fake_api(fail_first=1, status_code=422)
+    with pytest.raises(httpx.HTTPStatusError):
+        run(INSTANCES[:5], tmp_path / "out.jsonl", transport, backoff=0)
+    assert calls["n"] == 1
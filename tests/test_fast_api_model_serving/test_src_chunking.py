@@ -0,0 +1,69 @@
+import pytest
+import spacy
+
+from fast_api_model_serving.src.chunking import split_text, split_texts
+from fast_api_model_serving.src.inference import extract_entities
+
+LONG_TEXT = (
+    "Rishi Sunak became Prime Minister on 25 October 2022. "
+    "He was previously Chancellor of the Exchequer!\n"
+    "Contact HM Treasury on 020 7270 5000? Rishi Sunak lives in London; "
+    + "the quick brown fox jumps over the lazy dog " * 20
+    + "Rishi Sunak"
+)
+
+
+@pytest.fixture(scope="module")
+def nlp_entity_ruler():
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns(
+        [
+            {"label": "PERSON", "pattern": "Rishi Sunak"},
+            {"label": "DATE", "pattern": "25 October 2022"},
+            {"label": "GPE", "pattern": "London"},
+        ]
+    )
+    return nlp
+
+
+@pytest.mark.parametrize("max_chars", [1, 7, 20, 50, 100, 1000])
+def test_split_text_pieces_are_contiguous_and_short(max_chars):
+    pieces = split_text(LONG_TEXT, max_chars)
+    assert "".join(piece for _, piece in pieces) == LONG_TEXT
+    assert all(len(piece) <= max_chars for _, piece in pieces)
+    assert all(LONG_TEXT[offset:].startswith(piece) for offset, piece in pieces)
+
+
+def test_split_text_cuts_at_sentence_boundaries():
+    pieces = [piece for _, piece in split_text(LONG_TEXT, 110)]
+    assert pieces[:3] == [
+        "Rishi Sunak became Prime Minister on 25 October 2022. "
+        "He was previously Chancellor of the Exchequer!\n",
+        "Contact HM Treasury on 020 7270 5000? Rishi Sunak lives in London; ",
+        "the quick brown fox jumps over the lazy dog "
+        "the quick brown fox jumps over the lazy dog the quick brown fox ",
+    ]
+
+
+def test_split_text_short_text_is_one_piece():
+    assert split_text("Short", 10) == [(0, "Short")]
+    assert split_text("", 10) == [(0, "")]
+
+
+def test_split_texts_is_correct():
+    pieces, origins = split_texts(["a b", "One. Two. Three.", ""], 10)
+    assert pieces == ["a b", "One. Two. ", "Three.", ""]
+    assert origins == [(0, 0), (1, 0), (1, 10), (2, 0)]
+
+
+@pytest.mark.parametrize("chunk_chars", [30, 60, 110, 500])
+def test_extract_entities_chunked_offsets_match_unchunked(
+    nlp_entity_ruler, chunk_chars
+):
+    texts = ["Rishi Sunak", LONG_TEXT, "Nothing", LONG_TEXT[:60]]
+    expected = extract_entities(nlp_entity_ruler, texts, batch_size=4)
+    actual = extract_entities(nlp_entity_ruler, texts, 4, chunk_chars=chunk_chars)
+    assert actual == expected
+    for text, entities in zip(texts, actual):
+        assert all(text[ent.start : ent.end] == ent.name for ent in entities)
@@ -0,0 +1,92 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+import spacy
+
+from fast_api_model_serving.src.inference import (
+    extract_entities,
+    extract_instance_entities,
+)
+from fast_api_model_serving.src.schemas import InputContent
+
+TEXT = "Rishi Sunak became Prime Minister"
+
+
+@pytest.fixture(scope="module")
+def nlp_combined():
+    # the structure of the pipeline returned by combine_ner_components, with rule-based
+    # entities standing in for the NER components
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer", name="transformer")
+    nlp.add_pipe("entity_ruler", name="ner_2").add_patterns(
+        [{"label": "TITLE", "pattern": "Prime Minister"}]
+    )
+    nlp.add_pipe("entity_ruler", name="ner").add_patterns(
+        [{"label": "PERSON", "pattern": "Rishi Sunak"}]
+    )
+    return nlp
+
+
+def entity_types(entities):
+    return [
+        [entity.type for entity in document_entities] for document_entities in entities
+    ]
+
+
+def test_extract_instance_entities_selects_phases_and_labels(nlp_combined):
+    instances = [
+        InputContent(text=TEXT),
+        InputContent(text=TEXT, phases=[1]),
+        InputContent(text=TEXT, phases=[2]),
+        InputContent(text=TEXT, labels=["PERSON"]),
+        InputContent(text=TEXT, phases=[2], labels=["PERSON"]),
+    ]
+    entities = extract_instance_entities(nlp_combined, instances, batch_size=8)
+    assert entity_types(entities) == [
+        ["PERSON", "TITLE"],
+        ["PERSON"],
+        ["TITLE"],
+        ["PERSON"],
+        [],
+    ]
+
+
+def test_extract_instance_entities_request_selection(nlp_combined):
+    instances = [InputContent(text=TEXT), InputContent(text=TEXT, phases=[1, 2])]
+    entities = extract_instance_entities(
+        nlp_combined, instances, batch_size=8, phases=[2]
+    )
+    assert entity_types(entities) == [["TITLE"], ["PERSON", "TITLE"]]
+
+
+def test_extract_instance_entities_groups_instances(nlp_combined, monkeypatch):
+    # instances needing the same components are run together, with the others disabled
+    calls = []
+    pipe = nlp_combined.pipe
+
+    def recording_pipe(texts, batch_size, disable):
+        calls.append((list(texts), disable))
+        return pipe(texts, batch_size=batch_size, disable=disable)
+
+    monkeypatch.setattr(nlp_combined, "pipe", recording_pipe)
+    instances = [
+        InputContent(text="a", phases=[1]),
+        InputContent(text="b", labels=["TITLE"]),
+        InputContent(text="c", labels=["PERSON"]),
+    ]
+    extract_instance_entities(nlp_combined, instances, batch_size=8)
+    assert calls == [(["a", "c"], ["ner_2"]), (["b"], ["transformer", "ner"])]
+
+
+def test_extract_entities_disables_gradients_in_the_calling_thread(nlp_combined):
+    torch = MagicMock()
+    with patch.dict(sys.modules, {"torch": torch}):
+        # as in a threadpool worker of the /ner-ndjson endpoint
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(
+                extract_entities, nlp_combined, [TEXT, "A", "B"], batch_size=2
+            ).result()
+    # entered once per batch of nlp.pipe
+    assert torch.no_grad.return_value.__enter__.call_count == 2
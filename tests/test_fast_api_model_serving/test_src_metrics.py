@@ -0,0 +1,141 @@
+import pytest
+import spacy
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from fast_api_model_serving.src.inference import (
+    extract_entities,
+    extract_instance_entities,
+)
+from fast_api_model_serving.src.metrics import (
+    PrometheusMiddleware,
+    latest_metrics,
+    record_request,
+)
+from fast_api_model_serving.src.schemas import InputContent
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok(request: Request):
+        return {"received_at": request.state.received_at}
+
+    @app.get("/fail")
+    async def fail():
+        raise ValueError("boom")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a", b"b"]))
+
+    app.add_middleware(PrometheusMiddleware, paths=["/ok", "/fail", "/stream"])
+    return TestClient(app, raise_server_exceptions=False)
+
+
+@pytest.mark.parametrize(
+    "path, label, status",
+    [
+        ("/ok", "/ok", "200"),
+        ("/stream", "/stream", "200"),
+        ("/unknown", "other", "404"),
+    ],
+)
+def test_middleware_records_request_latency(client, path, label, status):
+    labels = {"path": label, "status": status}
+    before = sample("ner_request_latency_seconds_count", labels)
+    client.get(path)
+    assert sample("ner_request_latency_seconds_count", labels) == before + 1
+
+
+def test_middleware_records_server_errors(client):
+    labels = {"path": "/fail", "status": "500"}
+    before = sample("ner_request_latency_seconds_count", labels)
+    assert client.get("/fail").status_code == 500
+    assert sample("ner_request_latency_seconds_count", labels) == before + 1
+    assert sample("ner_requests_in_progress") == 0
+
+
+def test_middleware_sets_received_at(client):
+    assert isinstance(client.get("/ok").json()["received_at"], float)
+
+
+def test_record_request():
+    before_count = sample("ner_queue_wait_seconds_count")
+    before_chars = sample("ner_request_characters_sum")
+    record_request(0.0, 5)
+    record_request(None, 1)
+    assert sample("ner_queue_wait_seconds_count") == before_count + 1
+    assert sample("ner_request_characters_sum") == before_chars + 6
+
+
+def test_extract_entities_records_model_metrics():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([{"label": "GPE", "pattern": "London"}])
+    before_texts = sample("ner_texts_total")
+    before_batches = sample("ner_inference_latency_seconds_count")
+    before_batch_texts = sample("ner_batch_size_sum")
+    before_entities = sample("ner_entities_per_document_sum")
+
+    entities = extract_entities(nlp, ["London and London", "Paris", "London"], 2)
+
+    assert [len(document_entities) for document_entities in entities] == [2, 0, 1]
+    assert sample("ner_texts_total") == before_texts + 3
+    # one observation per batch of `nlp.pipe`
+    assert sample("ner_inference_latency_seconds_count") == before_batches + 2
+    assert sample("ner_batch_size_sum") == before_batch_texts + 3
+    assert sample("ner_entities_per_document_sum") == before_entities + 3
+
+
+def test_extract_entities_runs_duplicate_texts_once():
+    seen = []
+
+    @spacy.Language.component("record_texts")
+    def record_texts(doc):
+        seen.append(doc.text)
+        return doc
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([{"label": "GPE", "pattern": "London"}])
+    nlp.add_pipe("record_texts")
+    texts = ["Contact", "London", "Contact", "Paris", "London", "Contact"]
+
+    entities = extract_entities(nlp, texts, 8)
+
+    assert seen == ["Contact", "London", "Paris"]
+    lengths = [len(document_entities) for document_entities in entities]
+    assert lengths == [0, 1, 0, 0, 1, 0]
+    assert entities[1] == entities[4] and entities[1] is not entities[4]
+
+
+def test_extract_instance_entities_records_duplicate_texts_once():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler", name="ner_2")
+    nlp.add_pipe("entity_ruler", name="ner")
+    # two groups of instances, by the phases selected
+    instances = [
+        InputContent(text="Contact", phases=[1]),
+        InputContent(text="Contact", phases=[1]),
+        InputContent(text="London", phases=[2]),
+        InputContent(text="London", phases=[2]),
+        InputContent(text="London", phases=[2]),
+    ]
+    before_count = sample("ner_duplicate_texts_count")
+    before_duplicates = sample("ner_duplicate_texts_sum")
+
+    extract_instance_entities(nlp, instances, 8)
+
+    assert sample("ner_duplicate_texts_count") == before_count + 1
+    assert sample("ner_duplicate_texts_sum") == before_duplicates + 3
+
+
+def test_latest_metrics_exposes_metrics():
+    assert b"ner_request_latency_seconds" in latest_metrics()
@@ -1,5 +1,16 @@
-from unittest.mock import MagicMock
-from fast_api_model_serving.src.model_helpers import combine_ner_components
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+import spacy
+
+from fast_api_model_serving.src.model_helpers import (
+    combine_ner_components,
+    components_to_disable,
+    inference_mode,
+    set_torch_threads,
+    threads_per_worker,
+)
 
 
 def test_combine_ner_components_replace_listeners():
@@ -34,3 +45,63 @@ def test_combine_ner_components_add_pipe():
     ner_trf1.add_pipe.assert_called_with(
         "ner", name="ner_2", source=ner_trf2, before="ner"
     )
+
+
+@pytest.mark.parametrize(
+    "n_workers, n_cpus, expected",
+    [(1, 8, 8), (2, 8, 4), (4, 8, 2), (3, 8, 2), (16, 8, 1), (0, 8, 8)],
+)
+def test_threads_per_worker(n_workers, n_cpus, expected):
+    assert threads_per_worker(n_workers, n_cpus) == expected
+
+
+def test_inference_mode_disables_gradients():
+    torch = MagicMock()
+    with patch.dict(sys.modules, {"torch": torch}):
+        assert inference_mode() is torch.no_grad.return_value
+
+
+def test_inference_mode_without_torch():
+    # a None entry in sys.modules makes the import fail
+    with patch.dict(sys.modules, {"torch": None}):
+        with inference_mode():
+            pass
+
+
+def test_set_torch_threads():
+    torch = MagicMock()
+    with patch.dict(sys.modules, {"torch": torch}):
+        set_torch_threads(3)
+    torch.set_num_threads.assert_called_once_with(3)
+
+
+@pytest.fixture(scope="module")
+def nlp_combined():
+    # the structure of the pipeline returned by combine_ner_components, with rule-based
+    # entities standing in for the NER components
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer", name="transformer")
+    nlp.add_pipe("entity_ruler", name="ner_2").add_patterns(
+        [{"label": "TITLE", "pattern": "Prime Minister"}]
+    )
+    nlp.add_pipe("entity_ruler", name="ner").add_patterns(
+        [{"label": "PERSON", "pattern": "Rishi Sunak"}]
+    )
+    return nlp
+
+
+@pytest.mark.parametrize(
+    "phases, labels, expected",
+    [
+        (None, None, ()),
+        ([1, 2], None, ()),
+        ([1], None, ("ner_2",)),
+        ([2], None, ("transformer", "ner")),
+        (None, ["PERSON"], ("ner_2",)),
+        (None, ["TITLE", "PERSON"], ()),
+        ([2], ["PERSON"], ("transformer", "ner", "ner_2")),
+        (None, ["MONEY"], ("transformer", "ner", "ner_2")),
+    ],
+)
+def test_components_to_disable(nlp_combined, phases, labels, expected):
+    assert components_to_disable(nlp_combined, phases, labels) == expected
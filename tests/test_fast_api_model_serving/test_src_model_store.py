@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from fast_api_model_serving.benchmarks.stand_in_models import build_stand_in_models
+from fast_api_model_serving.src.model_store import (
+    ModelStore,
+    load_model,
+    model_files_fingerprint,
+)
+
+
+@pytest.fixture(scope="module")
+def model_paths(tmp_path_factory):
+    # tiny untrained pipelines with the structure of the phase-1 and phase-2 models
+    return build_stand_in_models(str(tmp_path_factory.mktemp("models")))
+
+
+def set_meta_version(path, version):
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["version"] = version
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
+
+def test_load_model_combines_the_models(model_paths):
+    model = load_model(*model_paths)
+    assert model.nlp.pipe_names == ["transformer", "ner_2", "ner"]
+    assert model.generation == 0
+    # the same models have the same version
+    assert load_model(*model_paths).version == model.version
+
+
+def test_reload_swaps_the_model(model_paths):
+    prepared, swaps = [], []
+    old = load_model(*model_paths)
+    store = ModelStore(old, prepare=prepared.append)
+    store.add_swap_hook(lambda new, previous: swaps.append((new, previous)))
+
+    new = store.reload()
+
+    assert store.model is new
+    assert new.generation == 1
+    # the new pipeline is prepared before it is swapped in
+    assert prepared == [new.nlp]
+    assert swaps == [(new, old)]
+    # requests holding the old model can still use it
+    assert old.nlp("Rishi Sunak") is not None
+
+
+def test_reload_from_other_paths_changes_the_version(model_paths, tmp_path):
+    store = ModelStore(load_model(*model_paths))
+    other_paths = build_stand_in_models(str(tmp_path))
+    set_meta_version(other_paths[0], "2.0.0")
+
+    new = store.reload(*other_paths)
+
+    assert new.phase1_path == other_paths[0]
+    assert new.version != load_model(*model_paths).version
+
+
+def test_failed_reload_keeps_the_model(model_paths, tmp_path):
+    old = load_model(*model_paths)
+    store = ModelStore(old)
+    with pytest.raises(OSError):
+        store.reload(str(tmp_path / "missing"))
+    assert store.model is old
+    assert store.last_error is not None
+
+
+def test_reload_is_skipped_during_another_reload(model_paths):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_prepare(nlp):
+        started.set()
+        release.wait(5)
+
+    store = ModelStore(load_model(*model_paths), prepare=slow_prepare)
+    assert store.start_reload()
+    assert started.wait(5)
+    assert store.reloading
+    assert not store.start_reload()
+    assert store.reload() is None
+    release.set()
+
+
+def test_model_files_fingerprint(model_paths, tmp_path):
+    fingerprint = model_files_fingerprint(*model_paths)
+    assert len(fingerprint) == 2
+    assert model_files_fingerprint(model_paths[0], str(tmp_path)) is None
+
+
+def test_watch_reloads_changed_models(model_paths, tmp_path):
+    paths = build_stand_in_models(str(tmp_path))
+    store = ModelStore(load_model(*paths))
+    stop = threading.Event()
+    store.watch(0.05, stop)
+    time.sleep(0.2)
+
+    set_meta_version(paths[1], "2.0.0")
+    deadline = time.monotonic() + 10
+    while store.model.generation == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stop.set()
+
+    assert store.model.generation == 1
+    assert store.model.metas[1]["version"] == "2.0.0"
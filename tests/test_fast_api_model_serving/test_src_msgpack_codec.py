@@ -0,0 +1,123 @@
+import msgpack
+import orjson
+import pytest
+
+from fast_api_model_serving.src.config import MAX_INSTANCES, MAX_TEXT_CHARS
+from fast_api_model_serving.src.msgpack_codec import (
+    Instance,
+    MsgpackValidationError,
+    decode_instances,
+    packb,
+)
+from fast_api_model_serving.src.serialisers import (
+    Entity,
+    Predictions,
+    build_prediction,
+    dumps,
+)
+
+INSTANCES = [
+    {
+        "url": "https://www.gov.uk/government/people/rishi-sunak",
+        "text": "Rishi Sunak became Prime Minister on 25 October 2022",
+        "line_number": 2,
+        "part_of_page": "text",
+    },
+    {"text": "Côte d’Ivoire"},
+]
+
+
+def test_decode_instances_is_correct():
+    body = msgpack.packb({"instances": INSTANCES})
+    assert decode_instances(body) == [
+        Instance(
+            url="https://www.gov.uk/government/people/rishi-sunak",
+            text="Rishi Sunak became Prime Minister on 25 October 2022",
+            line_number=2,
+            part_of_page="text",
+            phases=None,
+            labels=None,
+        ),
+        Instance(
+            url=None,
+            text="Côte d’Ivoire",
+            line_number=None,
+            part_of_page=None,
+            phases=None,
+            labels=None,
+        ),
+    ]
+
+
+def test_decode_instances_applies_the_request_parameters():
+    body = msgpack.packb(
+        {
+            "instances": [{"text": "a", "phases": [2]}, {"text": "b"}],
+            "parameters": {"phases": [1], "labels": ["PERSON"]},
+        }
+    )
+    instances = decode_instances(body)
+    assert [instance.phases for instance in instances] == [[2], [1]]
+    assert [instance.labels for instance in instances] == [["PERSON"], ["PERSON"]]
+
+
+args_invalid = [
+    (b"\xc1", ["body"]),
+    (msgpack.packb([1, 2]), ["body", "instances"]),
+    (msgpack.packb({"instances": "text"}), ["body", "instances"]),
+    (msgpack.packb({"instances": [{"url": "x"}]}), ["body", "instances", 0, "text"]),
+    (msgpack.packb({"instances": ["text"]}), ["body", "instances", 0]),
+    (msgpack.packb({"instances": [{"text": None}]}), ["body", "instances", 0, "text"]),
+    (msgpack.packb({"instances": [{"text": 1}]}), ["body", "instances", 0, "text"]),
+    (
+        msgpack.packb({"instances": [{"text": "a", "line_number": "2"}]}),
+        ["body", "instances", 0, "line_number"],
+    ),
+    (
+        msgpack.packb({"instances": [{"text": "a", "line_number": True}]}),
+        ["body", "instances", 0, "line_number"],
+    ),
+    (
+        msgpack.packb({"instances": [{"text": "a", "phases": [3]}]}),
+        ["body", "instances", 0, "phases"],
+    ),
+    (
+        msgpack.packb({"instances": [{"text": "a", "phases": [True]}]}),
+        ["body", "instances", 0, "phases"],
+    ),
+    (
+        msgpack.packb({"instances": [], "parameters": {"phases": [False, 2]}}),
+        ["body", "parameters", "phases"],
+    ),
+    (
+        msgpack.packb({"instances": [], "parameters": {"labels": "PERSON"}}),
+        ["body", "parameters", "labels"],
+    ),
+    (
+        msgpack.packb({"instances": [{"text": "a" * (MAX_TEXT_CHARS + 1)}]}),
+        ["body", "instances", 0, "text"],
+    ),
+    (
+        msgpack.packb({"instances": [{"text": "a"}] * (MAX_INSTANCES + 1)}),
+        ["body", "instances"],
+    ),
+]
+
+
+@pytest.mark.parametrize("body, loc", args_invalid)
+def test_decode_instances_rejects_invalid_requests(body, loc):
+    with pytest.raises(MsgpackValidationError) as e:
+        decode_instances(body)
+    assert [error["loc"] for error in e.value.errors] == [loc]
+
+
+def test_packb_matches_the_json_response():
+    predictions = Predictions(
+        [
+            build_prediction(instance, [Entity("Rishi Sunak", "PERSON", 0, 11)] * i)
+            for i, instance in enumerate(
+                decode_instances(msgpack.packb({"instances": INSTANCES}))
+            )
+        ]
+    )
+    assert msgpack.unpackb(packb(predictions)) == orjson.loads(dumps(predictions))
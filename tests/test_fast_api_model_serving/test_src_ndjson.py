@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+import spacy
+
+from fast_api_model_serving.src.ndjson import (
+    NdjsonRequestError,
+    abatched_instances,
+    aiter_ndjson_lines,
+    astream_ndjson_predictions,
+    iter_ndjson_lines,
+    peek_first_batch,
+)
+from fast_api_model_serving.src.schemas import InputContent
+
+
+async def aiterate(iterable):
+    for item in iterable:
+        yield item
+
+
+async def alist(aiterable):
+    return [item async for item in aiterable]
+
+
+@pytest.fixture(scope="module")
+def nlp_entity_ruler():
+    # a blank pipeline with rule-based entities stands in for the transformer NER models
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns(
+        [
+            {"label": "PERSON", "pattern": "Rishi Sunak"},
+            {"label": "DATE", "pattern": "25 October 2022"},
+        ]
+    )
+    return nlp
+
+
+def test_iter_ndjson_lines_skips_empty_lines():
+    body = b'{"text": "a"}\n\n  \n{"text": "b"}\r\n'
+    assert list(iter_ndjson_lines(body)) == [b'{"text": "a"}', b'{"text": "b"}']
+
+
+def test_astream_ndjson_predictions_is_correct(nlp_entity_ruler):
+    instances = [
+        InputContent(
+            url="https://www.gov.uk/government/people/rishi-sunak",
+            text="Rishi Sunak became Prime Minister on 25 October 2022",
+            line_number=2,
+            part_of_page="text",
+        ),
+        InputContent(text="No entities here"),
+        InputContent(text="Rishi Sunak", line_number=4, part_of_page="title"),
+    ]
+    batches = aiterate([instances[:2], instances[2:]])
+    chunks = asyncio.run(
+        alist(astream_ndjson_predictions(nlp_entity_ruler, batches, batch_size=2))
+    )
+    # one chunk per batch
+    assert len(chunks) == 2
+    predictions = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert predictions == [
+        {
+            "url": "https://www.gov.uk/government/people/rishi-sunak",
+            "entities": [
+                {"name": "Rishi Sunak", "type": "PERSON", "start": 0, "end": 11},
+                {"name": "25 October 2022", "type": "DATE", "start": 37, "end": 52},
+            ],
+            "line_number": 2,
+            "part_of_page": "text",
+        },
+        {"url": None, "entities": [], "line_number": None, "part_of_page": None},
+        {
+            "url": None,
+            "entities": [
+                {"name": "Rishi Sunak", "type": "PERSON", "start": 0, "end": 11}
+            ],
+            "line_number": 4,
+            "part_of_page": "title",
+        },
+    ]
+
+
+def test_aiter_ndjson_lines_joins_the_lines_split_across_chunks():
+    chunks = [b'{"text": ', b'"a"}\r', b'\n\n{"text": "b"}\n{"te', b'xt": "c"}']
+    lines = asyncio.run(alist(aiter_ndjson_lines(aiterate(chunks), max_bytes=100)))
+    assert lines == [b'{"text": "a"}', b'{"text": "b"}', b'{"text": "c"}']
+
+
+def test_aiter_ndjson_lines_rejects_large_bodies():
+    chunks = [b'{"text": "a"}\n', b'{"text": "b"}\n']
+    with pytest.raises(NdjsonRequestError) as e:
+        asyncio.run(alist(aiter_ndjson_lines(aiterate(chunks), max_bytes=20)))
+    assert e.value.status_code == 413
+
+
+def test_abatched_instances_is_correct():
+    lines = [b'{"text": "a", "line_number": 1}', b'{"text": "b"}', b'{"text": "c"}']
+    batches = asyncio.run(alist(abatched_instances(aiterate(lines), 2, max_chars=3)))
+    assert batches == [
+        [InputContent(text="a", line_number=1), InputContent(text="b")],
+        [InputContent(text="c")],
+    ]
+
+
+def test_abatched_instances_rejects_invalid_lines():
+    lines = [b'{"text": "a"}', b'{"text": "b"}', b'{"txt": "c"}']
+
+    async def read_batches():
+        batches = abatched_instances(aiterate(lines), 2, max_chars=100)
+        # the batches before the invalid line are yielded
+        assert await batches.__anext__() == [
+            InputContent(text="a"),
+            InputContent(text="b"),
+        ]
+        await batches.__anext__()
+
+    with pytest.raises(NdjsonRequestError) as e:
+        asyncio.run(read_batches())
+    assert e.value.status_code == 422
+    assert e.value.detail["line"] == 2
+
+
+def test_abatched_instances_rejects_too_many_characters():
+    lines = [b'{"text": "abc"}', b'{"text": "def"}']
+    with pytest.raises(NdjsonRequestError) as e:
+        asyncio.run(alist(abatched_instances(aiterate(lines), 1, max_chars=5)))
+    assert e.value.status_code == 413
+
+
+def test_peek_first_batch_keeps_the_first_batch():
+    async def peek(batches):
+        first_batch, batches = await peek_first_batch(aiterate(batches))
+        return first_batch, await alist(batches)
+
+    assert asyncio.run(peek([[1, 2], [3]])) == ([1, 2], [[1, 2], [3]])
+    assert asyncio.run(peek([])) == ([], [])
+
+
+def test_astream_ndjson_predictions_ends_with_the_error(nlp_entity_ruler):
+    async def batches():
+        yield [InputContent(text="Rishi Sunak")]
+        raise NdjsonRequestError(422, {"line": 1, "errors": []})
+
+    chunks = asyncio.run(
+        alist(astream_ndjson_predictions(nlp_entity_ruler, batches(), batch_size=1))
+    )
+    assert [json.loads(chunk) for chunk in chunks] == [
+        {
+            "url": None,
+            "entities": [
+                {"name": "Rishi Sunak", "type": "PERSON", "start": 0, "end": 11}
+            ],
+            "line_number": None,
+            "part_of_page": None,
+        },
+        {"error": {"status_code": 422, "detail": {"line": 1, "errors": []}}},
+    ]
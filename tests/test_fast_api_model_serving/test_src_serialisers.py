@@ -0,0 +1,98 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fast_api_model_serving.src.schemas import (
+    InputContent,
+    OutputEntities,
+    ResponseEntitiesVertexAI,
+)
+from fast_api_model_serving.src.serialisers import (
+    Entity,
+    FastJSONResponse,
+    Predictions,
+    build_prediction,
+)
+
+# (input instance, extracted entities) pairs
+args_predictions = [
+    (
+        {
+            "url": "https://www.gov.uk/government/people/rishi-sunak",
+            "text": "Rishi Sunak became Prime Minister on 25 October 2022",
+            "line_number": 2,
+            "part_of_page": "text",
+        },
+        [
+            ("Rishi Sunak", "PERSON", 0, 11),
+            ("Prime Minister", "TITLE", 19, 33),
+            ("25 October 2022", "DATE", 37, 52),
+        ],
+    ),
+    ({"text": "Nothing to see here"}, []),
+    (
+        {
+            "url": "https://www.gov.uk/guidance/travel-to-côte-d'ivoire?query=1#part",
+            "text": 'Côte d’Ivoire "quoted" and £1,000 \\ ✓',
+            "part_of_page": "title",
+        },
+        [("Côte d’Ivoire", "GPE", 0, 13), ("£1,000", "MONEY", 27, 33)],
+    ),
+    (
+        {"url": "http://gov.uk", "text": "x", "line_number": 0},
+        [("x", "ORG", 0, 1)] * 50,
+    ),
+]
+
+
+def build_predictions(instances_entities):
+    return [
+        build_prediction(InputContent(**instance), [Entity(*ent) for ent in entities])
+        for instance, entities in instances_entities
+    ]
+
+
+@pytest.fixture(scope="module")
+def client():
+    # the same predictions rendered through the pydantic response models and through orjson
+    app = FastAPI()
+
+    @app.post("/pydantic", response_model=ResponseEntitiesVertexAI)
+    async def pydantic_vertex(n: int):
+        return {"predictions": build_predictions(args_predictions[:n])}
+
+    @app.post("/fast", response_model=ResponseEntitiesVertexAI)
+    async def fast_vertex(n: int):
+        return FastJSONResponse(Predictions(build_predictions(args_predictions[:n])))
+
+    @app.post("/pydantic-one/{i}", response_model=OutputEntities)
+    async def pydantic_one(i: int):
+        return build_predictions([args_predictions[i]])[0]
+
+    @app.post("/fast-one/{i}", response_model=OutputEntities)
+    async def fast_one(i: int):
+        return FastJSONResponse(build_predictions([args_predictions[i]])[0])
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("n", range(len(args_predictions) + 1))
+def test_fast_serialisation_is_byte_identical_vertex(client, n):
+    """Assert the orjson response is byte-identical to the pydantic one."""
+    expected = client.post("/pydantic", params={"n": n})
+    actual = client.post("/fast", params={"n": n})
+    assert actual.content == expected.content
+    assert actual.headers["content-type"] == expected.headers["content-type"]
+
+
+@pytest.mark.parametrize("i", range(len(args_predictions)))
+def test_fast_serialisation_is_byte_identical_one_doc(client, i):
+    expected = client.post(f"/pydantic-one/{i}")
+    actual = client.post(f"/fast-one/{i}")
+    assert actual.content == expected.content
+
+
+def test_fast_serialisation_validates_against_response_model(client):
+    """Assert the fast responses still conform to the documented response model."""
+    response = client.post("/fast", params={"n": len(args_predictions)})
+    ResponseEntitiesVertexAI.parse_raw(response.content)
@@ -0,0 +1,39 @@
+import spacy
+from prometheus_client import REGISTRY
+
+from fast_api_model_serving.src.warmup import WARMUP_SNIPPETS, warm_up, warmup_texts
+
+
+def test_warmup_texts_cycles_through_all_lengths():
+    texts = warmup_texts(len(WARMUP_SNIPPETS) + 2)
+    assert texts == WARMUP_SNIPPETS + WARMUP_SNIPPETS[:2]
+    assert len({len(text) for text in WARMUP_SNIPPETS}) == len(WARMUP_SNIPPETS)
+
+
+def test_warm_up_runs_every_batch_size():
+    batches = []
+
+    class RecordBatches:
+        def __call__(self, doc):
+            batches.append(1)
+            return doc
+
+        def pipe(self, docs, batch_size=128):
+            docs = list(docs)
+            batches.append(len(docs))
+            return docs
+
+    @spacy.Language.factory("record_batches")
+    def create_record_batches(nlp, name):
+        return RecordBatches()
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("record_batches")
+    before_texts = REGISTRY.get_sample_value("ner_texts_total") or 0
+
+    duration = warm_up(nlp, [1, 3, 8], rounds=2)
+
+    assert duration > 0
+    assert batches == [1, 3, 8, 1, 3, 8]
+    # the warm-up is not recorded in the model metrics
+    assert (REGISTRY.get_sample_value("ner_texts_total") or 0) == before_texts
@@ -0,0 +1,110 @@
+import pyarrow as pa
+
+from inference_pipeline_new_content.utils.count_entities import (
+    COUNTS_SCHEMA,
+    count_entities,
+    update_entity_counts,
+)
+
+URI = "https://www.gov.uk/named-entity/"
+
+
+def entity(url, name_lower, type, part_of_page):
+    return {
+        "url": url,
+        "name": name_lower.title(),
+        "name_lower": name_lower,
+        "type": type,
+        "char_start": "0",
+        "char_end": "1",
+        "part_of_page": part_of_page,
+        "line_number": 0,
+        "url_entity_nametype": f"{URI}{type}/{name_lower}",
+    }
+
+
+def counts(url, name_lower, type, title, description, text):
+    return {
+        "url": url,
+        "name_lower": name_lower,
+        "type": type,
+        "url_entity_nametype": f"{URI}{type}/{name_lower}",
+        "title_count": title,
+        "description_count": description,
+        "text_count": text,
+        "total_count": title + description + text,
+    }
+
+
+NAMED_ENTITIES = [
+    entity("https://www.gov.uk/b", "england", "GPE", "text"),
+    entity("https://www.gov.uk/a", "england", "GPE", "title"),
+    entity("https://www.gov.uk/a", "england", "GPE", "text"),
+    entity("https://www.gov.uk/a", "hm treasury", "ORG", "description"),
+    entity("https://www.gov.uk/a", "england", "GPE", "text"),
+    entity("https://www.gov.uk/a", "hm treasury", "ORG", "text"),
+    entity("https://www.gov.uk/a", "wales", "GPE", "title"),
+    entity("https://www.gov.uk/a", "england", "LOC", "text"),
+]
+
+# the rows the SQL query outputs for NAMED_ENTITIES
+EXPECTED = [
+    counts("https://www.gov.uk/a", "england", "GPE", 1, 0, 2),
+    counts("https://www.gov.uk/a", "wales", "GPE", 1, 0, 0),
+    counts("https://www.gov.uk/a", "england", "LOC", 0, 0, 1),
+    counts("https://www.gov.uk/a", "hm treasury", "ORG", 0, 1, 1),
+    counts("https://www.gov.uk/b", "england", "GPE", 0, 0, 1),
+]
+
+
+def test_count_entities_matches_the_sql_output():
+    output = count_entities(pa.Table.from_pylist(NAMED_ENTITIES))
+    assert output.schema == COUNTS_SCHEMA
+    assert output.to_pylist() == EXPECTED
+
+
+def test_count_entities_without_entities():
+    output = count_entities(
+        pa.Table.from_pylist([], schema=pa.Table.from_pylist(NAMED_ENTITIES).schema)
+    )
+    assert output.num_rows == 0
+    assert output.schema == COUNTS_SCHEMA
+
+
+def test_update_entity_counts_replaces_the_counts_of_the_new_urls():
+    new_entities = [
+        entity("https://www.gov.uk/b", "wales", "GPE", "title"),
+        entity("https://www.gov.uk/c", "england", "GPE", "text"),
+    ]
+    accumulated = count_entities(pa.Table.from_pylist(NAMED_ENTITIES))
+
+    output = update_entity_counts(accumulated, pa.Table.from_pylist(new_entities))
+
+    assert output.to_pylist() == EXPECTED[:4] + [
+        counts("https://www.gov.uk/b", "wales", "GPE", 1, 0, 0),
+        counts("https://www.gov.uk/c", "england", "GPE", 0, 0, 1),
+    ]
+    # the same as recounting the entities after replacing those of the new urls
+    recounted = count_entities(
+        pa.Table.from_pylist(
+            [row for row in NAMED_ENTITIES if row["url"] != "https://www.gov.uk/b"]
+            + new_entities
+        )
+    )
+    assert output.to_pylist() == recounted.to_pylist()
+
+
+def test_count_entities_counts_the_instances_with_null_values():
+    named_entities = pa.table(
+        {
+            "url": [None, None, "https://www.gov.uk/a"],
+            "name_lower": ['"x"', '"x"', None],
+            "type": ['"ORG"'] * 3,
+            "url_entity_nametype": [URI] * 3,
+            "part_of_page": ["title", None, "text"],
+        }
+    )
+    assert [
+        (row["url"], row["title_count"], row["text_count"], row["total_count"])
+        for row in count_entities(named_entities).to_pylist()
+    ] == [(None, 1, 0, 2), ("https://www.gov.uk/a", 0, 1, 1)]
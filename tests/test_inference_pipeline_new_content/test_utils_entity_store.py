@@ -0,0 +1,102 @@
+import gzip
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from inference_pipeline_new_content.utils.count_entities import count_entities
+from inference_pipeline_new_content.utils.entity_store import (
+    ENTITIES_TABLE,
+    EntityStore,
+    url_buckets,
+)
+
+URI = "https://www.gov.uk/named-entity/"
+
+
+def entity(url, name_lower, part_of_page="text", char_start="0"):
+    return {
+        "url": url,
+        "name": name_lower.title(),
+        "name_lower": name_lower,
+        "type": "GPE",
+        "char_start": char_start,
+        "char_end": "5",
+        "part_of_page": part_of_page,
+        "line_number": 0,
+        "url_entity_nametype": f"{URI}GPE/{name_lower}",
+    }
+
+
+URLS = [f"https://www.gov.uk/page-{i}" for i in range(20)]
+NAMED_ENTITIES = [entity(url, "england") for url in URLS] + [
+    entity(URLS[0], "wales", "title")
+]
+
+
+def sort_rows(rows):
+    return sorted(rows, key=lambda row: tuple(str(value) for value in row.values()))
+
+
+def test_url_buckets_are_stable():
+    buckets = url_buckets(pa.array(URLS + [URLS[0], None]), 8)
+    assert buckets.to_pylist()[0] == buckets.to_pylist()[-2]
+    assert all(0 <= bucket < 8 for bucket in buckets.to_pylist())
+    assert (
+        buckets.to_pylist()
+        == url_buckets(pa.array(URLS + [URLS[0], None]), 8).to_pylist()
+    )
+
+
+def test_upsert_stores_the_entities_and_their_counts(tmp_path):
+    store = EntityStore(tmp_path, n_buckets=4)
+    touched = store.upsert(pa.Table.from_pylist(NAMED_ENTITIES))
+
+    assert touched == sorted(set(url_buckets(pa.array(URLS), 4).to_pylist()))
+    assert store.version == 1
+    entities = store.read(ENTITIES_TABLE)
+    # the character offsets are cast to integers, as in `named_entities_all`
+    assert entities.schema.field("char_start").type == pa.int64()
+    assert len(entities) == len(NAMED_ENTITIES)
+    assert sort_rows(store.read().to_pylist()) == sort_rows(
+        count_entities(pa.Table.from_pylist(NAMED_ENTITIES)).to_pylist()
+    )
+
+
+def test_upsert_replaces_the_rows_of_the_new_urls(tmp_path):
+    store = EntityStore(tmp_path, n_buckets=4)
+    store.upsert(pa.Table.from_pylist(NAMED_ENTITIES))
+    new_entities = [entity(URLS[0], "scotland"), entity(URLS[0], "scotland", "title")]
+
+    touched = store.upsert(pa.Table.from_pylist(new_entities))
+
+    assert touched == url_buckets(pa.array([URLS[0]]), 4).to_pylist()
+    assert store.changed_buckets(since_version=1) == touched
+    expected = [row for row in NAMED_ENTITIES if row["url"] != URLS[0]] + new_entities
+    assert sort_rows(store.read().to_pylist()) == sort_rows(
+        count_entities(pa.Table.from_pylist(expected)).to_pylist()
+    )
+    # the store is reopened from its manifest
+    reopened = EntityStore(tmp_path)
+    assert (reopened.n_buckets, reopened.version) == (4, 2)
+    assert reopened.read().to_pylist() == store.read().to_pylist()
+
+
+def test_export_deltas_exports_the_changed_buckets(tmp_path):
+    store = EntityStore(tmp_path / "store", n_buckets=4)
+    store.upsert(pa.Table.from_pylist(NAMED_ENTITIES))
+    version = store.version
+    store.upsert(pa.Table.from_pylist([entity(URLS[0], "scotland")]))
+
+    paths = store.export_deltas(tmp_path / "deltas", since_version=version)
+
+    (bucket,) = url_buckets(pa.array([URLS[0]]), 4).to_pylist()
+    assert [path.name for path in paths] == [
+        f"named_entities_counts-bucket={bucket:04d}.csv.gz"
+    ]
+    with gzip.open(paths[0]) as f:
+        delta = pacsv.read_csv(f)
+    assert (
+        delta.to_pylist()
+        == store.read_bucket("named_entities_counts", bucket).to_pylist()
+    )
+    assert len(store.export_deltas(tmp_path / "all")) == len(store.changed_buckets())
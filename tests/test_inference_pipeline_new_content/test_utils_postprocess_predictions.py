@@ -0,0 +1,209 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from inference_pipeline_new_content.utils import postprocess_predictions as module
+from inference_pipeline_new_content.utils.postprocess_predictions import (
+    OUTPUT_SCHEMA,
+    encode_uri_component,
+    iter_prediction_batches,
+    parse_predictions,
+    postprocess_predictions,
+    read_predictions,
+)
+
+
+def prediction(*entities):
+    return json.dumps(
+        {
+            "entities": [
+                {"name": name, "type": type, "start": start, "end": end}
+                for name, type, start, end in entities
+            ]
+        }
+    )
+
+
+RAW_PREDICTIONS = [
+    {
+        "url": "https://www.gov.uk/b",
+        "part_of_page": "text",
+        "line_number": 3,
+        "prediction": prediction(("England", "GPE", 0, 7)),
+    },
+    {
+        "url": "https://www.gov.uk/a",
+        "part_of_page": "text",
+        "line_number": 2,
+        "prediction": prediction(
+            ("Côte d’Ivoire", "GPE", 10, 23), ("HM Treasury", "ORG", 30, 41)
+        ),
+    },
+    {
+        "url": "https://www.gov.uk/a",
+        "part_of_page": "title",
+        "line_number": None,
+        "prediction": prediction(("A&E (NHS)", "ORG", 0, 9)),
+    },
+    # no entities: no rows
+    {
+        "url": "https://www.gov.uk/a",
+        "part_of_page": "description",
+        "line_number": 0,
+        "prediction": prediction(),
+    },
+]
+
+# the rows the SQL query outputs for RAW_PREDICTIONS
+EXPECTED = [
+    {
+        "url": "https://www.gov.uk/a",
+        "name": '"A&E (NHS)"',
+        "name_lower": '"a&e (nhs)"',
+        "type": '"ORG"',
+        "char_start": "0",
+        "char_end": "9",
+        "part_of_page": "title",
+        "line_number": None,
+        "url_entity_nametype": 'https://www.gov.uk/named-entity/"ORG"/%22a%26e%20(nhs)%22',
+    },
+    {
+        "url": "https://www.gov.uk/a",
+        "name": '"Côte d’Ivoire"',
+        "name_lower": '"côte d’ivoire"',
+        "type": '"GPE"',
+        "char_start": "10",
+        "char_end": "23",
+        "part_of_page": "text",
+        "line_number": 2,
+        "url_entity_nametype": (
+            'https://www.gov.uk/named-entity/"GPE"/%22c%C3%B4te%20d%E2%80%99ivoire%22'
+        ),
+    },
+    {
+        "url": "https://www.gov.uk/a",
+        "name": '"HM Treasury"',
+        "name_lower": '"hm treasury"',
+        "type": '"ORG"',
+        "char_start": "30",
+        "char_end": "41",
+        "part_of_page": "text",
+        "line_number": 2,
+        "url_entity_nametype": 'https://www.gov.uk/named-entity/"ORG"/%22hm%20treasury%22',
+    },
+    {
+        "url": "https://www.gov.uk/b",
+        "name": '"England"',
+        "name_lower": '"england"',
+        "type": '"GPE"',
+        "char_start": "0",
+        "char_end": "7",
+        "part_of_page": "text",
+        "line_number": 3,
+        "url_entity_nametype": 'https://www.gov.uk/named-entity/"GPE"/%22england%22',
+    },
+]
+
+
+def test_postprocess_predictions_matches_the_sql_output():
+    output = postprocess_predictions(pa.Table.from_pylist(RAW_PREDICTIONS))
+    assert output.schema == OUTPUT_SCHEMA
+    assert output.to_pylist() == EXPECTED
+
+
+def test_postprocess_predictions_with_struct_predictions():
+    table = pa.Table.from_pylist(
+        [
+            {**row, "prediction": json.loads(row["prediction"])}
+            for row in RAW_PREDICTIONS
+        ]
+    )
+    assert postprocess_predictions(table).to_pylist() == EXPECTED
+
+
+def test_postprocess_predictions_without_entities():
+    table = pa.Table.from_pylist(
+        [{"url": "u", "part_of_page": "text", "line_number": 0, "prediction": None}],
+        schema=pa.schema(
+            [
+                ("url", pa.string()),
+                ("part_of_page", pa.string()),
+                ("line_number", pa.int64()),
+                ("prediction", pa.string()),
+            ]
+        ),
+    )
+    output = postprocess_predictions(table)
+    assert output.num_rows == 0
+    assert output.schema == OUTPUT_SCHEMA
+
+
+args_encode_uri_component = [
+    ('"england"', "%22england%22"),
+    ("-_.!~*'()", "-_.!~*'()"),
+    ("a/b?c=d#e", "a%2Fb%3Fc%3Dd%23e"),
+    ("\ud800", "\ud800"),
+]
+
+
+@pytest.mark.parametrize("value, expected", args_encode_uri_component)
+def test_encode_uri_component(value, expected):
+    assert encode_uri_component(value) == expected
+
+
+def test_read_predictions_of_vertex_ai(tmp_path):
+    path = tmp_path / "prediction.results-00000-of-00001"
+    with open(path, "w") as f:
+        for row in RAW_PREDICTIONS:
+            instance = {key: row[key] for key in ("url", "part_of_page", "line_number")}
+            f.write(
+                json.dumps(
+                    {"instance": instance, "prediction": json.loads(row["prediction"])}
+                )
+                + "\n"
+            )
+    assert postprocess_predictions(read_predictions(path)).to_pylist() == EXPECTED
+
+
+def test_read_predictions_of_parquet(tmp_path):
+    path = tmp_path / "predictions.parquet"
+    pq.write_table(pa.Table.from_pylist(RAW_PREDICTIONS), path)
+    assert postprocess_predictions(read_predictions(path)).to_pylist() == EXPECTED
+
+
+def test_iter_prediction_batches_bounds_the_batches():
+    predictions = pa.chunked_array([["{}", None, "{}"], ['{"entities": []}', "{}"]])
+    batches = list(iter_prediction_batches(predictions, batch_bytes=6))
+    # 3 bytes per empty object and its line break; a longer line is a batch of its own
+    assert [batch.to_pylist() for batch in batches] == [
+        ["{}", "{}"],
+        ["{}"],
+        ['{"entities": []}'],
+        ["{}"],
+    ]
+    assert all(batch.type == pa.string() for batch in batches)
+
+
+def test_parse_predictions_in_small_batches_and_blocks(monkeypatch):
+    monkeypatch.setattr(module, "PARSE_BATCH_BYTES", 300)
+    monkeypatch.setattr(module, "PARSE_BLOCK_BYTES", 100)
+    rows = [
+        prediction(*[(f"Entity {i}", "ORG", j, j + 8) for j in range(i % 4)])
+        if i % 5
+        else None
+        for i in range(200)
+    ]
+    # a prediction longer than a batch and a block
+    rows[7] = prediction(*[("Long entity name", "GPE", j, j + 16) for j in range(20)])
+    predictions = pa.chunked_array(
+        [
+            pa.array(rows[:120], pa.large_string()),
+            pa.array(rows[120:], pa.large_string()),
+        ]
+    )
+    parsed = parse_predictions(predictions)
+    assert parsed.to_pylist() == [
+        {"entities": None} if row is None else json.loads(row) for row in rows
+    ]
@@ -0,0 +1,99 @@
+import csv
+import gzip
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.make_data.load_content_store import (
+    CONTENT_STORE_COLUMNS,
+    STORE_ORDER_COLUMN,
+    convert_to_parquet,
+    load_preprocessed_content_store,
+)
+from src.utils.helpers_arrow import row_groups_with_values
+
+ROWS = [
+    ["base_path", "content_id", "title", "text"],
+    ["/a", "id-a", "A", "Some text."],
+    ["/b", "id-b", "B", ""],
+    ["/c", "NA", "C", "<NA>"],
+    ["/d", "0012", "D", 'A line\nbreak, a\ttab and "quotes".'],
+    ["/e", "None", "E", "null"],
+] + [[f"/page-{i}", f"id-{i}", f"Page {i}", f"Text {i}."] for i in range(200)]
+
+
+@pytest.fixture
+def path_to_gz(tmp_path):
+    path = tmp_path / "preprocessed_content_store.csv.gz"
+    with gzip.open(path, "wt", newline="") as f:
+        csv.writer(f, delimiter="\t").writerows(ROWS)
+    return str(path)
+
+
+def read_csv(path_to_gz):
+    """The content store as read by pd.read_csv."""
+    return pd.read_csv(path_to_gz, compression="gzip", header=0, sep="\t")
+
+
+def test_load_preprocessed_content_store_as_pd_read_csv(path_to_gz):
+    df = load_preprocessed_content_store(path_to_gz, block_size=1024)
+    pd.testing.assert_frame_equal(df, read_csv(path_to_gz)[CONTENT_STORE_COLUMNS])
+
+
+@pytest.mark.parametrize("block_size", [1024, 1 << 20])
+def test_load_preprocessed_content_store_filters_the_base_paths(path_to_gz, block_size):
+    base_paths = {"/b", "/d", "/page-150", "/not-in-the-store"}
+
+    df = load_preprocessed_content_store(
+        path_to_gz,
+        base_paths=base_paths,
+        columns=["base_path", "text"],
+        block_size=block_size,
+    )
+
+    expected = read_csv(path_to_gz)
+    expected = expected[expected.base_path.isin(base_paths)][["base_path", "text"]]
+    pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+
+def test_convert_to_parquet(path_to_gz, tmp_path):
+    parquet_path = str(tmp_path / "preprocessed_content_store.parquet")
+
+    assert (
+        convert_to_parquet(path_to_gz, parquet_path, block_size=1024, row_group_size=20)
+        == len(ROWS) - 1
+    )
+
+    parquet_file = pq.ParquetFile(parquet_path)
+    assert parquet_file.metadata.num_row_groups == -(-(len(ROWS) - 1) // 20)
+    assert parquet_file.schema_arrow.names == ROWS[0] + [STORE_ORDER_COLUMN]
+    # sorted by base_path, so that the row groups of a few base_path's can be found
+    base_paths = (
+        parquet_file.read(columns=["base_path"]).column("base_path").to_pylist()
+    )
+    assert base_paths == sorted(row[0] for row in ROWS[1:])
+    assert row_groups_with_values(parquet_file, "base_path", ["/a", "/page-7"]) == [
+        0,
+        base_paths.index("/page-7") // 20,
+    ]
+    assert not list(tmp_path.glob("*.tmp"))
+    for base_paths in [None, {"/a", "/c", "/page-7"}, set()]:
+        pd.testing.assert_frame_equal(
+            load_preprocessed_content_store(parquet_path, base_paths=base_paths),
+            load_preprocessed_content_store(path_to_gz, base_paths=base_paths),
+        )
+
+
+def test_convert_to_parquet_removes_the_temporary_files(path_to_gz, tmp_path):
+    parquet_path = str(tmp_path / "preprocessed_content_store.parquet")
+
+    with patch(
+        "src.make_data.load_content_store.iter_merged_batches",
+        side_effect=RuntimeError,
+    ):
+        with pytest.raises(RuntimeError):
+            convert_to_parquet(path_to_gz, parquet_path, block_size=1024)
+
+    assert not list(tmp_path.glob("*.parquet*"))
@@ -0,0 +1,161 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import mongomock
+import pyarrow.parquet as pq
+
+from src.make_strata.content_snapshot import ContentSnapshot, is_included
+from src.make_strata.extract_content_store import get_collection, pagepaths_query
+from src.make_strata.strata import get_strata
+
+
+def content_item(base_path, updated_at, **fields):
+    return {
+        "_id": base_path,
+        "content_id": base_path.strip("/"),
+        "title": base_path.strip("/").title(),
+        "locale": "en",
+        "phase": "live",
+        "schema_name": "guide",
+        "document_type": "guide",
+        "publishing_app": "publisher",
+        "updated_at": updated_at,
+        "public_updated_at": updated_at,
+        "expanded_links": {
+            "taxons": [
+                {
+                    "title": "Education",
+                    "content_id": "education",
+                    "base_path": "/education",
+                    "document_type": "taxon",
+                    "links": {"root_taxon": []},
+                }
+            ]
+        },
+        **fields,
+    }
+
+
+DAY0 = datetime(2023, 4, 30, 12)
+DAY1 = datetime(2023, 5, 1, 12)
+DAY2 = datetime(2023, 5, 2, 12)
+
+
+def test_is_included():
+    assert is_included(content_item("/a", DAY1))
+    assert not is_included(content_item("/a", DAY1, schema_name="gone"))
+    assert not is_included(content_item("/a", DAY1, locale="cy"))
+    assert not is_included(content_item("/a", DAY1, document_type=None))
+
+
+def test_update_merges_the_changes_since_the_watermark(tmp_path):
+    collection = get_collection(mongomock.MongoClient())
+    collection.insert_many(
+        [
+            content_item("/a", DAY1),
+            content_item("/b", DAY1),
+            content_item("/c", DAY1),
+            content_item("/d", DAY0),
+            content_item("/welsh", DAY1, locale="cy"),
+        ]
+    )
+    snapshot = ContentSnapshot(str(tmp_path / "snapshot.parquet"))
+
+    stats = snapshot.update(mongodb_collection=collection)
+
+    assert stats == {"upserted": 4, "deleted": 0, "watermark": DAY1}
+    assert snapshot.watermark == DAY1
+    assert snapshot.read().column("base_path").to_pylist() == ["/a", "/b", "/c", "/d"]
+
+    # /a is updated, /b unpublished, /c withdrawn, /e created
+    collection.update_one({"_id": "/a"}, {"$set": {"title": "New", "updated_at": DAY2}})
+    collection.update_one(
+        {"_id": "/b"}, {"$set": {"schema_name": "gone", "updated_at": DAY2}}
+    )
+    collection.update_one(
+        {"_id": "/c"},
+        {
+            "$set": {
+                "updated_at": DAY2,
+                "withdrawn_notice": {"withdrawn_at": "2023-05-02", "explanation": ""},
+            }
+        },
+    )
+    collection.insert_one(content_item("/e", DAY2))
+
+    stats = snapshot.update(mongodb_collection=collection)
+
+    assert stats == {"upserted": 2, "deleted": 2, "watermark": DAY2}
+    rows = snapshot.read().to_pylist()
+    assert [row["base_path"] for row in rows] == ["/a", "/d", "/e"]
+    assert rows[0]["title"] == "New"
+
+    # nothing changed since: only the items updated at the watermark are read again
+    stats = snapshot.update(mongodb_collection=collection)
+    assert stats == {"upserted": 2, "deleted": 0, "watermark": DAY2}
+    assert snapshot.read().to_pylist() == rows
+
+
+def test_first_update_queries_the_page_paths_only(tmp_path):
+    collection = get_collection(mongomock.MongoClient())
+    collection.insert_many(
+        [
+            content_item("/b", DAY1),
+            content_item("/a", DAY1),
+            content_item("/gone", DAY1, schema_name="gone"),
+            content_item(
+                "/withdrawn",
+                DAY1,
+                withdrawn_notice={"withdrawn_at": "2023-05-01", "explanation": ""},
+            ),
+        ]
+    )
+    snapshot = ContentSnapshot(str(tmp_path / "snapshot.parquet"))
+
+    with patch.object(collection, "find", wraps=collection.find) as find:
+        stats = snapshot.update(mongodb_collection=collection)
+
+    assert find.call_args.args[0] == pagepaths_query()
+    assert stats == {"upserted": 2, "deleted": 0, "watermark": DAY1}
+    assert snapshot.read().column("base_path").to_pylist() == ["/a", "/b"]
+
+
+def test_update_merges_the_changes_by_batches(tmp_path):
+    collection = get_collection(mongomock.MongoClient())
+    collection.insert_many([content_item(f"/{i:02d}", DAY0) for i in range(0, 18, 2)])
+    collection.insert_one(content_item("/18", DAY1))
+    snapshot = ContentSnapshot(str(tmp_path / "snapshot.parquet"))
+    snapshot.update(mongodb_collection=collection, batch_size=3)
+
+    collection.insert_many([content_item(f"/{i:02d}", DAY2) for i in range(19, 0, -2)])
+    collection.update_one(
+        {"_id": "/04"}, {"$set": {"locale": "cy", "updated_at": DAY2}}
+    )
+    collection.update_one(
+        {"_id": "/06"}, {"$set": {"title": "New", "updated_at": DAY2}}
+    )
+
+    stats = snapshot.update(mongodb_collection=collection, batch_size=3)
+
+    # /18, at the watermark, /06 and the 10 new items
+    assert stats == {"upserted": 12, "deleted": 1, "watermark": DAY2}
+    rows = snapshot.read().to_pylist()
+    assert [row["base_path"] for row in rows] == [
+        f"/{i:02d}" for i in range(20) if i != 4
+    ]
+    assert rows[5]["title"] == "New"
+    assert pq.ParquetFile(snapshot.path).num_row_groups == 7
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_read_dataframe_can_be_stratified(tmp_path):
+    collection = get_collection(mongomock.MongoClient())
+    untagged = content_item("/b", DAY1)
+    del untagged["expanded_links"]
+    collection.insert_many([content_item("/a", DAY1), untagged])
+    snapshot = ContentSnapshot(str(tmp_path / "snapshot.parquet"))
+    snapshot.update(mongodb_collection=collection)
+
+    strata_df = get_strata(snapshot.read_dataframe())
+
+    assert strata_df.taxon_level1.tolist() == ["Education", ""]
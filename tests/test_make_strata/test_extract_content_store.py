@@ -0,0 +1,239 @@
+import json
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+from unittest.mock import patch
+
+import mongomock
+import pyarrow.parquet as pq
+import pytest
+
+from src.make_strata.extract_content_store import (
+    CONTENT_COLUMNS,
+    CONTENT_FIELDS,
+    PAGEPATHS_FIELDS,
+    ContentStore,
+    content_query,
+    get_collection,
+    id_range_filter,
+    id_ranges,
+    imap_bounded,
+    iter_record_batches,
+    pagepaths_query,
+    write_parquet,
+)
+from src.make_strata.preprocess_content import (
+    process_content_item,
+    process_url_and_metadata,
+)
+
+
+def content_item(i, document_type="guide"):
+    return {
+        "_id": f"/page-{i}",
+        "content_id": f"id-{i}",
+        "title": f"Page {i}",
+        "locale": "en",
+        "schema_name": "guide",
+        "document_type": document_type,
+        "publishing_app": "publisher",
+        "details": {"body": f"<p>Paragraph {i}</p>"},
+        "withdrawn_notice": {
+            "withdrawn_at": "2022-01-01",
+            "explanation": "<p>Withdrawn</p>",
+        }
+        if i % 2
+        else {},
+    }
+
+
+def square(x):
+    return x * x
+
+
+class CountingIterable:
+    """Records how many items were read."""
+
+    def __init__(self, n):
+        self.n = n
+        self.read = 0
+
+    def __iter__(self):
+        for i in range(self.n):
+            self.read += 1
+            yield i
+
+
+def test_imap_bounded_reads_items_as_results_are_consumed():
+    items = CountingIterable(1000)
+    with multiprocessing.Pool(2) as pool:
+        results = imap_bounded(pool, square, items, 2, chunksize=10, max_in_flight=3)
+        assert next(results) == 0
+        # the first chunk, consumed, and the chunks in flight
+        assert items.read <= 4 * 10
+        assert [0] + list(results) == [i * i for i in range(1000)]
+
+
+def test_imap_bounded_grows_the_chunks():
+    items = CountingIterable(1000)
+    with multiprocessing.Pool(2) as pool:
+        results = imap_bounded(
+            pool, square, items, 2, chunksize=16, max_in_flight=3, initial_chunksize=2
+        )
+        assert next(results) == 0
+        # chunks of 2, 4 and 8 items in flight, then one of 16 once the first is consumed
+        assert items.read == 2 + 4 + 8 + 16
+        assert [0] + list(results) == [i * i for i in range(1000)]
+
+
+def test_iter_processed_items_yields_the_processed_items_in_order():
+    items = [content_item(i) for i in range(10)]
+    processed = ContentStore().iter_processed_items(
+        items, process_content_item, chunksize=3
+    )
+    assert [item["text"] for item in processed] == [f"Paragraph {i}" for i in range(10)]
+
+
+def test_iter_record_batches_matches_the_dataframe():
+    items = [process_content_item(content_item(i)) for i in range(5)]
+    items.append(process_content_item(content_item(5, document_type=None)))
+
+    batches = list(iter_record_batches(items, CONTENT_COLUMNS, batch_size=2))
+
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    rows = [row for batch in batches for row in batch.to_pylist()]
+    assert [row["base_path"] for row in rows] == [f"/page-{i}" for i in range(5)]
+    assert [row["withdrawn"] for row in rows] == [False, True, False, True, False]
+    assert rows[1]["withdrawn_explanation"] == "Withdrawn"
+    # nested values are encoded as JSON
+    assert json.loads(rows[0]["details"]) == {"body": "<p>Paragraph 0</p>"}
+    assert rows[0]["contact_details"] is None
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 100])
+def test_write_parquet(tmp_path, batch_size):
+    items = [process_content_item(content_item(i)) for i in range(10)]
+    path = tmp_path / "content_store.parquet"
+
+    num_rows = write_parquet(
+        iter_record_batches(items, CONTENT_COLUMNS, batch_size), path, CONTENT_COLUMNS
+    )
+
+    table = pq.read_table(path)
+    assert num_rows == table.num_rows == 10
+    assert table.column_names == CONTENT_COLUMNS
+    assert pq.ParquetFile(path).num_row_groups == -(-10 // batch_size)
+
+
+def mongomock_client_factory(documents):
+    """Returns a factory of clients of one in-memory database holding `documents`."""
+    client = mongomock.MongoClient()
+    get_collection(client).insert_many(documents)
+    return lambda: client
+
+
+def live_content_item(i):
+    return {**content_item(i), "_id": f"/page-{i:03d}", "phase": "live"}
+
+
+def test_id_ranges_cover_the_matching_documents():
+    documents = [live_content_item(i) for i in range(25)]
+    documents[3]["locale"] = "cy"
+    collection = get_collection(mongomock_client_factory(documents)())
+
+    # split on all the _id's of the collection, whatever the query
+    ranges = id_ranges(collection, range_size=10)
+
+    assert ranges == [
+        (None, "/page-010"),
+        ("/page-010", "/page-020"),
+        ("/page-020", None),
+    ]
+    scanned = [
+        item["_id"]
+        for bounds in ranges
+        for item in collection.find(
+            {"$and": [pagepaths_query(), id_range_filter(*bounds)]}
+        )
+    ]
+    assert scanned == [item["_id"] for item in documents if item["locale"] == "en"]
+
+
+def test_query_db_does_not_count_the_matching_documents():
+    documents = [live_content_item(i) for i in range(5)]
+    documents[0]["locale"] = "cy"
+    collection = get_collection(mongomock_client_factory(documents)())
+
+    with patch.object(
+        collection, "count_documents", wraps=collection.count_documents
+    ) as count_documents:
+        cursor, num_docs = ContentStore().query_db_get_pagepaths(collection)
+
+    # mongomock estimates the count with count_documents({}), without the query
+    assert all(not call.args[0] for call in count_documents.call_args_list)
+    # an upper bound of the number of documents the cursor returns
+    assert num_docs == 5
+    assert len(list(cursor)) == 4
+
+
+def test_iter_range_scans_matches_the_single_cursor():
+    documents = [live_content_item(i) for i in range(25)]
+    client_factory = mongomock_client_factory(documents)
+    content_store = ContentStore()
+
+    processed = list(
+        content_store.iter_range_scans(
+            pagepaths_query(),
+            PAGEPATHS_FIELDS,
+            process_url_and_metadata,
+            client_factory=client_factory,
+            range_size=4,
+            batch_size=2,
+            pool_class=ThreadPool,
+        )
+    )
+
+    collection = get_collection(client_factory())
+    cursor, _ = content_store.query_db_get_pagepaths(collection)
+    expected = [process_url_and_metadata(item) for item in cursor.sort("_id", 1)]
+    assert len(processed) == 25
+    assert processed == expected
+    # the projection is applied by the database
+    assert "details" not in processed[0]
+
+
+def test_iter_range_scans_of_page_paths_matches_the_single_cursor():
+    documents = [live_content_item(i) for i in range(25)]
+    documents[4]["locale"] = "cy"
+    client_factory = mongomock_client_factory(documents)
+    pagepaths = [f"/page-{i:03d}" for i in [20, 4, 3, 11, 12, 13, 7, 3]] + ["/missing"]
+    content_store = ContentStore(pagepaths)
+    collection = get_collection(client_factory())
+
+    with patch.object(collection, "find", wraps=collection.find) as find:
+        processed = list(
+            content_store.iter_range_scans(
+                content_query(),
+                CONTENT_FIELDS,
+                process_content_item,
+                client_factory=client_factory,
+                range_size=3,
+                batch_size=2,
+                pool_class=ThreadPool,
+                pagepaths=pagepaths,
+            )
+        )
+
+    cursor, _ = content_store.query_db_get_content(collection, pagepaths)
+    expected = [process_content_item(item) for item in cursor.sort("_id", 1)]
+    assert [item["_id"] for item in processed] == [
+        f"/page-{i:03d}" for i in [3, 7, 11, 12, 13, 20]
+    ]
+    assert processed == expected
+    # the ranges are split from the page paths, and each query only lists the page
+    # paths of its range
+    queried = [call.args[0]["$and"][1]["_id"]["$in"] for call in find.call_args_list]
+    assert queried == [
+        ["/missing", "/page-003", "/page-004"],
+        ["/page-007", "/page-011", "/page-012"],
+        ["/page-013", "/page-020"],
+    ]
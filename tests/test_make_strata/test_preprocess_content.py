@@ -0,0 +1,85 @@
+import pytest
+
+from src.make_strata.preprocess_content import (
+    chain_taxons,
+    process_url_and_metadata,
+    resolve_taxon_chain,
+)
+
+
+def taxon(content_id, parent=None, links=None):
+    return {
+        "title": content_id.title(),
+        "content_id": content_id,
+        "base_path": f"/{content_id}",
+        "document_type": "taxon",
+        "links": links
+        if links is not None
+        else {"parent_taxons": [parent]}
+        if parent
+        else {"root_taxon": []},
+    }
+
+
+EDUCATION = taxon("education")
+SCHOOLS = taxon("schools", EDUCATION)
+ADMISSIONS = taxon("admissions", SCHOOLS)
+CURRICULUM = taxon("curriculum", SCHOOLS)
+UNLINKED = {key: value for key, value in taxon("unlinked").items() if key != "links"}
+ORPHAN = taxon("orphan", UNLINKED)
+NO_ROOT = taxon("no-root", links={})
+
+
+@pytest.mark.parametrize(
+    "taxons",
+    [
+        [EDUCATION],
+        [ADMISSIONS, CURRICULUM, SCHOOLS],
+        [SCHOOLS, ADMISSIONS],
+        [ORPHAN, NO_ROOT, UNLINKED, ADMISSIONS],
+    ],
+)
+def test_resolve_taxon_chain_matches_chain_taxons(taxons):
+    taxon_chains = {}
+    for _ in range(2):
+        assert [resolve_taxon_chain(taxon, taxon_chains) for taxon in taxons] == [
+            chain_taxons(taxon, []) for taxon in taxons
+        ]
+
+
+def test_resolve_taxon_chain_memoises_the_ancestry():
+    taxon_chains = {}
+    chain = resolve_taxon_chain(ADMISSIONS, taxon_chains)
+
+    assert [(t["content_id"], t["level"]) for t in chain] == [
+        ("admissions", 3),
+        ("schools", 2),
+        ("education", 1),
+    ]
+    assert set(taxon_chains) == {"admissions", "schools", "education"}
+    # the parents are not walked through again
+    schools = {"content_id": "schools", "links": {}}
+    curriculum = {**CURRICULUM, "links": {"parent_taxons": [schools]}}
+    assert resolve_taxon_chain(curriculum, taxon_chains) == chain_taxons(CURRICULUM, [])
+    # the chains not reaching a root taxon are not memoised
+    assert resolve_taxon_chain(ORPHAN, taxon_chains) is None
+    assert "orphan" not in taxon_chains
+
+
+def test_resolve_taxon_chain_of_a_cycle():
+    cycle = taxon("cycle", links={})
+    cycle["links"]["parent_taxons"] = [cycle]
+    with pytest.raises(ValueError):
+        resolve_taxon_chain(cycle, {})
+
+
+def test_process_url_and_metadata_chains_the_taxons():
+    item = process_url_and_metadata(
+        {
+            "_id": "/school-admissions",
+            "expanded_links": {"taxons": [ADMISSIONS, ORPHAN]},
+        }
+    )
+    assert item["taxons"] == [chain_taxons(ADMISSIONS, []), None]
+    assert "expanded_links" not in item
+    assert not item["withdrawn"]
@@ -0,0 +1,98 @@
+import json
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+
+import pytest
+
+from src.make_strata.preprocess_text import (
+    extract_text_from_content_details,
+    extract_text_from_html,
+)
+
+# `details` payloads of content items, with the text and html extracted by the previous
+# implementations of `extract_text_from_content_details` and `extract_text_from_html`
+with open(Path(__file__).parent / "fixtures" / "details_payloads.json") as f:
+    DETAILS_PAYLOADS = json.load(f)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    DETAILS_PAYLOADS,
+    ids=[payload["base_path"] for payload in DETAILS_PAYLOADS],
+)
+def test_extract_text_from_content_details_is_unchanged(payload):
+    assert extract_text_from_content_details(payload["details"]) == payload["text"]
+    assert (
+        extract_text_from_content_details(payload["details"], keep_html=True)
+        == payload["html"]
+    )
+
+
+@pytest.mark.parametrize(
+    "details, text, html",
+    [
+        ("<p>a  b</p>\n", "a b", "<p>a  b</p>\n"),
+        ("slug", " ", " "),
+        (None, " ", " "),
+        ({"content_type": "text/govspeak", "content": "<p>a</p>"}, " ", " "),
+        ([], "", ""),
+        ({"title": "Title", "parts": [[], {}]}, "", ""),
+        (
+            [["<p>a</p>\n", " "], "slug", "  <p>b</p>", {"body": "<p>c</p>"}],
+            "a b c",
+            "<p>a</p> <p>b</p> <p>c</p>",
+        ),
+        (
+            {
+                "body": [
+                    {"content_type": "text/govspeak", "content": "<p>a</p>"},
+                    {"content_type": "text/html", "content": "<p>b</p>"},
+                ]
+            },
+            "b",
+            "<p>b</p>",
+        ),
+    ],
+)
+def test_extract_text_from_content_details(details, text, html):
+    assert extract_text_from_content_details(details) == text
+    assert extract_text_from_content_details(details, keep_html=True) == html
+
+
+def test_extract_text_from_content_details_of_deeply_nested_payloads():
+    details = "<p>a</p>"
+    for _ in range(5000):
+        details = [details, {"body": "<p>b</p>"}]
+    assert extract_text_from_content_details(details) == "a" + " b" * 5000
+
+
+@pytest.mark.parametrize(
+    "body, text",
+    [
+        ("", " "),
+        ("\n", " "),
+        (" \r\n\t", " "),
+        ("<p></p>", " "),
+        ("<!-- only a comment -->", " "),
+        ("<p>a<!-- comment -->b</p>", "a b"),
+        ("<p>a<b>b</b>c</p>", "a b c"),
+        ("<p>A&amp;B&nbsp;C</p>", "A&B C"),
+        ('<p>a \\"quote\\"</p>', 'a "quote"'),
+        ("<p>line\r\nbreak\tand  tab</p>", "line break and tab"),
+    ],
+)
+def test_extract_text_from_html(body, text):
+    assert extract_text_from_html(body) == text
+
+
+def test_extract_text_from_html_with_an_encoding_declaration():
+    assert (
+        extract_text_from_html('<?xml version="1.0" encoding="utf-8"?><p>a</p>') == " "
+    )
+
+
+def test_extract_text_from_html_in_threads():
+    bodies = [f"<p>Paragraph <b>{i}</b></p>" for i in range(100)]
+    with ThreadPool(4) as pool:
+        texts = pool.map(extract_text_from_html, bodies)
+    assert texts == [f"Paragraph {i}" for i in range(100)]
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.make_strata.sample_paths_by_strata import (
+    get_strata_sizes,
+    get_stratified_sample,
+    get_stratified_samples,
+)
+
+STRATA_DF = pd.DataFrame(
+    {
+        "base_path": [f"/page-{i}" for i in range(100)],
+        "taxon_level1": ["Education"] * 50 + ["Money"] * 30 + ["Work"] * 20,
+        "schema_strata_name": ["guide", "answer", "news_article", None] * 25,
+    },
+    index=range(1000, 1100),
+)
+TAXONS_WEIGHTS = {"Education": 1, "Money": 2, "Work": 0.5, "Transport": 1}
+SCHEMAS_WEIGHTS = {"guide": 1, "answer": 0, "news_article": 2}
+
+
+def test_get_strata_sizes():
+    assert get_strata_sizes(TAXONS_WEIGHTS, 40) == {
+        "Education": 10,
+        "Money": 20,
+        "Work": 5,
+        "Transport": 10,
+    }
+
+
+def test_get_stratified_sample():
+    sample = get_stratified_sample(STRATA_DF, "taxon_level1", TAXONS_WEIGHTS, 40, 42)
+
+    assert sample.groupby("taxon_level1").size().to_dict() == {
+        "Education": 10,
+        "Money": 20,
+        "Work": 5,
+    }
+    # the rows are ordered by stratum, with their original index
+    assert sample.taxon_level1.is_monotonic_increasing
+    assert sample.index.is_unique
+    pd.testing.assert_frame_equal(
+        sample.drop(columns="seed"), STRATA_DF.loc[sample.index]
+    )
+    assert (sample.seed == 42).all()
+
+
+def test_get_stratified_sample_is_reproducible():
+    samples = [
+        get_stratified_sample(STRATA_DF, "taxon_level1", TAXONS_WEIGHTS, 40, seed)
+        for seed in [1, 1, 2]
+    ]
+    pd.testing.assert_frame_equal(samples[0], samples[1])
+    assert not samples[0].index.equals(samples[2].index)
+
+
+def test_get_stratified_sample_is_uniform_within_strata():
+    counts = pd.Series(0, index=STRATA_DF.index)
+    for seed in range(500):
+        sample = get_stratified_sample(
+            STRATA_DF, "taxon_level1", TAXONS_WEIGHTS, 40, seed
+        )
+        counts[sample.index] += 1
+    # each Education row is sampled with probability 10/50, each Money row 20/30
+    assert np.allclose(counts.iloc[:50] / 500, 10 / 50, atol=0.08)
+    assert np.allclose(counts.iloc[50:80] / 500, 20 / 30, atol=0.08)
+
+
+def test_get_stratified_samples_of_several_schemes():
+    samples = get_stratified_samples(
+        STRATA_DF,
+        {
+            "taxons": ("taxon_level1", TAXONS_WEIGHTS, 40),
+            "schemas": ("schema_strata_name", SCHEMAS_WEIGHTS, 30),
+        },
+        seed=0,
+    )
+
+    pd.testing.assert_frame_equal(
+        samples["taxons"],
+        get_stratified_sample(STRATA_DF, "taxon_level1", TAXONS_WEIGHTS, 40, 0),
+    )
+    # the rows without a stratum are not sampled
+    assert samples["schemas"].groupby("schema_strata_name").size().to_dict() == {
+        "guide": 10,
+        "news_article": 20,
+    }
+
+
+def test_get_stratified_sample_errors():
+    with pytest.raises(KeyError):
+        get_stratified_sample(STRATA_DF, "taxon_level1", {"Education": 1}, 10, 0)
+    with pytest.raises(ValueError, match="'Money'"):
+        get_stratified_sample(STRATA_DF, "taxon_level1", TAXONS_WEIGHTS, 200, 0)
@@ -0,0 +1,86 @@
+import math
+
+import pandas as pd
+import pytest
+
+from src.make_strata.strata import get_level1_taxon_title, get_strata
+
+
+def taxon(title, level):
+    return {"title": title, "content_id": title.lower(), "level": level}
+
+
+SCHOOLS_CHAIN = [taxon("Schools", 2), taxon("Education", 1)]
+BENEFITS_CHAIN = [taxon("Benefits", 1)]
+
+
+@pytest.mark.parametrize(
+    "taxons, title",
+    [
+        ([SCHOOLS_CHAIN], "Education"),
+        ([SCHOOLS_CHAIN, BENEFITS_CHAIN], "Education"),
+        ([None, BENEFITS_CHAIN], "Benefits"),
+        ([[taxon("Schools", 2)], BENEFITS_CHAIN], "Benefits"),
+        # no taxons, or an empty taxon chain first
+        (float("nan"), ""),
+        ([], ""),
+        ([[], BENEFITS_CHAIN], ""),
+        # no level-1 taxon
+        (None, math.nan),
+        ([None], math.nan),
+        ([[taxon("Schools", 2)]], math.nan),
+    ],
+)
+def test_get_level1_taxon_title(taxons, title):
+    if isinstance(title, float):
+        assert math.isnan(get_level1_taxon_title(taxons))
+    else:
+        assert get_level1_taxon_title(taxons) == title
+
+
+def test_get_strata():
+    content_store_df = pd.DataFrame(
+        {
+            "base_path": ["/a", "/b", "/c", "/d"],
+            "schema_name": ["guide", "answer", "guide", "news_article"],
+            "document_type": ["guide", "answer", "guide", "press_release"],
+            "publishing_app": ["publisher", "publisher", "publisher", "whitehall"],
+            "title": ["A", "B", "C", "D"],
+            "taxons": [
+                [SCHOOLS_CHAIN, BENEFITS_CHAIN],
+                float("nan"),
+                [[taxon("Schools", 2)]],
+                [BENEFITS_CHAIN, BENEFITS_CHAIN],
+            ],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+    strata_df = get_strata(content_store_df)
+
+    pd.testing.assert_frame_equal(
+        strata_df,
+        pd.DataFrame(
+            {
+                "base_path": ["/a", "/b", "/c", "/d"],
+                "schema_name": ["guide", "answer", "guide", "news_article"],
+                "document_type": ["guide", "answer", "guide", "press_release"],
+                "publishing_app": ["publisher", "publisher", "publisher", "whitehall"],
+                "taxon_level1": ["Education", "", math.nan, "Benefits"],
+            }
+        ),
+    )
+
+
+def test_get_strata_of_duplicated_base_paths():
+    content_store_df = pd.DataFrame(
+        {
+            "base_path": ["/a", "/a"],
+            "schema_name": "guide",
+            "document_type": "guide",
+            "publishing_app": "publisher",
+            "taxons": [[BENEFITS_CHAIN], [BENEFITS_CHAIN]],
+        }
+    )
+    with pytest.raises(ValueError):
+        get_strata(content_store_df)
@@ -0,0 +1,61 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.utils.helpers_arrow import (
+    iter_merged_batches,
+    iter_parquet_runs,
+    row_groups_with_values,
+    sort_batch,
+)
+
+
+def run(keys, max_chunksize=2):
+    table = pa.table({"key": pa.array(keys, pa.string())})
+    return table.column("key"), table.to_batches(max_chunksize=max_chunksize)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 4, 100])
+def test_iter_merged_batches(batch_size):
+    runs = [["/a", "/c", "/f"], [], ["/b", "/d"], ["/e", "/g", "/h"]]
+
+    batches = list(iter_merged_batches([run(keys) for keys in runs], batch_size, "key"))
+
+    assert all(batch.num_rows <= batch_size for batch in batches)
+    assert pa.Table.from_batches(batches).column("key").to_pylist() == [
+        "/a",
+        "/b",
+        "/c",
+        "/d",
+        "/e",
+        "/f",
+        "/g",
+        "/h",
+    ]
+
+
+def test_iter_merged_batches_of_parquet_runs(tmp_path):
+    path = tmp_path / "runs.parquet"
+    batches = pa.table({"key": ["/c", "/a", "/d", "/f", "/b", "/e"]}).to_batches(3)
+    with pq.ParquetWriter(path, batches[0].schema) as writer:
+        for batch in batches:
+            writer.write_batch(sort_batch(batch, "key"))
+
+    runs = iter_parquet_runs(pq.ParquetFile(path), "key", batch_size=2)
+
+    assert len(runs) == 2
+    merged = pa.Table.from_batches(iter_merged_batches(runs, 4, "key"))
+    assert merged.column("key").to_pylist() == ["/a", "/b", "/c", "/d", "/e", "/f"]
+
+
+def test_row_groups_with_values(tmp_path):
+    path = tmp_path / "sorted.parquet"
+    keys = [f"/page-{i:02d}" for i in range(40)]
+    pq.write_table(pa.table({"key": keys}), path, row_group_size=10)
+    parquet_file = pq.ParquetFile(path)
+
+    assert row_groups_with_values(parquet_file, "key", ["/page-05"]) == [0]
+    assert row_groups_with_values(
+        parquet_file, "key", ["/a", "/page-09", "/page-10", "/page-35", "/z"]
+    ) == [0, 1, 3]
+    assert row_groups_with_values(parquet_file, "key", []) == []